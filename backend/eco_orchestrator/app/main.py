@@ -14,6 +14,10 @@ load_dotenv(_package_root / ".env")
 import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from loguru import logger
+
+from core.database import database
+from core.chat_store import chat_store
 
 from app.worker import monitor_deferred_tasks
 from app.routers import action, agent, discovery, governance, intelligence, transparency, test
@@ -39,8 +43,23 @@ app.include_router(test.router)
 
 @app.on_event("startup")
 async def startup_event():
+    # Warm the Postgres pool; deferral falls back to run-now if the DB is down
+    try:
+        await database.connect()
+    except Exception as e:
+        logger.warning(f"Postgres pool not started (will retry lazily): {e}")
     # create_task runs the worker loop without blocking the API
-    asyncio.create_task(monitor_deferred_tasks())
+    app.state.worker_task = asyncio.create_task(monitor_deferred_tasks())
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    worker_task = getattr(app.state, "worker_task", None)
+    if worker_task is not None:
+        worker_task.cancel()
+    # Write buffered chat messages before the pool goes away
+    await chat_store.close()
+    await database.close()
 
 @app.get("/health")
 def health():
@@ -1,15 +1,28 @@
-from datetime import datetime
-from typing import Optional
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Literal, Optional
 
-from fastapi import APIRouter, Body, HTTPException
-from pydantic import BaseModel
+from fastapi import APIRouter, Body, HTTPException, Request
+from pydantic import BaseModel, Field, ValidationError
 
+from core.compression import EcoCompressor
 from core.orchestrator import EcoOrchestrator
 from core.grid_engine import get_default_grid_data
+from core.ids import new_id
+from core.chat_store import chat_store
+from core.scheduler import scheduler
+from app.worker import WORKER_ID
 
 router = APIRouter(tags=["action"])
 orchestrator = EcoOrchestrator()
 
+# Lines per COPY (and per compression batch) in /deferred/bulk
+BULK_COPY_CHUNK = int(os.getenv("BULK_COPY_CHUNK", "5000"))
+# /deferred/bulk compresses in a worker thread: its own compressor, no memo, and no token counts, so it
+# never touches the LRUs /orchestrate uses on the loop (or flushes them with a large upload)
+_bulk_compressor = EcoCompressor(cache_size=0)
+
 
 class OrchestrateRequest(BaseModel):
     prompt: str
@@ -18,10 +31,33 @@ class OrchestrateRequest(BaseModel):
     is_urgent: bool = False
     bypass_eco: bool = False
     deadline: Optional[datetime] = None
+    chat_id: Optional[str] = None  # continue an existing chat; a new one is started if omitted
+    # Token budget for the compressed prompt: < 1 keeps that fraction of the tokens, >= 1 is a token count
+    compression_target: Optional[float] = Field(default=None, gt=0)
+    # Low-tier-first cascade ("hedged" also starts the bigger model after a latency threshold); default CASCADE_MODE
+    cascade: Optional[Literal["off", "cascade", "hedged"]] = None
+
+
+class BulkTaskLine(BaseModel):
+    """One line of a JSONL / NDJSON bulk deferral upload."""
+    prompt: str
+    model_tier: str = "gemini-2.0-flash"
+    deadline: Optional[datetime] = None
+    target_intensity: Optional[float] = None
+    # Charged / credited on the task's receipt when it runs (carbon budget, leaderboard)
+    project_id: Optional[str] = None
+    user_id: Optional[str] = None
 
 
 @router.post("/orchestrate")
 async def orchestrate(req: OrchestrateRequest):
+    if req.chat_id:
+        # Only the user who started a chat may continue it (404, so chat ids cannot be probed)
+        owner = await chat_store.owner(req.chat_id)
+        if owner is not None and owner != req.user_id:
+            raise HTTPException(status_code=404, detail="Chat not found")
+    req.chat_id = req.chat_id or new_id("chat")
+    chat_id = req.chat_id
     try:
         results = await orchestrator.process(req)
     except RuntimeError as e:
@@ -31,21 +67,29 @@ async def orchestrate(req: OrchestrateRequest):
         )
 
     if results.get("status") == "deferred":
+        # The worker appends the assistant turn (and its receipt) when the task runs
+        chat_store.append(chat_id, "user", req.prompt, None, req.user_id, req.project_id)
         return {
             "status": "deferred",
-            "chat_id": f"{req.user_id}_uuid",
+            "chat_id": chat_id,
             "response": "",
             "receipt_id": None,
             "deferred": True,
             "task_id": results["task_id"],
             "message": results["message"],
+            "scheduled_at": results.get("scheduled_at"),  # expected cleanest time before the deadline, if forecast
         }
 
+    # Buffered; the chat store writes it in the background
+    receipt_id = results.get("receipt_id")
+    chat_store.append(chat_id, "user", req.prompt, receipt_id, req.user_id, req.project_id)
+    chat_store.append(chat_id, "assistant", results.get("response", ""), receipt_id, req.user_id, req.project_id)
+
     return {
         "status": "complete",
-        "chat_id": f"{req.user_id}_uuid",
+        "chat_id": chat_id,
         "response": results.get("response", ""),
-        "receipt_id": results.get("receipt_id") or "rec_uuid",
+        "receipt_id": receipt_id,
         "deferred": False,
         "eco_stats": results.get("eco_stats", {}),
         "was_cached": results.get("was_cached", False),
@@ -53,9 +97,18 @@ async def orchestrate(req: OrchestrateRequest):
         "input_tokens": results.get("input_tokens"),
         "compressed_text_tokens": results.get("compressed_text_tokens"),
         "compressed_prompt": results.get("compressed_prompt"),
+        "context_stats": results.get("context_stats"),  # multi-turn chats only
+        "cascade": results.get("cascade"),  # cascade mode only: escalation, extra carbon, latency
+        "region_shift": results.get("region_shift"),  # ran now in a cleaner region instead of being deferred
     }
 
 
+@router.get("/scheduler/stats")
+async def scheduler_stats():
+    """LLM slots in use and queue depth / queue-wait percentiles per priority class."""
+    return scheduler.stats()
+
+
 @router.post("/deferred/execute/{task_id}")
 async def deferred_execute(task_id: str):
     try:
@@ -63,16 +116,21 @@ async def deferred_execute(task_id: str):
     except ValueError:
         raise HTTPException(status_code=400, detail="task_id must be an integer")
 
+    # Claim the task first so a background worker cannot run it concurrently
     try:
-        task = await orchestrator.db.get_task_by_id(task_id_int)
+        task = await orchestrator.db.claim_task(task_id_int, WORKER_ID)
     except Exception:
         raise HTTPException(status_code=503, detail="Database unavailable")
 
-    if task is None or task.get("status") != "deferred":
+    if task is None:
         raise HTTPException(status_code=404, detail="Task not found or already completed")
 
-    result = await orchestrator.execute_deferred_task(task)
+    result = await orchestrator.execute_deferred_task(task, owner=WORKER_ID)
     if result is None:
+        try:
+            await orchestrator.db.release_task(task_id_int, WORKER_ID)
+        except Exception:
+            pass  # lease expiry will return it to the queue
         raise HTTPException(status_code=503, detail="Deferred task execution failed")
 
     return {
@@ -84,6 +142,84 @@ async def deferred_execute(task_id: str):
     }
 
 
+def _id_ranges(ids: list[int]) -> list[list[int]]:
+    """Collapse sorted ids into inclusive [start, end] ranges."""
+    ranges: list[list[int]] = []
+    for task_id in ids:
+        if ranges and task_id == ranges[-1][1] + 1:
+            ranges[-1][1] = task_id
+        else:
+            ranges.append([task_id, task_id])
+    return ranges
+
+
+@router.post("/deferred/bulk")
+async def deferred_bulk(request: Request):
+    """
+    Bulk-enqueue deferred work from a streamed JSONL / NDJSON body, one BulkTaskLine per line.
+    Lines are compressed off the event loop and COPYed in chunks of BULK_COPY_CHUNK as they
+    arrive, all in one transaction: a bad line rolls the whole upload back. Returns task-ID ranges.
+    """
+    default_deadline = datetime.now(timezone.utc) + timedelta(hours=24)
+    default_target = float(os.getenv("GRID_THRESHOLD", "200"))
+    pending: list[BulkTaskLine] = []
+    ids: list[int] = []
+    buffer = b""
+    line_no = 0
+
+    def _parse(raw: bytes) -> None:
+        nonlocal line_no
+        line_no += 1
+        if not raw.strip():
+            return
+        try:
+            pending.append(BulkTaskLine.model_validate_json(raw))
+        except ValidationError as e:
+            raise HTTPException(status_code=422, detail=f"line {line_no}: {e.errors()[0]['msg']}")
+
+    def _prepare(lines: list[BulkTaskLine]) -> list[tuple]:
+        tasks = []
+        for line in lines:
+            deadline = line.deadline or default_deadline
+            if deadline.tzinfo is None:
+                deadline = deadline.replace(tzinfo=timezone.utc)
+            target = line.target_intensity if line.target_intensity is not None else default_target
+            compressed = _bulk_compressor.compress_text(line.prompt)
+            tasks.append((compressed, line.model_tier, deadline, target, line.project_id, line.user_id))
+        return tasks
+
+    async def _flush(writer) -> None:
+        lines = pending[:]
+        pending.clear()
+        if lines:
+            ids.extend(await writer.write(await asyncio.to_thread(_prepare, lines)))
+
+    try:
+        async with orchestrator.db.bulk_task_writer() as writer:
+            async for chunk in request.stream():
+                buffer += chunk
+                *lines, buffer = buffer.split(b"\n")
+                for raw in lines:
+                    _parse(raw)
+                    if len(pending) >= BULK_COPY_CHUNK:
+                        await _flush(writer)
+            _parse(buffer)
+            await _flush(writer)
+            if not ids:
+                raise HTTPException(status_code=422, detail="No tasks in upload")
+    except HTTPException:
+        raise
+    except Exception:
+        raise HTTPException(status_code=503, detail="Database unavailable")
+
+    return {
+        "status": "deferred",
+        "count": len(ids),
+        "task_id_ranges": _id_ranges(ids),
+        "message": "Queued for green window.",
+    }
+
+
 @router.post("/bypass")
 async def bypass(prompt: str = Body(..., embed=True)):
     """Direct LLM access without eco optimizations. Computes potential_savings_lost vs orchestrate."""
@@ -92,7 +228,7 @@ async def bypass(prompt: str = Body(..., embed=True)):
     except RuntimeError as e:
         raise HTTPException(status_code=503, detail=str(e) or "LLM unavailable")
 
-    comp = orchestrator.compressor.compress(prompt)
+    comp = orchestrator.compressor.compress(prompt, "gemini-2.0-flash")
     grid_data = get_default_grid_data()
     grid_intensity = grid_data["carbon_intensity_g_per_kwh"]
     original_tokens = comp["original_count"]
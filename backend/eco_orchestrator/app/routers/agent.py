@@ -5,7 +5,6 @@
 
 from __future__ import annotations
 
-import hashlib
 import math
 import random
 import time
@@ -21,6 +20,8 @@ from core.grid_engine import (
     DEFAULT_EM_ZONE,
 )
 from core.llm_client import LLMClient
+from core.scheduler import scheduler
+from core.token_counter import count_tokens, count_tokens_many
 
 # ---------------------------------------------------------------------------
 # Router
@@ -122,6 +123,10 @@ _MODEL_CATALOGUE = [
     {"name": "gpt-4o-mini",        "energy_kwh_per_1k_tok": 0.0007, "quality": "fast"},
 ]
 
+# Generated tokens per prompt token when estimating a plan's output size
+# (≈ the old 12–17 words-out per word-in, at ~1.3 tokens per word).
+_OUTPUT_TOKENS_PER_PROMPT_TOKEN = 11
+
 # Template phases used to decompose a project prompt into agentic steps.
 # Each entry: (title, description_template, prompt_template, weight, quality_hint)
 #   weight  — relative share of the total token budget
@@ -427,16 +432,11 @@ class AgentPlanner:
 
     @staticmethod
     def _estimate_tokens(prompt: str) -> int:
-        """Deterministic-ish token estimate from the prompt text.
+        """Estimated generation size: real prompt token count × a typical output/input ratio.
 
-        Uses a simple hash-seeded heuristic so the same prompt always
-        yields the same number — no randomness for reproducibility.
+        Deterministic — the same prompt always yields the same number.
         """
-        base = max(256, len(prompt.split()) * 12)
-        # Seed a multiplier from the prompt hash so it looks "smart"
-        h = int(hashlib.sha256(prompt.encode()).hexdigest()[:8], 16)
-        multiplier = 1.0 + (h % 400) / 1000  # 1.0 – 1.4×
-        return int(base * multiplier)
+        return max(256, count_tokens(prompt) * _OUTPUT_TOKENS_PER_PROMPT_TOKEN)
 
     @staticmethod
     def _summarize(prompt: str, max_len: int = 60) -> str:
@@ -593,7 +593,7 @@ _MODEL_ALIAS: dict[str, str] = {
     "gpt-4o-mini": "gemini-2.0-flash",
     "gemini-1.5-pro": "gemini-2.5-pro",
 }
-_FALLBACK_MODEL = "gemini-2.0-flash"
+_DEFAULT_MODEL = "gemini-2.0-flash"
 
 
 @router.post("/execute-step", response_model=ExecuteStepResponse)
@@ -603,38 +603,32 @@ async def execute_step(req: ExecuteStepRequest):
     LLM and returns the real response with carbon accounting.
     """
     # Resolve catalogue name → real Vertex AI model ID
-    requested = req.model_choice or _FALLBACK_MODEL
+    requested = req.model_choice or _DEFAULT_MODEL
     model = _MODEL_ALIAS.get(requested, requested)
+    known = {m["model_id"] for m in _llm.get_available_models()}
+    if known and model not in known:
+        # Not served in any region: use the default up front rather than after a failed call
+        model = _DEFAULT_MODEL
 
     start = time.perf_counter()
     try:
-        output = await _llm.generate(prompt=req.prompt, model_name=model)
+        # The client retries transient errors and hedges slow calls to another region / equivalent model
+        async with scheduler.slot("interactive", cost=count_tokens(req.prompt, model)):
+            output = await _llm.generate(prompt=req.prompt, model_name=model)
     except Exception as exc:
-        # If the resolved model still fails, retry with the safe fallback
-        if model != _FALLBACK_MODEL:
-            try:
-                model = _FALLBACK_MODEL
-                output = await _llm.generate(prompt=req.prompt, model_name=model)
-            except Exception as exc2:
-                raise HTTPException(
-                    status_code=502,
-                    detail=f"LLM call failed ({model}): {exc2}",
-                ) from exc2
-        else:
-            raise HTTPException(
-                status_code=502,
-                detail=f"LLM call failed ({model}): {exc}",
-            ) from exc
+        raise HTTPException(
+            status_code=502,
+            detail=f"LLM call failed ({model}): {exc}",
+        ) from exc
     elapsed_ms = int((time.perf_counter() - start) * 1000)
 
     # Rough carbon estimate: tokens × energy × grid intensity
     grid = get_default_grid_data()
     intensity = grid.get("carbon_intensity_g_per_kwh", 420.0)
 
-    # Estimate tokens from prompt + output length
-    prompt_tokens = max(1, len(req.prompt.split()) * 1.3)
-    output_tokens = max(1, len(output.split()) * 1.3)
-    total_tokens = int(prompt_tokens + output_tokens)
+    # Tokens actually sent and received, with the model's tokenizer
+    prompt_tokens, output_tokens = count_tokens_many([req.prompt, output], model)
+    total_tokens = max(1, prompt_tokens + output_tokens)
 
     # Find energy per token for the model used
     model_entry = next(
@@ -1,27 +1,26 @@
 # Discovery: dashboard and initial user state
 from uuid import UUID
 
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Query
 
-from core.receipt_store import get_all_receipts
+from core.aggregates import savings
+from core.chat_store import chat_store
 
 router = APIRouter(tags=["discovery"])
 
 
-def _aggregate_savings() -> tuple[float, float]:
-    """Sum net_savings (g CO2) and avg efficiency_multiplier from all receipts."""
-    receipts = get_all_receipts()
-    total_g = sum(r.get("net_savings", 0) or 0 for r in receipts)
-    mults = [r.get("efficiency_multiplier") for r in receipts if r.get("efficiency_multiplier") is not None]
-    avg_eff = sum(mults) / len(mults) if mults else 0.94
-    return round(total_g, 1), round(avg_eff, 2)
+async def _aggregate_savings(scope: str, key: str = "") -> tuple[float, float]:
+    """Total net_savings (g CO2) and avg efficiency_multiplier from the running aggregates (O(1))."""
+    total_g = (await savings.get(scope, key, "net_savings")).total
+    avg_eff = (await savings.get(scope, key, "efficiency")).mean
+    return round(total_g, 1), round(avg_eff if avg_eff is not None else 0.94, 2)
 
 
 @router.get("/user/{user_id}/summary")
-def get_user_summary(user_id: UUID):
-    total_savings_g, avg_efficiency = _aggregate_savings()
+async def get_user_summary(user_id: UUID):
+    total_savings_g, avg_efficiency = await _aggregate_savings("user", str(user_id))
     resp = {
-        "chat_ids": ["uuid_chat1", "uuid_chat2"],
+        "chat_ids": await chat_store.chats_for_user(str(user_id)),
         "project_ids": ["proj_marketing", "proj_dev"],
         "pending_tasks_count": 3,
         "total_user_savings_g": total_savings_g,
@@ -30,13 +29,18 @@ def get_user_summary(user_id: UUID):
 
 
 @router.get("/chat/{chat_id}/history")
-def get_chat_history(chat_id: UUID):
-    total_savings_g, avg_efficiency = _aggregate_savings()
+async def get_chat_history(
+    chat_id: str, user_id: str, before: int | None = None, limit: int = Query(50, ge=1, le=500)
+):
+    """Newest page of messages by default; pass next_cursor back as `before` for older pages. Owner only."""
+    owner = await chat_store.owner(chat_id)
+    if owner is not None and owner != user_id:
+        raise HTTPException(status_code=404, detail="Chat not found")
+    total_savings_g, avg_efficiency = await _aggregate_savings("chat", chat_id)
+    page = await chat_store.history(chat_id, before_seq=before, limit=limit)
     resp = {
-        "messages": [
-            {"role": "user", "content": "string", "receipt_id": "rec_1"},
-            {"role": "assistant", "content": "string", "receipt_id": "rec_1"},
-        ],
+        "messages": page["messages"],
+        "next_cursor": page["next_cursor"],
         "total_chat_co2_saved_g": total_savings_g,
         "efficiency_score": avg_efficiency,
     }
@@ -1,26 +1,24 @@
 # Governance: budget and leaderboard
-from fastapi import APIRouter
+from fastapi import APIRouter, Query
+
+from core.budget import budget
+from core.leaderboard import leaderboard
 
 router = APIRouter(tags=["governance"])
 
 
 @router.get("/budget/status/{project_id}")
-def get_budget_status(project_id: str):
-    resp = {
-        "limit_g": 5000,
-        "used_g": 1200,
-        "remaining_percent": 76.0,
-        "policy_active": "Standard",
-    }
-    return resp
+async def get_budget_status(project_id: str):
+    return await budget.status(project_id)
 
 
 @router.get("/leaderboard")
-def get_leaderboard(filter: str = ""):
-    resp = {
-        "rankings": [
-            {"name": "Engineering", "saved_kg": 24.5},
-            {"name": "Marketing", "saved_kg": 18.2},
-        ]
-    }
-    return resp
+async def get_leaderboard(filter: str = "", k: int = Query(10, ge=1, le=1000)):
+    """Top-k projects by CO2 saved. filter: day | week | month (rolling UTC days); anything else is all time."""
+    return {"window": filter if filter in ("day", "week", "month") else "all", "rankings": await leaderboard.top(k, filter)}
+
+
+@router.get("/leaderboard/rank/{project_id}")
+async def get_leaderboard_rank(project_id: str, filter: str = ""):
+    """1-based rank and saved_kg of one project in the chosen window (rank is null if it has no savings there)."""
+    return await leaderboard.rank(project_id, filter)
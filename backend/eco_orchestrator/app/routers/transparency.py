@@ -28,16 +28,16 @@ STUB_NUTRITION = {
 
 
 @router.get("/receipt/{receipt_id}")
-def get_receipt(receipt_id: str):
-    stored = get_stored_receipt(receipt_id)
+async def get_receipt(receipt_id: str):
+    stored = await get_stored_receipt(receipt_id)
     if stored is not None:
         return {**STUB_RECEIPT, **stored}
     return STUB_RECEIPT
 
 
 @router.get("/analytics/nutrition/{receipt_id}")
-def get_analytics_nutrition(receipt_id: str):
-    stored = get_stored_nutrition(receipt_id)
+async def get_analytics_nutrition(receipt_id: str):
+    stored = await get_stored_nutrition(receipt_id)
     if stored is not None:
         return stored
     return STUB_NUTRITION
@@ -1,31 +1,126 @@
 import asyncio
+import os
+import socket
+from datetime import datetime, timezone
+
 from loguru import logger
 
-from core.database import EcoDatabase
+from core.database import database
+from core.llm_client import SERVER_MODEL_MAP
 from core.orchestrator import EcoOrchestrator
-from core.grid_engine import get_default_grid_data
+from core.region_shift import REGION_SHIFT, RegionPlanner, live_region_intensities
+from core.grid_engine import (
+    DEFAULT_EM_ZONE,
+    add_intensity_listener,
+    get_default_grid_data,
+    remove_intensity_listener,
+)
+
+# Safety-net poll when no NOTIFY / grid change arrives (also refreshes grid data).
+WORKER_FALLBACK_POLL_SECONDS = int(os.getenv("WORKER_FALLBACK_POLL_SECONDS", "300"))
+# Poll interval used only while the LISTEN connection is unavailable.
+WORKER_NO_LISTEN_POLL_SECONDS = int(os.getenv("WORKER_NO_LISTEN_POLL_SECONDS", "60"))
+# Tasks claimed (and executed concurrently) per round trip.
+WORKER_CLAIM_BATCH = int(os.getenv("WORKER_CLAIM_BATCH", "10"))
+# Lease owner written to claimed rows; unique per uvicorn worker process.
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+async def _run_task(db, orch, task: dict, placement: dict | None = None) -> bool:
+    result = await orch.execute_deferred_task(task, owner=WORKER_ID, placement=placement)
+    if result:
+        logger.info(f"Worker completed deferred task {task['id']} | receipt={result['receipt_id']}")
+        return True
+    logger.warning(f"Worker failed to complete deferred task {task['id']}")
+    try:
+        await db.release_task(task["id"], WORKER_ID)
+    except Exception as e:
+        logger.warning(f"Worker could not release task {task['id']} (lease will expire): {e}")
+    return False
+
+
+async def _run_cycle(db, orch) -> None:
+    grid_data = get_default_grid_data()
+    intensity = grid_data["carbon_intensity_g_per_kwh"]
+    # One placement snapshot per cycle: a task is runnable when any region serving its model beats its target
+    planner = None
+    if REGION_SHIFT:
+        planner = RegionPlanner(orch.client.default_location, intensity, await live_region_intensities())
+    thresholds = planner.claim_thresholds() if planner else None
+    # Claim in batches until the runnable set is drained; other workers skip our locked rows
+    while True:
+        claimed = await db.claim_runnable_tasks(
+            intensity, WORKER_ID, limit=WORKER_CLAIM_BATCH, model_intensity=thresholds
+        )
+        if not claimed:
+            return
+        tasks = [dict(row) for row in claimed]
+        placements = planner.place_all(tasks) if planner else [None] * len(tasks)
+        shifted = sum(1 for p in placements if p and p["shifted"])
+        logger.info(f"Worker {WORKER_ID} claimed {len(tasks)} runnable deferred task(s) | {shifted} shifted to another region")
+        results = await asyncio.gather(*(_run_task(db, orch, t, p) for t, p in zip(tasks, placements)))
+        # Released failures are claimable again at once; leave them for the next cycle
+        if len(claimed) < WORKER_CLAIM_BATCH or not all(results):
+            return
 
 
 async def monitor_deferred_tasks():
-    """Poll for deferred tasks and execute when grid is green or deadline passed."""
-    db = EcoDatabase()
+    """
+    Execute deferred tasks when a grid is green (the default zone or another
+    region hosting an equivalent model) or the deadline passed.
+
+    Event-driven: wakes on a Postgres NOTIFY from add_task_to_queue, on a
+    carbon-intensity change for the default zone (or, with REGION_SHIFT, any
+    region's em_zone in server_model_map.json), or at the next task deadline.
+    A long fallback poll remains as a safety net.
+    """
+    db = database
     orch = EcoOrchestrator()
+    loop = asyncio.get_running_loop()
+    wake = asyncio.Event()
+    # A task also becomes runnable when another region serving its model gets clean enough
+    zones = {DEFAULT_EM_ZONE}
+    if REGION_SHIFT:
+        zones.update(rdata["em_zone"] for rdata in SERVER_MODEL_MAP.values() if rdata.get("em_zone"))
 
-    while True:
-        try:
-            grid_data = get_default_grid_data()
-            intensity = grid_data["carbon_intensity_g_per_kwh"]
-            runnable = await db.get_runnable_tasks(intensity)
-            if runnable:
-                logger.info(f"Worker found {len(runnable)} runnable deferred task(s)")
-            for row in runnable:
-                task = dict(row)
-                result = await orch.execute_deferred_task(task)
-                if result:
-                    logger.info(f"Worker completed deferred task {task['id']} | receipt={result['receipt_id']}")
-                else:
-                    logger.warning(f"Worker failed to complete deferred task {task['id']}")
-        except Exception as e:
-            logger.warning(f"Deferred worker cycle failed: {e}")
-
-        await asyncio.sleep(60)
+    def _on_notify(payload: str) -> None:
+        wake.set()
+
+    def _on_intensity_change(zone: str, intensity: float) -> None:
+        if zone in zones:
+            # Grid engine may be called from a worker thread
+            loop.call_soon_threadsafe(wake.set)
+
+    add_intensity_listener(_on_intensity_change)
+    listener = None
+    try:
+        while True:
+            if listener is None or listener.is_closed():
+                try:
+                    listener = await db.listen_for_tasks(_on_notify)
+                    logger.info("Worker listening for deferred-task notifications")
+                except Exception as e:
+                    listener = None
+                    logger.warning(f"Worker LISTEN unavailable, polling every {WORKER_NO_LISTEN_POLL_SECONDS}s: {e}")
+
+            # Clear before querying so events that arrive mid-cycle trigger another pass
+            wake.clear()
+            timeout = WORKER_FALLBACK_POLL_SECONDS if listener is not None else WORKER_NO_LISTEN_POLL_SECONDS
+            try:
+                await _run_cycle(db, orch)
+                next_deadline = await db.get_next_deadline()
+                if next_deadline is not None:
+                    until_deadline = (next_deadline - datetime.now(timezone.utc)).total_seconds()
+                    # Already-overdue tasks left after a cycle failed to run; retry them at the slow poll rate
+                    timeout = min(timeout, until_deadline if until_deadline > 0 else WORKER_NO_LISTEN_POLL_SECONDS)
+            except Exception as e:
+                logger.warning(f"Deferred worker cycle failed: {e}")
+
+            try:
+                await asyncio.wait_for(wake.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        remove_intensity_listener(_on_intensity_change)
+        if listener is not None and not listener.is_closed():
+            await listener.close()
@@ -0,0 +1,214 @@
+"""
+Running savings aggregates, updated as receipts are written (see receipt_store.set_receipt).
+
+Dashboards read count / sum / mean / min / max / stddev per user, project, chat
+and hourly time bucket in O(1) instead of re-summing every stored receipt. Each
+receipt is counted once, when written; LRU eviction from the receipt store
+does not remove it from the totals.
+
+When Redis is up every worker adds to the same hashes (one Lua call per metric
+and receipt), so totals are shared and survive restarts; reads use the local
+copy, re-synced from Redis at most every AGGREGATES_REFRESH_SECONDS. Redis
+calls run in a worker thread, never on the event loop. Hourly
+buckets older than AGGREGATES_BUCKET_RETENTION_HOURS are dropped (and expire in
+Redis), and only the AGGREGATES_MAX_CHATS most recently active chats are kept
+locally (chat hashes expire in Redis after AGGREGATES_CHAT_TTL_SECONDS idle).
+"""
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from loguru import logger
+
+from core.redis import RedisCache
+
+# Receipt fields tracked, keyed by the name used in summaries
+METRICS = {"net_savings": "net_savings", "efficiency": "efficiency_multiplier"}
+AGGREGATES_BUCKET_RETENTION_HOURS = int(os.getenv("AGGREGATES_BUCKET_RETENTION_HOURS", "720"))
+AGGREGATES_MAX_CHATS = int(os.getenv("AGGREGATES_MAX_CHATS", "10000"))
+AGGREGATES_CHAT_TTL_SECONDS = int(os.getenv("AGGREGATES_CHAT_TTL_SECONDS", str(30 * 86400)))
+AGGREGATES_REFRESH_SECONDS = float(os.getenv("AGGREGATES_REFRESH_SECONDS", "5"))
+AGGREGATES_KEY_PREFIX = "savings:"
+
+# KEYS: one stats hash per scope. ARGV[1]: value, ARGV[i + 1]: TTL seconds for KEYS[i] (0 = keep).
+_RECORD_LUA = """
+local v = tonumber(ARGV[1])
+for i, key in ipairs(KEYS) do
+  redis.call('HINCRBY', key, 'count', 1)
+  redis.call('HINCRBYFLOAT', key, 'total', v)
+  redis.call('HINCRBYFLOAT', key, 'sum_sq', v * v)
+  local mn = tonumber(redis.call('HGET', key, 'min'))
+  if not mn or v < mn then redis.call('HSET', key, 'min', ARGV[1]) end
+  local mx = tonumber(redis.call('HGET', key, 'max'))
+  if not mx or v > mx then redis.call('HSET', key, 'max', ARGV[1]) end
+  local ttl = tonumber(ARGV[i + 1])
+  if ttl > 0 then redis.call('EXPIRE', key, ttl) end
+end
+return 1
+"""
+
+
+class RunningStats:
+    """count, sum, sum of squares, min and max of a stream of values."""
+
+    __slots__ = ("count", "total", "sum_sq", "min", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.sum_sq = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.sum_sq += value * value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    @property
+    def mean(self) -> float | None:
+        return self.total / self.count if self.count else None
+
+    @property
+    def stddev(self) -> float | None:
+        if not self.count:
+            return None
+        mean = self.total / self.count
+        return math.sqrt(max(0.0, self.sum_sq / self.count - mean * mean))
+
+    @classmethod
+    def from_hash(cls, fields: dict[str, str]) -> "RunningStats":
+        """Stats from a Redis hash written by _RECORD_LUA (empty stats for an empty hash)."""
+        stats = cls()
+        if fields:
+            stats.count = int(fields.get("count", 0))
+            stats.total = float(fields.get("total", 0.0))
+            stats.sum_sq = float(fields.get("sum_sq", 0.0))
+            stats.min = float(fields.get("min", math.inf))
+            stats.max = float(fields.get("max", -math.inf))
+        return stats
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "mean": self.mean,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "stddev": self.stddev,
+        }
+
+
+def _bucket_cutoff() -> str:
+    """Oldest hourly bucket key still kept (same format as receipt_store.time_bucket)."""
+    oldest = datetime.now(timezone.utc) - timedelta(hours=AGGREGATES_BUCKET_RETENTION_HOURS)
+    return oldest.strftime("%Y-%m-%dT%H")
+
+
+class SavingsAggregates:
+    """Per-(scope, key) RunningStats for each metric. Scopes: all, user, project, chat, bucket."""
+
+    def __init__(self, client=None, max_chats: int = AGGREGATES_MAX_CHATS,
+                 refresh_seconds: float = AGGREGATES_REFRESH_SECONDS):
+        self._stats: dict[tuple[str, str], dict[str, RunningStats]] = {}
+        # chat key -> None, least recently recorded first
+        self._chats: OrderedDict[str, None] = OrderedDict()
+        self.max_chats = max_chats
+        self.refresh_seconds = refresh_seconds
+        self._synced_at: dict[tuple[str, str, str], float] = {}
+        self.client = client
+        self._script = None
+        if client is not None:
+            try:
+                self._script = client.register_script(_RECORD_LUA)
+            except Exception as e:
+                logger.warning(f"Savings aggregates Redis script unavailable, aggregating per process: {e}")
+
+    def _key(self, scope: str, key: str, metric: str) -> str:
+        return f"{AGGREGATES_KEY_PREFIX}{scope}:{key}:{metric}"
+
+    def _ttl(self, scope: str) -> int:
+        if scope == "bucket":
+            return AGGREGATES_BUCKET_RETENTION_HOURS * 3600
+        return AGGREGATES_CHAT_TTL_SECONDS if scope == "chat" else 0
+
+    def _expire_local(self, scope: tuple[str, str]) -> None:
+        """Bound local state: drop buckets past retention when a new one starts, and least recent chats."""
+        if scope[0] == "bucket" and scope not in self._stats:
+            cutoff = _bucket_cutoff()
+            for old in [s for s in self._stats if s[0] == "bucket" and s[1] < cutoff]:
+                self._drop(old)
+        elif scope[0] == "chat":
+            self._chats[scope[1]] = None
+            self._chats.move_to_end(scope[1])
+            while len(self._chats) > self.max_chats:
+                chat, _ = self._chats.popitem(last=False)
+                self._drop(("chat", chat))
+
+    def _drop(self, scope: tuple[str, str]) -> None:
+        self._stats.pop(scope, None)
+        for metric in METRICS:
+            self._synced_at.pop((*scope, metric), None)
+
+    async def record(self, receipt: dict[str, Any], bucket: str) -> None:
+        scopes = [("all", ""), ("bucket", bucket)]
+        if receipt.get("user_id") is not None:
+            scopes.append(("user", str(receipt["user_id"])))
+        if receipt.get("project_id") is not None:
+            scopes.append(("project", str(receipt["project_id"])))
+        if receipt.get("chat_id") is not None:
+            scopes.append(("chat", str(receipt["chat_id"])))
+        for scope in scopes:
+            self._expire_local(scope)
+        values = {metric: float(receipt[field]) for metric, field in METRICS.items() if receipt.get(field) is not None}
+        for metric, value in values.items():
+            for scope in scopes:
+                per_metric = self._stats.get(scope)
+                if per_metric is None:
+                    per_metric = self._stats[scope] = {}
+                stats = per_metric.get(metric)
+                if stats is None:
+                    stats = per_metric[metric] = RunningStats()
+                stats.add(value)
+        if self._script is not None and values:
+            await asyncio.to_thread(self._record_shared, scopes, values)
+
+    def _record_shared(self, scopes: list[tuple[str, str]], values: dict[str, float]) -> None:
+        for metric, value in values.items():
+            try:
+                self._script(
+                    keys=[self._key(scope, key, metric) for scope, key in scopes],
+                    args=[value, *(self._ttl(scope) for scope, _ in scopes)],
+                )
+            except Exception as e:
+                logger.warning(f"Savings aggregates Redis write failed, counting locally: {e}")
+
+    async def get(self, scope: str, key: str = "", metric: str = "net_savings") -> RunningStats:
+        """Stats for one scope/key/metric (empty stats if nothing recorded); shared totals when Redis is up."""
+        synced = (scope, key, metric)
+        if self._script is not None and time.monotonic() - self._synced_at.get(synced, 0.0) > self.refresh_seconds:
+            try:
+                fields = await asyncio.to_thread(self.client.hgetall, self._key(scope, key, metric))
+            except Exception as e:
+                logger.warning(f"Savings aggregates Redis read failed, using local totals: {e}")
+            else:
+                if fields:
+                    self._stats.setdefault((scope, key), {})[metric] = RunningStats.from_hash(fields)
+                self._synced_at[synced] = time.monotonic()
+        return self._stats.get((scope, key), {}).get(metric) or RunningStats()
+
+    async def summary(self, scope: str, key: str = "") -> dict[str, dict[str, Any]]:
+        return {metric: (await self.get(scope, key, metric)).to_dict() for metric in METRICS}
+
+
+# Process-wide instance fed by receipt_store.set_receipt
+_redis = RedisCache(host=os.getenv("REDIS_HOST", "localhost"), port=int(os.getenv("REDIS_PORT", 6379)))
+savings = SavingsAggregates(_redis.redis_client)
@@ -0,0 +1,115 @@
+"""
+Per-project carbon budget engine.
+
+Receipts feed record() (via receipt_store.set_receipt): grams of CO2 spent,
+and tokens sent are added to atomic counters. Counters live in an
+in-process dict and, when Redis is up, in Redis via INCRBYFLOAT so all workers
+share totals. Budget checks read the local copy and re-sync from Redis at
+most every BUDGET_REFRESH_SECONDS. Redis calls run in a worker thread, never on
+the event loop.
+"""
+import asyncio
+import os
+import time
+from typing import Any
+
+from loguru import logger
+
+from core.redis import RedisCache
+
+PROJECT_CARBON_BUDGET_G = float(os.getenv("PROJECT_CARBON_BUDGET_G", "5000"))
+BUDGET_REFRESH_SECONDS = float(os.getenv("BUDGET_REFRESH_SECONDS", "5"))
+BUDGET_KEY_PREFIX = "budget:"
+
+
+class CounterStore:
+    """Float counters, local with optional Redis write-through."""
+
+    def __init__(self, client=None, refresh_seconds: float = BUDGET_REFRESH_SECONDS):
+        self.client = client
+        self.refresh_seconds = refresh_seconds
+        self._values: dict[str, float] = {}
+        self._synced_at: dict[str, float] = {}
+
+    async def incr(self, key: str, amount: float) -> float:
+        if self.client is not None:
+            return await asyncio.to_thread(self._incr, key, amount)
+        return self._incr(key, amount)
+
+    async def get(self, key: str) -> float:
+        if self.client is not None and time.monotonic() - self._synced_at.get(key, 0.0) > self.refresh_seconds:
+            return await asyncio.to_thread(self._get, key)
+        return self._values.get(key, 0.0)
+
+    def _incr(self, key: str, amount: float) -> float:
+        if self.client is not None:
+            try:
+                value = float(self.client.incrbyfloat(BUDGET_KEY_PREFIX + key, amount))
+                self._values[key] = value
+                self._synced_at[key] = time.monotonic()
+                return value
+            except Exception as e:
+                logger.warning(f"Budget counter Redis write failed, counting locally: {e}")
+        value = self._values.get(key, 0.0) + amount
+        self._values[key] = value
+        return value
+
+    def _get(self, key: str) -> float:
+        if self.client is not None:
+            try:
+                raw = self.client.get(BUDGET_KEY_PREFIX + key)
+                self._values[key] = float(raw) if raw is not None else self._values.get(key, 0.0)
+                self._synced_at[key] = time.monotonic()
+            except Exception as e:
+                logger.warning(f"Budget counter Redis read failed, using local value: {e}")
+        return self._values.get(key, 0.0)
+
+
+class BudgetEngine:
+    """Carbon / token accounting and O(1) budget checks per project."""
+
+    def __init__(self, counters: CounterStore, default_limit_g: float = PROJECT_CARBON_BUDGET_G):
+        self.counters = counters
+        self.default_limit_g = default_limit_g
+        self.limits: dict[str, float] = {}
+
+    def limit_for(self, project_id: str) -> float:
+        return self.limits.get(project_id, self.default_limit_g)
+
+    def set_limit(self, project_id: str, limit_g: float) -> None:
+        self.limits[project_id] = limit_g
+
+    async def record(self, receipt: dict[str, Any]) -> None:
+        """Add one receipt's spend and savings to its project's counters."""
+        project_id = receipt.get("project_id")
+        if project_id is None:
+            return
+        project_id = str(project_id)
+        await asyncio.gather(
+            self.counters.incr(f"co2_g:{project_id}", float(receipt.get("actual_co2") or 0.0)),
+            self.counters.incr(f"tokens:{project_id}", float(receipt.get("tokens") or 0)),
+        )
+
+    async def used_g(self, project_id: str) -> float:
+        return await self.counters.get(f"co2_g:{project_id}")
+
+    async def is_over_budget(self, project_id: str | None) -> bool:
+        if project_id is None:
+            return False
+        return await self.used_g(str(project_id)) >= self.limit_for(str(project_id))
+
+    async def status(self, project_id: str) -> dict[str, Any]:
+        limit_g = self.limit_for(project_id)
+        used_g = await self.used_g(project_id)
+        remaining = max(0.0, (limit_g - used_g) / limit_g * 100) if limit_g > 0 else 0.0
+        return {
+            "limit_g": limit_g,
+            "used_g": round(used_g, 4),
+            "tokens_used": int(await self.counters.get(f"tokens:{project_id}")),
+            "remaining_percent": round(remaining, 1),
+            "policy_active": "Standard" if used_g < limit_g else "Over Budget (deferring)",
+        }
+
+
+_redis = RedisCache(host=os.getenv("REDIS_HOST", "localhost"), port=int(os.getenv("REDIS_PORT", 6379)))
+budget = BudgetEngine(CounterStore(_redis.redis_client))
@@ -13,6 +13,7 @@ import hashlib
 from typing import Optional, Any
 
 from core.redis import RedisCache
+from core.prompt_corpus import prompt_corpus
 
 try:
     from redisvl.extensions.llmcache import SemanticCache
@@ -153,10 +154,25 @@ def check_if_prompt_is_in_cache(prompt: str, semantic_fallback: bool = True) ->
     return None
 
 
-def add_prompt_to_cache(prompt: str, output: Any, use_semantic: bool = True, ttl: Optional[int] = None) -> None:
-    """Add prompt to both exact hash cache and (optionally) semantic cache. No-op if Redis is down."""
+def add_prompt_to_cache(
+    prompt: str,
+    output: Any,
+    use_semantic: bool = True,
+    ttl: Optional[int] = None,
+    compression: Optional[dict] = None,
+) -> None:
+    """Add prompt to both exact hash cache and (optionally) semantic cache. No-op if Redis is down.
+
+    ``compression`` (EcoCompressor.compress output for the prompt) is stored
+    with the response under ``"compression"``, so exact hits can report token
+    stats without compressing the prompt again.
+    """
     if kv_cache is None:
         return
+    if compression is not None and isinstance(output, dict):
+        output = {**output, "compression": compression}
     add_hash_cache(prompt, output, ttl=ttl)
+    # Cached prompts double as the corpus that budget-targeted compression scores terms against
+    prompt_corpus.add(prompt)
     if use_semantic:
         add_semantic_cache(prompt, output)
\ No newline at end of file
@@ -0,0 +1,205 @@
+"""
+Speculative model cascade: answer with the cheapest model, escalate only when needed.
+
+The cheapest power_level "low" model in SERVER_MODEL_MAP answers first. A cheap
+verifier checks the answer: empty, refusal phrases, an unclosed code fence
+(truncated output), too short for a long ask, and optionally a YES/NO judge
+call (CASCADE_JUDGE_MODEL). Only a rejected answer, or an error, is re-asked
+of the "medium" model.
+
+Hedged mode starts the medium model too if the low model has not answered
+within CASCADE_HEDGE_AFTER_SECONDS. The first answer that passes the verifier
+wins, and the other call is cancelled.
+
+Every call is reported (model, role, latency, verdict) so the orchestrator can
+put the carbon and latency effect in the receipt. Escalation counts are kept
+per process.
+"""
+import asyncio
+import os
+import re
+import time
+
+from loguru import logger
+
+from core.router import power_level_models
+
+CASCADE_MODE = os.getenv("CASCADE_MODE", "off")  # off | cascade | hedged
+CASCADE_MODES = ("cascade", "hedged")
+CASCADE_HEDGE_AFTER_SECONDS = float(os.getenv("CASCADE_HEDGE_AFTER_SECONDS", "2.0"))
+CASCADE_JUDGE_MODEL = os.getenv("CASCADE_JUDGE_MODEL", "")
+
+# A prompt this long deserves more than a one-liner
+_LONG_PROMPT_WORDS = 50
+_MIN_ANSWER_WORDS_FOR_LONG_PROMPT = 10
+_REFUSAL = re.compile(
+    r"\b(?:i can(?:'|no)?t (?:help|assist|provide|answer|do that)"
+    r"|i(?:'m| am) (?:unable|not able) to"
+    r"|as an ai(?: language model)?"
+    r"|i don't have (?:access|enough information)"
+    r"|i'm sorry, but)",
+    re.I,
+)
+_JUDGE_PROMPT = (
+    "Question:\n{prompt}\n\nAnswer:\n{answer}\n\n"
+    "Does the answer fully and correctly address the question? Reply with only YES or NO."
+)
+
+
+def check_answer(prompt: str, answer: str) -> str | None:
+    """Reason the answer looks unusable, or None if it passes the cheap checks."""
+    text = answer.strip()
+    if not text:
+        return "empty"
+    if _REFUSAL.search(text[:400]):
+        return "refusal"
+    if text.count("```") % 2:
+        return "truncated"
+    if len(prompt.split()) > _LONG_PROMPT_WORDS and len(text.split()) < _MIN_ANSWER_WORDS_FOR_LONG_PROMPT:
+        return "too_short"
+    return None
+
+
+class Cascade:
+    """Low-tier-first generation with verification and escalation."""
+
+    def __init__(
+        self,
+        client,
+        level_models: dict[str, str] | None = None,
+        hedge_after: float = CASCADE_HEDGE_AFTER_SECONDS,
+        judge_model: str = CASCADE_JUDGE_MODEL,
+    ):
+        self.client = client
+        models = level_models or power_level_models()
+        self.low_model = models.get("low")
+        self.medium_model = models.get("medium") or self.low_model
+        self.hedge_after = hedge_after
+        self.judge_model = judge_model
+        self.runs = 0
+        self.escalations = 0
+
+    @property
+    def escalation_rate(self) -> float:
+        return round(self.escalations / self.runs, 4) if self.runs else 0.0
+
+    async def _attempt(self, prompt: str, model: str, role: str) -> dict:
+        start = time.perf_counter()
+        try:
+            response = await self.client.generate(prompt, model)
+            reason = check_answer(prompt, response)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Cascade {role} call to {model} failed: {e}")
+            response, reason = "", "error"
+        return {
+            "model": model,
+            "role": role,
+            "response": response,
+            "rejected": reason,
+            "latency_ms": round((time.perf_counter() - start) * 1000, 1),
+        }
+
+    async def _judge(self, prompt: str, attempt: dict, calls: list[dict]) -> None:
+        """
+        Optional model judge; marks the attempt rejected on anything but YES, a failed
+        call included. The reply is a verdict, not an answer, so check_answer is not run on it.
+        """
+        if not self.judge_model or attempt["rejected"]:
+            return
+        start = time.perf_counter()
+        try:
+            reply = await self.client.generate(
+                _JUDGE_PROMPT.format(prompt=prompt[:2000], answer=attempt["response"][:4000]), self.judge_model
+            )
+            verdict = None if reply.strip().upper().startswith("YES") else "no"
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Cascade judge call to {self.judge_model} failed: {e}")
+            reply, verdict = "", "error"
+        calls.append({
+            "model": self.judge_model,
+            "role": "judge",
+            "response": reply,
+            "rejected": verdict,
+            "latency_ms": round((time.perf_counter() - start) * 1000, 1),
+        })
+        if verdict is not None:
+            attempt["rejected"] = "judge"
+
+    async def run(self, prompt: str, mode: str = "cascade") -> dict:
+        """
+        Answer prompt via the cascade. Returns response, model (that produced it),
+        escalated, reason (why the low answer was rejected), hedged (medium started
+        early), calls (every LLM call made, including cancelled ones) and latency_ms.
+        Raises RuntimeError if no model produced an answer.
+        """
+        start = time.perf_counter()
+        calls: list[dict] = []
+        tasks: dict[asyncio.Future, str] = {}
+        try:
+            winner, hedged = await self._race(prompt, mode, calls, tasks)
+        finally:
+            # Losers, and everything if the caller was cancelled: stop paying for them
+            for task, role in tasks.items():
+                if not task.done():
+                    task.cancel()
+                    calls.append({"model": self.medium_model if role == "medium" else self.low_model,
+                                  "role": role, "rejected": "cancelled", "latency_ms": None})
+
+        if winner is None:
+            # Nothing passed the verifier: the bigger model's answer, else the low one, beats an error
+            answered = [c for c in calls if c["role"] != "judge" and c.get("response")]
+            answered.sort(key=lambda c: c["role"] != "medium")
+            winner = answered[0] if answered else None
+
+        low_call = next(c for c in calls if c["role"] == "low")
+        escalated = winner is not None and winner["role"] == "medium"
+        self.runs += 1
+        self.escalations += escalated
+        if winner is None:
+            raise RuntimeError("Cascade: no model produced an answer")
+        return {
+            "response": winner["response"],
+            "model": winner["model"],
+            "escalated": escalated,
+            "reason": low_call["rejected"],
+            "hedged": hedged,
+            "calls": [{k: v for k, v in c.items() if k != "response"} for c in calls],
+            "latency_ms": round((time.perf_counter() - start) * 1000, 1),
+        }
+
+    async def _race(self, prompt: str, mode: str, calls: list[dict], tasks: dict) -> tuple[dict | None, bool]:
+        """Run the low model (plus the medium one when hedging or escalating); returns (winner, hedged)."""
+        low = asyncio.ensure_future(self._attempt(prompt, self.low_model, "low"))
+        tasks[low] = "low"
+        can_escalate = self.medium_model != self.low_model
+
+        if mode == "hedged" and can_escalate:
+            done, _ = await asyncio.wait({low}, timeout=self.hedge_after)
+            if not done:
+                medium = asyncio.ensure_future(self._attempt(prompt, self.medium_model, "medium"))
+                tasks[medium] = "medium"
+                pending = {low, medium}
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    # Record every finished attempt (each is charged) before picking a winner
+                    finished = [task.result() for task in done]
+                    calls.extend(finished)
+                    for attempt in finished:
+                        if attempt["role"] == "low":
+                            await self._judge(prompt, attempt, calls)
+                        if attempt["rejected"] is None:
+                            return attempt, True
+                return None, True
+
+        attempt = await low
+        calls.append(attempt)
+        await self._judge(prompt, attempt, calls)
+        if attempt["rejected"] is None or not can_escalate:
+            return (attempt if attempt["rejected"] is None else None), False
+        retry = await self._attempt(prompt, self.medium_model, "medium")
+        calls.append(retry)
+        return (retry if retry["rejected"] is None else None), False
@@ -0,0 +1,262 @@
+"""
+Chat and message store behind /orchestrate and /chat/{chat_id}/history.
+
+append() only buffers the message; a background flusher writes buffered
+messages in batches (every CHAT_FLUSH_INTERVAL_SECONDS or CHAT_WRITE_BATCH
+messages), so the request path never waits on storage. Messages get a per-chat
+sequence number (1, 2, 3, ...) when written; history() pages backwards by seq
+over the (chat_id, seq) index, so every page costs the same however long the
+chat is. A history read for a chat with buffered messages flushes first.
+
+Backends, chosen with CHAT_STORE_BACKEND:
+  memory   — per-process, most recently used CHAT_STORE_MAX_CHATS chats (default)
+  postgres — chats / chat_messages tables (migrations/0007_chat_store.sql)
+"""
+import asyncio
+import os
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any
+
+from loguru import logger
+
+CHAT_STORE_BACKEND = os.getenv("CHAT_STORE_BACKEND", "memory").lower()
+CHAT_STORE_MAX_CHATS = int(os.getenv("CHAT_STORE_MAX_CHATS", "10000"))
+CHAT_WRITE_BATCH = int(os.getenv("CHAT_WRITE_BATCH", "100"))
+CHAT_FLUSH_INTERVAL_SECONDS = float(os.getenv("CHAT_FLUSH_INTERVAL_SECONDS", "0.5"))
+# Buffer cap while the backend is failing; the oldest unwritten messages are dropped past it
+CHAT_MAX_PENDING = int(os.getenv("CHAT_MAX_PENDING", "10000"))
+
+MESSAGE_FIELDS = ("seq", "role", "content", "receipt_id", "created_at")
+
+
+class MemoryChatStore:
+    """In-process chats; the least recently written/read chats are evicted past max_chats."""
+
+    def __init__(self, max_chats: int = CHAT_STORE_MAX_CHATS):
+        self.max_chats = max_chats
+        self._chats: OrderedDict[str, dict[str, Any]] = OrderedDict()
+
+    async def write_batch(self, entries: list[dict[str, Any]]) -> None:
+        for entry in entries:
+            chat = self._chats.get(entry["chat_id"])
+            if chat is None:
+                chat = self._chats[entry["chat_id"]] = {
+                    "user_id": entry["user_id"],
+                    "project_id": entry["project_id"],
+                    "created_at": entry["created_at"],
+                    "messages": [],
+                }
+            self._chats.move_to_end(entry["chat_id"])
+            chat["updated_at"] = entry["created_at"]
+            messages = chat["messages"]
+            messages.append({"seq": len(messages) + 1, **{f: entry[f] for f in MESSAGE_FIELDS if f != "seq"}})
+        while len(self._chats) > self.max_chats:
+            self._chats.popitem(last=False)
+
+    async def page(self, chat_id: str, before_seq: int | None, limit: int) -> list[dict[str, Any]]:
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            return []
+        self._chats.move_to_end(chat_id)
+        messages = chat["messages"]
+        # seq n lives at index n - 1
+        end = len(messages) if before_seq is None else max(0, min(before_seq - 1, len(messages)))
+        return messages[max(0, end - limit):end]
+
+    async def owner(self, chat_id: str) -> str | None:
+        chat = self._chats.get(chat_id)
+        return chat["user_id"] if chat is not None else None
+
+    async def chats_for_user(self, user_id: str, limit: int) -> list[str]:
+        out = []
+        for chat_id in reversed(self._chats):
+            if self._chats[chat_id]["user_id"] == user_id:
+                out.append(chat_id)
+                if len(out) >= limit:
+                    break
+        return out
+
+
+class PostgresChatStore:
+    """Durable chats: one transaction per batch, seq handed out by chats.message_count."""
+
+    # One upsert for every chat in the batch; RETURNING gives each chat's new message_count
+    UPSERT_CHATS_SQL = '''
+        INSERT INTO chats (chat_id, user_id, project_id, created_at, updated_at, message_count)
+        SELECT chat_id, user_id, project_id, ts, ts, n
+        FROM unnest($1::text[], $2::text[], $3::text[], $4::timestamptz[], $5::int[])
+            AS b(chat_id, user_id, project_id, ts, n)
+        ORDER BY chat_id
+        ON CONFLICT (chat_id) DO UPDATE SET
+            updated_at = EXCLUDED.updated_at,
+            message_count = chats.message_count + EXCLUDED.message_count
+        RETURNING chat_id, message_count
+    '''
+    MESSAGE_COLUMNS = ["chat_id", "seq", "role", "content", "receipt_id", "created_at"]
+    PAGE_SQL = '''
+        SELECT seq, role, content, receipt_id, created_at
+        FROM chat_messages
+        WHERE chat_id = $1 AND seq < $2
+        ORDER BY seq DESC
+        LIMIT $3
+    '''
+    USER_CHATS_SQL = "SELECT chat_id FROM chats WHERE user_id = $1 ORDER BY updated_at DESC LIMIT $2"
+    OWNER_SQL = "SELECT user_id FROM chats WHERE chat_id = $1"
+
+    def __init__(self, db=None):
+        if db is None:
+            from core.database import database as db
+        self.db = db
+
+    async def write_batch(self, entries: list[dict[str, Any]]) -> None:
+        by_chat: dict[str, list[dict[str, Any]]] = {}
+        for entry in entries:
+            by_chat.setdefault(entry["chat_id"], []).append(entry)
+        chat_ids = sorted(by_chat)  # fixed lock order across writers
+        pool = await self.db.connect()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                rows = await conn.fetch(
+                    self.UPSERT_CHATS_SQL,
+                    chat_ids,
+                    [by_chat[c][0]["user_id"] for c in chat_ids],
+                    [by_chat[c][0]["project_id"] for c in chat_ids],
+                    [by_chat[c][-1]["created_at"] for c in chat_ids],
+                    [len(by_chat[c]) for c in chat_ids],
+                )
+                records = []
+                for row in rows:
+                    chat_entries = by_chat[row["chat_id"]]
+                    first_seq = row["message_count"] - len(chat_entries) + 1
+                    for seq, e in enumerate(chat_entries, start=first_seq):
+                        records.append((e["chat_id"], seq, e["role"], e["content"], e["receipt_id"], e["created_at"]))
+                await conn.copy_records_to_table("chat_messages", records=records, columns=self.MESSAGE_COLUMNS)
+
+    async def page(self, chat_id: str, before_seq: int | None, limit: int) -> list[dict[str, Any]]:
+        pool = await self.db.connect()
+        rows = await pool.fetch(self.PAGE_SQL, chat_id, before_seq or 2**31 - 1, limit)
+        return [dict(r) for r in reversed(rows)]
+
+    async def owner(self, chat_id: str) -> str | None:
+        pool = await self.db.connect()
+        return await pool.fetchval(self.OWNER_SQL, chat_id)
+
+    async def chats_for_user(self, user_id: str, limit: int) -> list[str]:
+        pool = await self.db.connect()
+        return [r["chat_id"] for r in await pool.fetch(self.USER_CHATS_SQL, user_id, limit)]
+
+
+class ChatStore:
+    """Buffers appends and flushes them to the backend in batches from a background task."""
+
+    def __init__(self, backend, batch_size: int = CHAT_WRITE_BATCH, flush_interval: float = CHAT_FLUSH_INTERVAL_SECONDS):
+        self.backend = backend
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending: list[dict[str, Any]] = []
+        # Batch being written by flush(); out of _pending so the backlog cap never trims it mid-write
+        self._writing: list[dict[str, Any]] = []
+        self._pending_chats: set[str] = set()
+        self._lock = asyncio.Lock()
+        self._wake: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+
+    def append(
+        self,
+        chat_id: str,
+        role: str,
+        content: str,
+        receipt_id: str | None = None,
+        user_id: str | None = None,
+        project_id: str | None = None,
+    ) -> None:
+        """Queue one message; never blocks. Must be called from the event loop."""
+        self._pending.append({
+            "chat_id": chat_id,
+            "user_id": user_id,
+            "project_id": project_id,
+            "role": role,
+            "content": content,
+            "receipt_id": receipt_id,
+            "created_at": datetime.now(timezone.utc),
+        })
+        self._pending_chats.add(chat_id)
+        if len(self._pending) > CHAT_MAX_PENDING:
+            dropped = len(self._pending) - CHAT_MAX_PENDING
+            del self._pending[:dropped]
+            logger.warning(f"Chat store backlog full; dropped {dropped} unwritten message(s)")
+        if self._task is None or self._task.done():
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+        if len(self._pending) >= self.batch_size:
+            self._wake.set()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Write everything buffered so far. Batches are written in append order, one at a time."""
+        async with self._lock:
+            while self._pending:
+                batch = self._writing = self._pending[: self.batch_size]
+                del self._pending[: len(batch)]
+                try:
+                    await self.backend.write_batch(batch)
+                except Exception as e:
+                    # Keep the batch buffered, ahead of newer messages, and retry on the next tick
+                    self._pending[:0] = batch
+                    logger.warning(f"Chat store write failed ({len(batch)} message(s) kept for retry): {e}")
+                    return
+                finally:
+                    self._writing = []
+            self._pending_chats.clear()
+
+    async def history(self, chat_id: str, before_seq: int | None = None, limit: int = 50) -> dict[str, Any]:
+        """
+        One page of messages, oldest first, ending just before before_seq (latest page if None).
+        next_cursor is the before_seq for the previous (older) page, or None at the start of the chat.
+        """
+        if chat_id in self._pending_chats or self._lock.locked():
+            await self.flush()
+        messages = await self.backend.page(chat_id, before_seq, limit)
+        first = messages[0]["seq"] if messages else None
+        return {"messages": messages, "next_cursor": first if first is not None and first > 1 else None}
+
+    async def owner(self, chat_id: str) -> str | None:
+        """user_id the chat was started by, or None for a chat that does not exist yet."""
+        stored = await self.backend.owner(chat_id)
+        if stored is None and chat_id in self._pending_chats:
+            # Not flushed yet: the first buffered message started it
+            return next((e["user_id"] for e in (*self._writing, *self._pending) if e["chat_id"] == chat_id), None)
+        return stored
+
+    async def chats_for_user(self, user_id: str, limit: int = 20) -> list[str]:
+        """Most recently active chat ids for a user."""
+        return await self.backend.chats_for_user(user_id, limit)
+
+    async def close(self) -> None:
+        """Stop the flusher and write what is left (app shutdown)."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+def _make_backend():
+    if CHAT_STORE_BACKEND == "postgres":
+        return PostgresChatStore()
+    return MemoryChatStore()
+
+
+chat_store = ChatStore(_make_backend())
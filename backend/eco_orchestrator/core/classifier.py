@@ -1,5 +1,25 @@
-import re
 import math
+import re
+
+# Features are computed on ASCII bytes when the prompt is ASCII (bytes.translate + split run
+# several times faster than the equivalent str regexes); other prompts use the str patterns.
+# Word characters (re's \w restricted to ASCII) are kept, everything else becomes a space.
+_WORD_BYTES = bytes(range(48, 58)) + bytes(range(65, 91)) + bytes(range(97, 123)) + b"_"
+_NON_WORD_TO_SPACE = bytes(c if c in _WORD_BYTES else 32 for c in range(256))
+# Sentence-ending punctuation -> space so one split() counts the words of every sentence;
+# \x1c-\x1f too, since str.split() treats them as whitespace and bytes.split() does not
+_SENTENCE_END_TO_SPACE = bytes(32 if c in b".!?\x1c\x1d\x1e\x1f" else c for c in range(256))
+# A sentence: a run between [.!?] delimiters holding at least one non-whitespace character
+_SENTENCE_BYTES = re.compile(rb"[^.!?]*[^.!?\s\x1c-\x1f][^.!?]*")
+_SENTENCE = re.compile(r"[^.!?]*[^.!?\s][^.!?]*")
+_SENTENCE_WORD = re.compile(r"[^.!?\s]+")
+_WORD = re.compile(r"\w+")
+
+FEATURE_NAMES = ("code", "keywords", "lexical_density", "avg_sentence_length", "log_words")
+
+# Literal substrings each code pattern needs; a pattern's regex only runs if its prefilter is present
+_CODE_PREFILTERS = [("def",), ("class",), ("import",), ("{", "}", "[", "]"), ("++", "--", "&&", "||"), (";",)]
+
 
 class ComplexityScorer:
     def __init__(self):
@@ -12,7 +32,7 @@ class ComplexityScorer:
             r"(\+\+|--|&&|\|\|)",     # Logical operators
             r"(\w+\s*=\s*\w+;)"       # Semicolon assignments
         ]
-        
+
         # 2. STEM/Reasoning Keywords (Weighted high)
         self.complex_keywords = {
             "analyze": 1.5, "calculate": 2.0, "reason": 1.8,
@@ -21,19 +41,46 @@ class ComplexityScorer:
             "asymptotic": 3.0, "complexity": 1.5
         }
 
-    def _get_lexical_density(self, text: str) -> float:
-        """Unique / Total words. Higher density usually means more info-heavy."""
-        words = re.findall(r'\w+', text.lower())
-        if not words: return 0.0
-        return len(set(words)) / len(words)
+        # Precompiled once, each behind a cheap substring prefilter
+        self._code = [
+            (needles, re.compile(p)) for needles, p in zip(_CODE_PREFILTERS, self.code_patterns)
+        ]
+        # Dict order kept so weights are added in the same order (identical float sums)
+        self._keywords = tuple(self.complex_keywords.items())
+
+    def _has_code(self, text: str) -> bool:
+        for needles, pattern in self._code:
+            if any(n in text for n in needles) and pattern.search(text):
+                return True
+        return False
 
-    def _get_avg_sentence_length(self, text: str) -> float:
-        """Longer sentences usually imply more complex instructions."""
-        sentences = re.split(r'[.!?]+', text)
-        sentences = [s for s in sentences if s.strip()]
-        if not sentences: return 0.0
-        word_counts = [len(s.split()) for s in sentences]
-        return sum(word_counts) / len(sentences)
+    def _add_keywords(self, score: float, lower: str) -> float:
+        """score plus the weights of keywords present as whole whitespace-separated words."""
+        words = None
+        for word, weight in self._keywords:
+            if word in lower:
+                if words is None:
+                    words = set(lower.split())
+                if word in words:
+                    score += weight
+        return score
+
+    def _density_and_sentence_length(self, text: str, lower: str) -> tuple[float, float, int]:
+        """Lexical density (unique / total words), average words per sentence and word count."""
+        try:
+            raw = lower.encode("ascii")
+        except UnicodeEncodeError:
+            raw = None
+        if raw is not None:
+            words = raw.translate(_NON_WORD_TO_SPACE).split()
+            sentences = len(_SENTENCE_BYTES.findall(raw))
+            sentence_words = len(raw.translate(_SENTENCE_END_TO_SPACE).split()) if sentences else 0
+        else:
+            words = _WORD.findall(lower)
+            sentences = len(_SENTENCE.findall(text))
+            sentence_words = len(_SENTENCE_WORD.findall(text)) if sentences else 0
+        density = len(set(words)) / len(words) if words else 0.0
+        return density, (sentence_words / sentences if sentences else 0.0), len(words)
 
     def score(self, text: str) -> dict:
         """
@@ -42,31 +89,25 @@ class ComplexityScorer:
         """
         if not text: return {"total_score": 0.0, "tier": "gemini-2.0-flash"}
 
+        lower = text.lower()
         raw_score = 0.0
-        
-        # A. Structure: Check for code patterns (+3.0 per unique pattern)
-        for pattern in self.code_patterns:
-            if re.search(pattern, text):
-                raw_score += 3.0
-                break # Cap the code bonus
-
-        # B. Vocabulary: Check weighted keywords
-        words = text.lower().split()
-        for word, weight in self.complex_keywords.items():
-            if word in words:
-                raw_score += weight
+
+        # A. Structure: code patterns (+3.0 once, however many match)
+        if self._has_code(text):
+            raw_score += 3.0
+
+        # B. Vocabulary: weighted keywords
+        raw_score = self._add_keywords(raw_score, lower)
 
         # C. Physics: Lexical Density & Sentence Length
-        density = self._get_lexical_density(text)
-        avg_len = self._get_avg_sentence_length(text)
-        
+        density, avg_len, _ = self._density_and_sentence_length(text, lower)
         # Normalize density (0.5-1.0 is common) and length
         raw_score += (density * 5)
         raw_score += (min(avg_len, 50) / 10)
 
         # Final Scaling
         final_score = min(10.0, round(raw_score, 2))
-        
+
         return {
             "total_score": final_score,
             "lexical_density": round(density, 2),
@@ -74,8 +115,34 @@ class ComplexityScorer:
             "tier": "gemini-2.0-flash"  # cheapest; use gemini-2.0-pro for hard prompts when needed
         }
 
+    def features(self, text: str) -> list[float]:
+        """
+        Raw scoring signals as a vector for the learned router (core.router), in
+        FEATURE_NAMES order: code flag, keyword weight, lexical density, average
+        sentence length (capped at 50) and log word count.
+        """
+        if not text:
+            return [0.0] * len(FEATURE_NAMES)
+        lower = text.lower()
+        density, avg_len, n_words = self._density_and_sentence_length(text, lower)
+        return [
+            1.0 if self._has_code(text) else 0.0,
+            self._add_keywords(0.0, lower),
+            density,
+            min(avg_len, 50.0),
+            math.log1p(n_words),
+        ]
+
+    def score_many(self, texts) -> list[dict]:
+        """score() for each text, e.g. to triage a bulk upload or the deferred queue."""
+        score = self.score
+        return [score(text) for text in texts]
+
+
+# Shared scorer: patterns are compiled once per process
+_scorer = ComplexityScorer()
+
+
 # Logic for your endpoint
 def score_complexity(text: str) -> float:
-    scorer = ComplexityScorer()
-    res = scorer.score(text)
-    return res["total_score"]
\ No newline at end of file
+    return _scorer.score(text)["total_score"]
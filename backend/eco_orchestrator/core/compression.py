@@ -1,43 +1,274 @@
+import math
+import os
 import re
+from collections import Counter, OrderedDict
+from typing import Iterable, Iterator
+
+from core.prompt_corpus import prompt_corpus, terms
+from core.segmenter import CODE, PROSE, TRACE, minify_code, minify_trace, segments
+from core.token_counter import count_tokens, count_tokens_many
+
+# Compress results memoized per (prompt, settings); repeated prompts skip the regex and token-count work
+COMPRESSION_CACHE_SIZE = int(os.getenv("COMPRESSION_CACHE_SIZE", "1024"))
+
+# Politeness phrases dropped from prompts (whole words, matched on the lowercased prompt)
+FLUFF_PHRASES = ["please", "kindly", "could you", "would you mind", "i was wondering if", "thank you"]
+STOP_WORDS = frozenset({"the", "a", "an", "is", "of", "to", "for", "in", "with", "on", "at", "by"})
+
+# All phrases in one precompiled alternation. Word boundaries are checked in
+# _drop_fluff rather than with \b: a plain literal alternation scans several
+# times faster in CPython's re, and since every phrase starts with a different
+# letter and no phrase begins at a word boundary inside another, skipping a
+# rejected candidate never hides a real match.
+_FLUFF = re.compile("|".join(re.escape(p) for p in FLUFF_PHRASES))
+_EMAIL = re.compile(r"\S+@\S+\.\S+")
+
+# Inline code inside prose is kept verbatim; budget mode also keeps double-quoted strings
+_INLINE_CODE = re.compile(r"`[^`\n]+`")
+_PROTECTED = re.compile(r"`[^`\n]+`|\"[^\"\n]*\"|\u201c[^\u201d\n]*\u201d")
+# Anything that could start a non-prose segment; prompts without one skip segmentation
+_SEGMENT_HINT = re.compile(r"`|~~~|[{\[]|Traceback|\n[ \t]")
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+|\n+")
+_DIGIT = re.compile(r"\d")
+
+
+def _is_word_char(ch: str) -> bool:
+    # Same definition as re's \w for str patterns
+    return ch.isalnum() or ch == "_"
+
+
+def _drop_fluff(m: re.Match) -> str:
+    s, start, end = m.string, m.start(), m.end()
+    if (start and _is_word_char(s[start - 1])) or (end < len(s) and _is_word_char(s[end])):
+        return m.group()
+    return " "
+
+
+def _mask_token(token: str) -> str:
+    """Email -> [E]; anything from 'http' (plus at least one char) to the end of the token -> [U]."""
+    if "@" in token and _EMAIL.fullmatch(token):
+        return "[E]"
+    i = token.find("http")
+    if i >= 0 and i + 4 < len(token):
+        return token[:i] + "[U]"
+    return token
+
 
 class EcoCompressor:
-    #patterns
-    FLUFF_PATTERNS = [
-        r"\b(please|kindly|could you|would you mind|i was wondering if|thank you)\b",
-        r"\s+", 
-    ]
-    STOP_WORDS = {"the", "a", "an", "is", "of", "to", "for", "in", "with", "on", "at", "by"}
-
-    def __init__(self, aggressive=True):
+    FLUFF_PHRASES = FLUFF_PHRASES
+    STOP_WORDS = STOP_WORDS
+
+    def __init__(self, aggressive=True, cache_size: int = COMPRESSION_CACHE_SIZE):
         self.aggressive = aggressive
+        self.cache_size = cache_size
+        self._memo: OrderedDict[tuple, dict] = OrderedDict()
 
     def telegraphic_compress(self, text: str) -> str:
         """Aggressive compression by stripping high-frequency low-value words."""
-        words = text.split()
-        return " ".join([w for w in words if w.lower() not in self.STOP_WORDS])
-
-    def compress(self, text: str) -> dict:
-        """Returns a compressed version of the string and the savings stats."""
-        original_tokens = len(text.split())
-        
-        # 1. Lowercase and remove politeness
-        compressed = text.lower()
-        for pattern in self.FLUFF_PATTERNS:
-            compressed = re.sub(pattern, " ", compressed).strip()
-            
-        # 2. PII/URL Tokenization
-        compressed = re.sub(r'\S+@\S+\.\S+', '[E]', compressed)
-        compressed = re.sub(r'http\S+', '[U]', compressed)
-
-        # 3. Optional Telegraphic logic
-        if self.aggressive:
-            compressed = self.telegraphic_compress(compressed)
-
-        final_tokens = len(compressed.split())
-        
+        return " ".join([w for w in text.split() if w.lower() not in self.STOP_WORDS])
+
+    def tokens(self, text: str) -> list[str]:
+        """
+        Compressed tokens of text in one tokenization: lowercase, drop fluff,
+        split once, then mask emails/URLs and (if aggressive) drop stop words
+        in the same pass over the tokens.
+        """
+        lowered = _FLUFF.sub(_drop_fluff, text.lower())
+        tokens = lowered.split()
+        stop = self.STOP_WORDS if self.aggressive else ()
+        if "@" in lowered or "http" in lowered:
+            return [
+                _mask_token(t) if "@" in t or "http" in t else t
+                for t in tokens
+                if t not in stop
+            ]
+        if stop:
+            return [t for t in tokens if t not in stop]
+        return tokens
+
+    def compress(self, text: str, model: str | None = None, target: float | None = None) -> dict:
+        """
+        Returns a compressed version of the string and the savings stats (tokens for model's tokenizer).
+        With target set, compresses down to a token budget instead (see compress_to_target).
+        Results are memoized in a bounded LRU (COMPRESSION_CACHE_SIZE entries).
+        """
+        # Keyed like the token-count cache: exact text (segmented output is case and whitespace sensitive)
+        key = (hash(text), len(text), model, target, self.aggressive)
+        memo = self._memo.get(key)
+        if memo is not None:
+            self._memo.move_to_end(key)
+            return dict(memo)
+        if target is not None:
+            result = self.compress_to_target(text, target, model)
+        else:
+            compressed = self.compress_text(text)
+            original_tokens = count_tokens(text, model)
+            final_tokens = count_tokens(compressed, model)
+            result = {
+                "compressed_text": compressed,
+                "original_count": original_tokens,
+                "final_count": final_tokens,
+                "saved_tokens": max(0, original_tokens - final_tokens)
+            }
+        if self.cache_size > 0:
+            self._memo[key] = result
+            if len(self._memo) > self.cache_size:
+                self._memo.popitem(last=False)
+        return dict(result)
+
+    def compress_text(self, text: str) -> str:
+        """Compressed text only (no token counts): prose compressed, code / JSON / traces minified."""
+        if not _SEGMENT_HINT.search(text):
+            return " ".join(self.tokens(text))
+        return "".join(self.compress_stream(text.split("\n")))
+
+    def compress_stream(self, lines: Iterable[str]) -> Iterator[str]:
+        """
+        Compressed output chunk by chunk for an iterable of lines (a file, a log
+        reader, text.split("\n")), in one pass. Prose runs come out as one line
+        of compressed words; code, JSON and traces as minified blocks on their own lines.
+        """
+        prev = None
+        for kind, lang, text in segments(lines):
+            out = self._render(kind, lang, text)
+            if not out:
+                continue
+            if prev is not None:
+                yield " " if kind == PROSE and prev == PROSE else "\n"
+            yield out
+            prev = kind
+
+    def _render(self, kind: str, lang: str, text: str) -> str:
+        if kind == PROSE:
+            return self._prose(text)
+        if kind == CODE:
+            return f"```{lang}\n{minify_code(text, lang)}\n```"
+        if kind == TRACE:
+            return minify_trace(text)
+        return text  # JSON comes out of the segmenter already minified
+
+    def _prose(self, text: str) -> str:
+        if "`" not in text:
+            return " ".join(self.tokens(text))
+        parts, pos = [], 0
+        for m in _INLINE_CODE.finditer(text):
+            parts.extend(self.tokens(text[pos:m.start()]))
+            parts.append(m.group())
+            pos = m.end()
+        parts.extend(self.tokens(text[pos:]))
+        return " ".join(parts)
+
+    def compress_to_target(self, text: str, target: float, model: str | None = None, corpus=None) -> dict:
+        """
+        Budget-targeted compression. target < 1 is the fraction of the original
+        tokens to keep, target >= 1 an absolute token budget.
+
+        Code blocks, JSON and stack traces are kept (minified), inline code and
+        quoted strings verbatim; the prose between them gets the usual treatment, then loses its least informative
+        parts until the budget is met: whole sentences with the lowest
+        information density first, then single words. A word's information is its
+        IDF over the cached-prompt corpus plus its self-information within this
+        prompt (-log of its frequency here), so boilerplate and repetition go
+        first. Words containing digits are never dropped. If the protected spans
+        alone exceed the budget, the result is as small as it can get.
+        """
+        corpus = corpus or prompt_corpus
+        original_tokens = count_tokens(text, model)
+        budget = max(1, round(original_tokens * target)) if target < 1 else int(target)
+
+        # Ordered units: list of words for prose sentences, (is_block, text) for protected spans
+        units: list = []
+        for kind, lang, segment in segments(text.split("\n")):
+            if kind != PROSE:
+                units.append((True, self._render(kind, lang, segment)))
+                continue
+            pos = 0
+            for m in _PROTECTED.finditer(segment):
+                units.extend(self._sentences(segment[pos:m.start()]))
+                units.append((False, m.group()))
+                pos = m.end()
+            units.extend(self._sentences(segment[pos:]))
+        sentences = [u for u in units if isinstance(u, list)]
+
+        # Word scores and per-word token costs (distinct words counted in one batch)
+        keys = {w: (terms(w) or [""])[0] for s in sentences for w in s}
+        tf = Counter(keys[w] for s in sentences for w in s)
+        total_terms = sum(tf.values()) or 1
+        info = {
+            w: math.inf if _DIGIT.search(w) else
+            (corpus.idf(k) + math.log(total_terms / tf[k]) if k else 0.0)
+            for w, k in keys.items()
+        }
+        distinct = list(keys)
+        cost = dict(zip(distinct, count_tokens_many(distinct, model)))
+
+        fixed = sum(count_tokens_many([u[1] for u in units if isinstance(u, tuple)], model))
+        used = fixed + sum(cost[w] for s in sentences for w in s)
+
+        # 1) Whole sentences, lowest mean information first, while that does not undershoot
+        # the budget; sentences holding numbers and the densest sentence always stay
+        dropped: set[int] = set()
+        if used > budget and len(sentences) > 1:
+            density = {
+                i: sum(info[w] for w in s) / len(s)
+                for i, s in enumerate(sentences)
+                if not any(info[w] == math.inf for w in s)
+            }
+            ranked = sorted(density, key=density.get)
+            if len(ranked) == len(sentences):
+                ranked.pop()
+            for i in ranked:
+                size = sum(cost[w] for w in sentences[i])
+                if used - size < budget:
+                    break
+                dropped.add(i)
+                used -= size
+
+        # 2) Single words, least informative first
+        if used > budget:
+            candidates = sorted(
+                (info[w], i, j)
+                for i, s in enumerate(sentences) if i not in dropped
+                for j, w in enumerate(s) if info[w] != math.inf
+            )
+            cut: set[tuple[int, int]] = set()
+            for _, i, j in candidates:
+                if used <= budget:
+                    break
+                cut.add((i, j))
+                used -= cost[sentences[i][j]]
+            sentences = [[w for j, w in enumerate(s) if (i, j) not in cut] for i, s in enumerate(sentences)]
+
+        parts: list[str] = []
+        prev_block = None
+        kept = iter(enumerate(sentences))
+        for u in units:
+            if isinstance(u, tuple):
+                block, out = u
+            else:
+                i, words = next(kept)
+                if i in dropped or not words:
+                    continue
+                block, out = False, " ".join(words)
+            if prev_block is not None:
+                parts.append("\n" if block or prev_block else " ")
+            parts.append(out)
+            prev_block = block
+        compressed = "".join(parts)
+        final_tokens = count_tokens(compressed, model)
         return {
             "compressed_text": compressed,
             "original_count": original_tokens,
             "final_count": final_tokens,
-            "saved_tokens": max(0, original_tokens - final_tokens)
-        }
\ No newline at end of file
+            "saved_tokens": max(0, original_tokens - final_tokens),
+            "target_tokens": budget,
+        }
+
+    def _sentences(self, prose: str) -> list[list[str]]:
+        """Prose split into sentences, each as its compressed words (empty sentences skipped)."""
+        out = []
+        for sentence in _SENTENCE_BREAK.split(prose):
+            words = self.tokens(sentence)
+            if words:
+                out.append(words)
+        return out
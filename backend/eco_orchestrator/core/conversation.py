@@ -0,0 +1,131 @@
+"""
+Server-side conversation context for multi-turn chats.
+
+Clients send only the new prompt plus chat_id; history comes from the chat
+store. Each turn sends the LLM a bounded window instead of the whole chat:
+
+  [rolling summary of old turns] + [older turns, EcoCompressor'd] + [last few turns verbatim]
+
+Turns that no longer fit CONTEXT_TOKEN_BUDGET are folded into the chat's
+rolling summary (compressed text, capped at CONTEXT_SUMMARY_TOKENS). The
+summary is cached per chat together with the last seq it covers, so each turn
+only compresses turns it has not seen yet. Everything is extractive; no extra
+LLM calls are made to summarize.
+"""
+import os
+from collections import OrderedDict
+from typing import Any
+
+from core.compression import EcoCompressor
+from core.token_counter import count_tokens, count_tokens_many
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+CONTEXT_RECENT_MESSAGES = int(os.getenv("CONTEXT_RECENT_MESSAGES", "4"))
+CONTEXT_SUMMARY_TOKENS = int(os.getenv("CONTEXT_SUMMARY_TOKENS", "300"))
+CONTEXT_SUMMARY_CACHE_SIZE = int(os.getenv("CONTEXT_SUMMARY_CACHE_SIZE", "10000"))
+# Messages read per chat-store page while collecting unsummarized turns
+CONTEXT_PAGE_SIZE = 50
+
+ROLE_LABELS = {"user": "User", "assistant": "Assistant"}
+
+
+def _line(role: str, text: str) -> str:
+    return f"{ROLE_LABELS.get(role, role.title())}: {text}"
+
+
+def _cap(text: str, max_tokens: int) -> str:
+    """Keep the opening and the most recent words of an over-long summary."""
+    tokens = count_tokens(text)
+    if tokens <= max_tokens:
+        return text
+    words = text.split()
+    keep = max(2, int(len(words) * max_tokens / tokens))
+    head = keep // 3
+    return " ".join(words[:head] + ["..."] + words[-(keep - head - 1):])
+
+
+class _Summary:
+    __slots__ = ("upto_seq", "text", "folded_tokens")
+
+    def __init__(self, upto_seq: int = 0, text: str = "", folded_tokens: int = 0):
+        self.upto_seq = upto_seq  # last message seq folded into text
+        self.text = text
+        self.folded_tokens = folded_tokens  # raw tokens of everything folded so far
+
+
+class ConversationContext:
+    """Builds the compressed history window sent with each chat turn."""
+
+    def __init__(
+        self,
+        store,
+        compressor: EcoCompressor | None = None,
+        token_budget: int = CONTEXT_TOKEN_BUDGET,
+        recent_messages: int = CONTEXT_RECENT_MESSAGES,
+        summary_tokens: int = CONTEXT_SUMMARY_TOKENS,
+        cache_size: int = CONTEXT_SUMMARY_CACHE_SIZE,
+    ):
+        self.store = store
+        self.compressor = compressor or EcoCompressor()
+        self.token_budget = token_budget
+        self.recent_messages = recent_messages
+        self.summary_tokens = summary_tokens
+        self.cache_size = cache_size
+        self._summaries: OrderedDict[str, _Summary] = OrderedDict()
+
+    async def _unsummarized(self, chat_id: str, after_seq: int) -> list[dict[str, Any]]:
+        """Messages with seq > after_seq, oldest first (pages backwards until it reaches after_seq)."""
+        collected: list[dict[str, Any]] = []
+        before = None
+        while True:
+            page = await self.store.history(chat_id, before_seq=before, limit=CONTEXT_PAGE_SIZE)
+            messages = page["messages"]
+            fresh = [m for m in messages if m["seq"] > after_seq]
+            collected[:0] = fresh
+            if len(fresh) < len(messages) or page["next_cursor"] is None or page["next_cursor"] <= after_seq + 1:
+                return collected
+            before = page["next_cursor"]
+
+    def _fold(self, summary: _Summary, message: dict[str, Any], compressed: str) -> None:
+        joined = f"{summary.text} {_line(message['role'], compressed)}".strip()
+        summary.text = _cap(joined, self.summary_tokens)
+        summary.upto_seq = message["seq"]
+        summary.folded_tokens += count_tokens(message["content"])
+
+    async def build(self, chat_id: str) -> dict[str, Any]:
+        """
+        Context window for the next turn of chat_id.
+        Returns context (text to prepend, "" for a new chat), context_tokens (its size),
+        history_tokens (what re-sending the full history verbatim would cost) and turns.
+        """
+        summary = self._summaries.pop(chat_id, None) or _Summary()
+        messages = await self._unsummarized(chat_id, summary.upto_seq)
+
+        # Oldest first: compressed text for older turns, verbatim for the most recent ones
+        recent_from = max(0, len(messages) - self.recent_messages)
+        texts = [
+            m["content"] if i >= recent_from else self.compressor.compress_text(m["content"])
+            for i, m in enumerate(messages)
+        ]
+        parts = list(zip(messages, texts, count_tokens_many(texts)))
+
+        used = count_tokens(summary.text) + sum(n for _, _, n in parts)
+        while used > self.token_budget and len(parts) > self.recent_messages:
+            m, text, n = parts.pop(0)
+            before = count_tokens(summary.text)
+            self._fold(summary, m, text)
+            used += count_tokens(summary.text) - before - n
+
+        self._summaries[chat_id] = summary
+        while len(self._summaries) > self.cache_size:
+            self._summaries.popitem(last=False)
+
+        lines = [f"Earlier conversation (summary): {summary.text}"] if summary.text else []
+        lines.extend(_line(m["role"], text) for m, text, _ in parts)
+        context = "\n".join(lines)
+        return {
+            "context": context,
+            "context_tokens": count_tokens(context),
+            "history_tokens": summary.folded_tokens + sum(count_tokens_many([m["content"] for m, _, _ in parts])),
+            "turns": summary.upto_seq + len(parts),
+        }
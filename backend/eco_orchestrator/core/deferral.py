@@ -0,0 +1,66 @@
+"""
+Carbon-aware deferral: when should a deferrable LLM call run?
+
+plan_deferral() looks at the zone's forecast curve
+(grid_engine.get_forecast_curve), the task's deadline and its expected energy.
+It picks the point before the deadline with the lowest forecast intensity. It
+defers to that point only when the expected saving over running now is at
+least DEFERRAL_MIN_SAVING_PCT percent and DEFERRAL_MIN_SAVING_G grams. A
+deferred task stores scheduled_at (the trough) and a target_intensity equal to
+the trough's intensity, so the worker also runs it early if the grid gets
+there sooner.
+
+Without a forecast the previous rule applies: defer while intensity is above
+the threshold, then run at the threshold or the deadline.
+"""
+import os
+from datetime import datetime, timezone
+
+DEFERRAL_MIN_SAVING_PCT = float(os.getenv("DEFERRAL_MIN_SAVING_PCT", "10"))
+DEFERRAL_MIN_SAVING_G = float(os.getenv("DEFERRAL_MIN_SAVING_G", "0"))
+
+
+def plan_deferral(
+    current_intensity: float,
+    curve: list[tuple[datetime, float]],
+    deadline: datetime,
+    energy_kwh: float,
+    threshold: float,
+    now: datetime | None = None,
+) -> dict:
+    """
+    Decide run-now vs defer for one task. Returns defer, scheduled_at (None
+    unless deferred), target_intensity, best_at and expected_intensity (the
+    trough before the deadline), expected_saving_g and rule ("forecast" |
+    "threshold").
+    """
+    now = now or datetime.now(timezone.utc)
+    if deadline.tzinfo is None:
+        deadline = deadline.replace(tzinfo=timezone.utc)
+    if not curve:
+        return {
+            "defer": current_intensity > threshold,
+            "scheduled_at": None,
+            "target_intensity": threshold,
+            "best_at": None,
+            "expected_intensity": None,
+            "expected_saving_g": None,
+            "rule": "threshold",
+        }
+
+    best_at, best = now, current_intensity
+    for at, intensity in curve:
+        if now < at <= deadline and intensity < best:
+            best_at, best = at, intensity
+    saving_g = (current_intensity - best) * energy_kwh
+    saving_pct = (current_intensity - best) / current_intensity * 100 if current_intensity > 0 else 0.0
+    defer = best_at > now and saving_pct >= DEFERRAL_MIN_SAVING_PCT and saving_g >= DEFERRAL_MIN_SAVING_G
+    return {
+        "defer": defer,
+        "scheduled_at": best_at if defer else None,
+        "target_intensity": best if defer else threshold,
+        "best_at": best_at if best_at > now else None,
+        "expected_intensity": best,
+        "expected_saving_g": round(saving_g, 6),
+        "rule": "forecast",
+    }
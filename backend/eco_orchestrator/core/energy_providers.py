@@ -236,6 +236,31 @@ def fetch_emaps_latest(zone: str) -> dict | None:
         return None
 
 
+def fetch_emaps_forecast(zone: str) -> list[dict] | None:
+    """
+    Fetch the carbon-intensity forecast for a zone (hourly, typically the next 24h).
+    Returns [{"datetime": ISO, "carbon_intensity_g_per_kwh": float}], or None.
+    """
+    token = _get_emaps_token()
+    if not token:
+        return None
+    try:
+        r = requests.get(
+            f"{EMAPS_BASE}/carbon-intensity/forecast",
+            headers={"auth-token": token},
+            params={"zone": zone},
+            timeout=10,
+        )
+        r.raise_for_status()
+        return [
+            {"datetime": p["datetime"], "carbon_intensity_g_per_kwh": p["carbonIntensity"]}
+            for p in r.json().get("forecast", [])
+            if p.get("carbonIntensity") is not None
+        ] or None
+    except (requests.RequestException, KeyError, ValueError):
+        return None
+
+
 def fetch_emaps_power_breakdown(zone: str) -> dict | None:
     """
     Fetch the latest power generation breakdown for a zone.
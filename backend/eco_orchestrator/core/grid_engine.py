@@ -1,13 +1,15 @@
 # Grid engine: orchestrates API calls, caching, and region selection.
+import asyncio
 import os
 from datetime import datetime, timezone, timedelta
-from typing import Any
+from typing import Any, Callable
 
 from loguru import logger
 from core.redis import RedisCache
 from core.energy_providers import (
     fetch_region_snapshot,
     build_region_snapshot,
+    fetch_emaps_forecast,
     fetch_emaps_latest,
     fetch_emaps_power_breakdown,
     fetch_watttime_index,
@@ -21,6 +23,9 @@ from core.energy_providers import (
 GRID_CACHE_TTL = int(os.getenv("GRID_CACHE_TTL", 600))   # 10 min TTL for Redis key
 GRID_CACHE_THRESHOLD_MINUTES = int(os.getenv("GRID_CACHE_THRESHOLD_MINUTES", "10"))
 GRID_KEY_PREFIX = "grid:"
+GRID_FORECAST_HOURS = int(os.getenv("GRID_FORECAST_HOURS", "24"))
+# A zone with no provider forecast is not asked again for this long
+GRID_FORECAST_MISS_SECONDS = int(os.getenv("GRID_FORECAST_MISS_SECONDS", "300"))
 
 # Module-level Redis instance.  If Redis is down the wrapper
 # returns None / False for every operation — the app still works,
@@ -34,6 +39,20 @@ _redis = RedisCache(
 # In-memory fallback when Redis is disabled (stores fetched_at for threshold check)
 _memory_cache: dict[str, dict] = {}
 
+# Intensity-change subscribers (e.g. the deferred worker). Called as callback(zone, intensity)
+# whenever a zone's carbon intensity differs from the last value this process saw.
+_intensity_listeners: list[Callable[[str, float], None]] = []
+_last_intensity: dict[str, float] = {}
+
+# Per zone, an EWMA of observed intensity for each UTC hour of day: the forecast
+# (same hour as on earlier days) when no provider forecast is available
+_hourly_profile: dict[str, dict[int, float]] = {}
+# Per zone, fetched_at of the last reading folded into the profile (a cache hit repeats it)
+_profiled_at: dict[str, str] = {}
+_PROFILE_ALPHA = 0.3
+# Hours of the day a profile must cover before it is trusted as a forecast
+_PROFILE_MIN_HOURS = 12
+
 
 def _now_iso() -> str:
     return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
@@ -50,12 +69,12 @@ def _parse_fetched_at(data: dict) -> datetime | None:
         return None
 
 
-def _is_cache_fresh(data: dict) -> bool:
-    """True if cached data was fetched within GRID_CACHE_THRESHOLD_MINUTES."""
+def _is_cache_fresh(data: dict, max_age: timedelta | None = None) -> bool:
+    """True if cached data was fetched within max_age (default GRID_CACHE_THRESHOLD_MINUTES)."""
     fetched = _parse_fetched_at(data)
     if fetched is None:
         return False
-    threshold = timedelta(minutes=GRID_CACHE_THRESHOLD_MINUTES)
+    threshold = max_age or timedelta(minutes=GRID_CACHE_THRESHOLD_MINUTES)
     return datetime.now(timezone.utc) - fetched <= threshold
 
 
@@ -81,15 +100,52 @@ def _cache_get(key: str) -> dict | None:
     return None
 
 
-def _cache_set(key: str, data: dict) -> bool:
+def _cache_set(key: str, data: dict, ttl: int = GRID_CACHE_TTL) -> bool:
     """Store snapshot with fetched_at. Use both Redis and memory fallback."""
     if "fetched_at" not in data:
         data = {**data, "fetched_at": _now_iso()}
-    _redis.set(f"{GRID_KEY_PREFIX}{key}", data, ttl=GRID_CACHE_TTL)
+    _redis.set(f"{GRID_KEY_PREFIX}{key}", data, ttl=ttl)
     _memory_cache[key] = data
     return True
 
 
+# ------------------------------------------------------------------
+# Intensity-change notifications
+# ------------------------------------------------------------------
+
+def add_intensity_listener(callback: Callable[[str, float], None]) -> None:
+    """Subscribe to carbon-intensity changes for any zone."""
+    _intensity_listeners.append(callback)
+
+
+def remove_intensity_listener(callback: Callable[[str, float], None]) -> None:
+    if callback in _intensity_listeners:
+        _intensity_listeners.remove(callback)
+
+
+def _observe_intensity(zone: str, intensity: float | None, fetched_at: str | None = None) -> None:
+    """
+    Record the latest intensity for a zone and notify listeners if it changed. The
+    hour-of-day profile takes each reading (by fetched_at) once, in the hour it was fetched.
+    """
+    if intensity is None:
+        return
+    if fetched_at is None or _profiled_at.get(zone) != fetched_at:
+        _profiled_at[zone] = fetched_at
+        at = _parse_fetched_at({"fetched_at": fetched_at}) or datetime.now(timezone.utc)
+        profile = _hourly_profile.setdefault(zone, {})
+        prev = profile.get(at.hour)
+        profile[at.hour] = intensity if prev is None else prev + _PROFILE_ALPHA * (intensity - prev)
+    if _last_intensity.get(zone) == intensity:
+        return
+    _last_intensity[zone] = intensity
+    for callback in list(_intensity_listeners):
+        try:
+            callback(zone, intensity)
+        except Exception as e:
+            logger.warning(f"Grid intensity listener failed: {e}")
+
+
 # ------------------------------------------------------------------
 # Public API
 # ------------------------------------------------------------------
@@ -102,6 +158,8 @@ def get_region_data(em_zone: str, wt_region: str) -> dict:
     """
     cached = _cache_get(em_zone)
     if cached is not None:
+        # Another worker may have refreshed the shared Redis entry
+        _observe_intensity(em_zone, cached.get("carbon_intensity_g_per_kwh"), cached.get("fetched_at"))
         return cached
 
     logger.info(f"Grid API fetch | em_zone={em_zone} | wt_region={wt_region}")
@@ -111,6 +169,7 @@ def get_region_data(em_zone: str, wt_region: str) -> dict:
     _cache_set(em_zone, snapshot)
     intensity = snapshot.get("carbon_intensity_g_per_kwh")
     logger.info(f"Grid API done | zone={em_zone} | carbon_intensity={intensity} | from_cache=False")
+    _observe_intensity(em_zone, intensity, snapshot["fetched_at"])
     return snapshot
 
 
@@ -145,6 +204,51 @@ def get_grid_carbon(em_zone: str, wt_region: str) -> dict:
     }
 
 
+def get_forecast_curve(em_zone: str = DEFAULT_EM_ZONE, horizon_hours: int = GRID_FORECAST_HOURS) -> list[tuple[datetime, float]]:
+    """
+    Forecast carbon intensity for em_zone over the next horizon_hours as
+    (UTC datetime, g/kWh) points in time order. Uses the Electricity Maps
+    forecast (cached like snapshots) when available, else the zone's observed
+    hour-of-day profile once it covers enough of the day. Empty otherwise.
+    A failed or empty fetch is cached for GRID_FORECAST_MISS_SECONDS.
+    Blocks on Redis and the provider: async callers use get_forecast_curve_async.
+    """
+    now = datetime.now(timezone.utc)
+    end = now + timedelta(hours=horizon_hours)
+    key = f"forecast:{em_zone}"
+    cached = _cache_get(key)
+    if cached is not None and cached.get("miss") and not _is_cache_fresh(cached, timedelta(seconds=GRID_FORECAST_MISS_SECONDS)):
+        cached = None
+    points = cached.get("points") if cached is not None else None
+    if points is None:
+        points = fetch_emaps_forecast(em_zone)
+        if points:
+            _cache_set(key, {"points": points})
+        else:
+            _cache_set(key, {"points": [], "miss": True}, ttl=GRID_FORECAST_MISS_SECONDS)
+    if points:
+        curve = []
+        for p in points:
+            at = datetime.fromisoformat(p["datetime"].replace("Z", "+00:00"))
+            if now < at <= end:
+                curve.append((at, float(p["carbon_intensity_g_per_kwh"])))
+        if curve:
+            return curve
+    profile = _hourly_profile.get(em_zone)
+    if profile is None or len(profile) < _PROFILE_MIN_HOURS:
+        return []
+    hour = now.replace(minute=0, second=0, microsecond=0)
+    steps = (hour + timedelta(hours=h) for h in range(1, horizon_hours + 1))
+    return [(at, profile[at.hour]) for at in steps if at.hour in profile]
+
+
+async def get_forecast_curve_async(
+    em_zone: str = DEFAULT_EM_ZONE, horizon_hours: int = GRID_FORECAST_HOURS
+) -> list[tuple[datetime, float]]:
+    """get_forecast_curve in a worker thread, so its Redis read and provider fetch never block the event loop."""
+    return await asyncio.to_thread(get_forecast_curve, em_zone, horizon_hours)
+
+
 def get_default_grid_data() -> dict:
     """
     Returns grid data for the default region (used by orchestrator when no user location).
@@ -0,0 +1,55 @@
+"""
+Time-ordered unique IDs for receipts and chats (ULID layout, Crockford base32).
+
+128 bits = 48-bit Unix ms timestamp | 80 random bits, encoded as 26 characters
+after a short prefix, e.g. "rec_01JAB3...". IDs sort by millisecond, so string
+order == time order to the ms and stores can range-scan by ID instead of
+keeping a separate timestamp index. Within one millisecond the order is random.
+
+The 80 bits are drawn fresh from the OS CSPRNG for every ID: clients see these
+IDs (chat_id, receipt_id), so one must not be derivable from another.
+"""
+import base64
+import secrets
+import time
+from datetime import datetime, timezone
+
+_CROCKFORD = b"0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_TO_CROCKFORD = bytes.maketrans(b"ABCDEFGHIJKLMNOPQRSTUVWXYZ234567", _CROCKFORD)
+_DECODE = {c: i for i, c in enumerate(_CROCKFORD.decode())}
+
+_TIME_BITS = 48
+_RANDOM_BITS = 80
+ID_LENGTH = 26
+
+
+def _encode(value: int) -> str:
+    # 20 bytes = 32 base32 chars; the value uses the low 130 bits, so drop the 6 leading zero chars
+    return base64.b32encode(value.to_bytes(20, "big"))[6:].translate(_TO_CROCKFORD).decode()
+
+
+def new_id(prefix: str = "") -> str:
+    """New time-ordered, unguessable ID, e.g. new_id("rec") -> "rec_01JAB3Q9R8..."."""
+    value = (time.time_ns() // 1_000_000) << _RANDOM_BITS | secrets.randbits(_RANDOM_BITS)
+    return f"{prefix}_{_encode(value)}" if prefix else _encode(value)
+
+
+def id_floor(ts: datetime, prefix: str = "") -> str:
+    """Smallest ID that could be minted at ts: use as an inclusive lower / exclusive upper range bound."""
+    ms = int(ts.timestamp() * 1000)
+    encoded = _encode(ms << _RANDOM_BITS)
+    return f"{prefix}_{encoded}" if prefix else encoded
+
+
+def id_time(id_: str) -> datetime | None:
+    """Creation time encoded in an ID, or None for IDs not minted by new_id (legacy / seed IDs)."""
+    body = id_.rsplit("_", 1)[-1]
+    if len(body) != ID_LENGTH:
+        return None
+    try:
+        ms = 0
+        for ch in body[:10]:
+            ms = ms * 32 + _DECODE[ch]
+    except KeyError:
+        return None
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc)
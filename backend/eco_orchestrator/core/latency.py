@@ -0,0 +1,51 @@
+"""
+Per-model latency histograms for LLM calls.
+
+Buckets grow geometrically (LATENCY_MIN_SECONDS * LATENCY_BUCKET_GROWTH ** i),
+so a quantile costs a walk over about 60 counters and its error is at most one
+bucket (20%). Counts are halved whenever LATENCY_WINDOW samples have been
+recorded, so older latencies count for less and the thresholds follow an
+upstream that gets slower or faster.
+"""
+import math
+import os
+
+LATENCY_WINDOW = int(os.getenv("LATENCY_WINDOW", "1000"))
+LATENCY_MIN_SECONDS = 0.01
+LATENCY_BUCKET_GROWTH = 1.2
+_LATENCY_BUCKETS = 64  # up to ~1 hour
+_LOG_GROWTH = math.log(LATENCY_BUCKET_GROWTH)
+
+
+class LatencyHistogram:
+    """Log-bucketed latency histogram (seconds) with cheap quantiles."""
+
+    __slots__ = ("counts", "count", "window")
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.counts = [0.0] * _LATENCY_BUCKETS
+        self.count = 0.0
+        self.window = window
+
+    def record(self, seconds: float) -> None:
+        if seconds <= LATENCY_MIN_SECONDS:
+            i = 0
+        else:
+            i = min(math.ceil(math.log(seconds / LATENCY_MIN_SECONDS) / _LOG_GROWTH), _LATENCY_BUCKETS - 1)
+        self.counts[i] += 1
+        self.count += 1
+        if self.count >= self.window:
+            self.counts = [c / 2 for c in self.counts]
+            self.count /= 2
+
+    def quantile(self, q: float) -> float:
+        """Upper bound (seconds) of the bucket holding quantile q; 0.0 when empty."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0.0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= target and c:
+                return LATENCY_MIN_SECONDS * LATENCY_BUCKET_GROWTH ** i
+        return LATENCY_MIN_SECONDS * LATENCY_BUCKET_GROWTH ** (_LATENCY_BUCKETS - 1)
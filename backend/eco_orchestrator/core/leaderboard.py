@@ -0,0 +1,323 @@
+"""
+Top-K leaderboard over saved grams of CO2, with rolling windows.
+
+Windows: "all" (all time), "day", "week" and "month" (last 1 / 7 / 30 UTC days).
+Scores are bucketed per UTC day; each window keeps its own sorted structure and
+subtracts a day's bucket when that day rolls out of the window, so reads never
+scan receipts.
+
+Backends:
+  MemoryLeaderboard — in-process indexable skip list per window (O(log n) update,
+                      rank, and top-K in O(log n + k))
+  RedisLeaderboard  — one ZSET per day plus an all-time ZSET; windows are
+                      ZUNIONSTOREd into a short-lived cached key
+
+Leaderboard runs the Redis calls in a worker thread, never on the event loop.
+"""
+import asyncio
+import os
+import random
+from datetime import datetime, timedelta, timezone
+
+from loguru import logger
+
+from core.redis import RedisCache
+
+WINDOW_DAYS: dict[str, int | None] = {"all": None, "day": 1, "week": 7, "month": 30}
+LEADERBOARD_KEY = "leaderboard:saved_g"
+LEADERBOARD_WINDOW_CACHE_SECONDS = int(os.getenv("LEADERBOARD_WINDOW_CACHE_SECONDS", "60"))
+
+
+def _today() -> datetime:
+    return datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _window_name(window: str | None) -> str:
+    return window if window in WINDOW_DAYS else "all"
+
+
+# ------------------------------------------------------------------
+# Indexable skip list (ordered by score desc, then member asc)
+# ------------------------------------------------------------------
+
+
+class _Node:
+    __slots__ = ("member", "score", "forward", "span")
+
+    def __init__(self, member, score: float, level: int):
+        self.member = member
+        self.score = score
+        self.forward: list[_Node | None] = [None] * level
+        self.span = [0] * level
+
+
+class SkipList:
+    """Sorted (score, member) set with rank queries; spans make rank O(log n)."""
+
+    MAX_LEVEL = 32
+    P = 0.25
+
+    def __init__(self):
+        self._head = _Node(None, 0.0, self.MAX_LEVEL)
+        self._level = 1
+        self._length = 0
+        self._rng = random.Random()
+
+    def __len__(self) -> int:
+        return self._length
+
+    def _random_level(self) -> int:
+        level = 1
+        while level < self.MAX_LEVEL and self._rng.random() < self.P:
+            level += 1
+        return level
+
+    @staticmethod
+    def _before(node: _Node, score: float, member) -> bool:
+        return node.score > score or (node.score == score and node.member < member)
+
+    def insert(self, score: float, member) -> None:
+        update: list[_Node] = [self._head] * self.MAX_LEVEL
+        rank = [0] * self.MAX_LEVEL
+        x = self._head
+        for i in range(self._level - 1, -1, -1):
+            rank[i] = 0 if i == self._level - 1 else rank[i + 1]
+            while x.forward[i] is not None and self._before(x.forward[i], score, member):
+                rank[i] += x.span[i]
+                x = x.forward[i]
+            update[i] = x
+        level = self._random_level()
+        if level > self._level:
+            for i in range(self._level, level):
+                rank[i] = 0
+                update[i] = self._head
+                self._head.span[i] = self._length
+            self._level = level
+        node = _Node(member, score, level)
+        for i in range(level):
+            node.forward[i] = update[i].forward[i]
+            update[i].forward[i] = node
+            node.span[i] = update[i].span[i] - (rank[0] - rank[i])
+            update[i].span[i] = (rank[0] - rank[i]) + 1
+        for i in range(level, self._level):
+            update[i].span[i] += 1
+        self._length += 1
+
+    def delete(self, score: float, member) -> bool:
+        update: list[_Node] = [self._head] * self.MAX_LEVEL
+        x = self._head
+        for i in range(self._level - 1, -1, -1):
+            while x.forward[i] is not None and self._before(x.forward[i], score, member):
+                x = x.forward[i]
+            update[i] = x
+        x = x.forward[0]
+        if x is None or x.score != score or x.member != member:
+            return False
+        for i in range(self._level):
+            if update[i].forward[i] is x:
+                update[i].span[i] += x.span[i] - 1
+                update[i].forward[i] = x.forward[i]
+            else:
+                update[i].span[i] -= 1
+        while self._level > 1 and self._head.forward[self._level - 1] is None:
+            self._level -= 1
+        self._length -= 1
+        return True
+
+    def rank(self, score: float, member) -> int | None:
+        """0-based position of (score, member), or None if absent."""
+        traversed = 0
+        x = self._head
+        for i in range(self._level - 1, -1, -1):
+            while x.forward[i] is not None and (
+                self._before(x.forward[i], score, member)
+                or (x.forward[i].score == score and x.forward[i].member == member)
+            ):
+                traversed += x.span[i]
+                x = x.forward[i]
+            if x is not self._head and x.member == member:
+                return traversed - 1
+        return None
+
+    def top(self, k: int) -> list[tuple[str, float]]:
+        out = []
+        x = self._head.forward[0]
+        while x is not None and len(out) < k:
+            out.append((x.member, x.score))
+            x = x.forward[0]
+        return out
+
+
+class SortedScores:
+    """member -> score map mirrored in a SkipList."""
+
+    def __init__(self):
+        self._scores: dict[str, float] = {}
+        self._list = SkipList()
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def incr(self, member: str, amount: float) -> float:
+        old = self._scores.get(member)
+        if old is not None:
+            self._list.delete(old, member)
+        new = (old or 0.0) + amount
+        if abs(new) < 1e-12:
+            # Fully expired from a rolling window
+            self._scores.pop(member, None)
+            return 0.0
+        self._scores[member] = new
+        self._list.insert(new, member)
+        return new
+
+    def score(self, member: str) -> float | None:
+        return self._scores.get(member)
+
+    def rank(self, member: str) -> int | None:
+        score = self._scores.get(member)
+        return None if score is None else self._list.rank(score, member)
+
+    def top(self, k: int) -> list[tuple[str, float]]:
+        return self._list.top(k)
+
+
+# ------------------------------------------------------------------
+# Backends
+# ------------------------------------------------------------------
+
+
+class MemoryLeaderboard:
+    """Per-process leaderboard: daily buckets + one SortedScores per window."""
+
+    def __init__(self):
+        self._buckets: dict[datetime, dict[str, float]] = {}
+        self._windows = {name: SortedScores() for name in WINDOW_DAYS}
+        self._day = _today()
+
+    def _roll(self) -> None:
+        """Subtract buckets that fell out of each rolling window since the last call."""
+        today = _today()
+        if today == self._day:
+            return
+        for name, days in WINDOW_DAYS.items():
+            if days is None:
+                continue
+            scores = self._windows[name]
+            old_start = self._day - timedelta(days=days - 1)
+            new_start = today - timedelta(days=days - 1)
+            for day, bucket in self._buckets.items():
+                if old_start <= day < new_start:
+                    for member, amount in bucket.items():
+                        scores.incr(member, -amount)
+        keep_from = today - timedelta(days=max(d for d in WINDOW_DAYS.values() if d) - 1)
+        self._buckets = {day: b for day, b in self._buckets.items() if day >= keep_from}
+        self._day = today
+
+    def record(self, member: str, amount: float) -> None:
+        self._roll()
+        bucket = self._buckets.setdefault(self._day, {})
+        bucket[member] = bucket.get(member, 0.0) + amount
+        for scores in self._windows.values():
+            scores.incr(member, amount)
+
+    def top(self, k: int, window: str = "all") -> list[tuple[str, float]]:
+        self._roll()
+        return self._windows[_window_name(window)].top(k)
+
+    def rank(self, member: str, window: str = "all") -> tuple[int | None, float | None]:
+        self._roll()
+        scores = self._windows[_window_name(window)]
+        return scores.rank(member), scores.score(member)
+
+
+class RedisLeaderboard:
+    """Shared leaderboard: all-time ZSET + per-day ZSETs, windows unioned on read and cached."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def _day_key(self, day: datetime) -> str:
+        return f"{LEADERBOARD_KEY}:day:{day.strftime('%Y-%m-%d')}"
+
+    def _window_key(self, window: str) -> str:
+        days = WINDOW_DAYS[_window_name(window)]
+        if days is None:
+            return LEADERBOARD_KEY
+        key = f"{LEADERBOARD_KEY}:window:{window}:{_today().strftime('%Y-%m-%d')}"
+        if not self.client.exists(key):
+            today = _today()
+            day_keys = [self._day_key(today - timedelta(days=i)) for i in range(days)]
+            pipe = self.client.pipeline()
+            pipe.zunionstore(key, day_keys)
+            pipe.expire(key, LEADERBOARD_WINDOW_CACHE_SECONDS)
+            pipe.execute()
+        return key
+
+    def record(self, member: str, amount: float) -> None:
+        day_key = self._day_key(_today())
+        pipe = self.client.pipeline()
+        pipe.zincrby(LEADERBOARD_KEY, amount, member)
+        pipe.zincrby(day_key, amount, member)
+        pipe.expire(day_key, (max(d for d in WINDOW_DAYS.values() if d) + 1) * 86400)
+        pipe.execute()
+
+    def top(self, k: int, window: str = "all") -> list[tuple[str, float]]:
+        key = self._window_key(window)
+        return [(m, float(s)) for m, s in self.client.zrevrange(key, 0, k - 1, withscores=True)]
+
+    def rank(self, member: str, window: str = "all") -> tuple[int | None, float | None]:
+        key = self._window_key(window)
+        pipe = self.client.pipeline()
+        pipe.zrevrank(key, member)
+        pipe.zscore(key, member)
+        rank, score = pipe.execute()
+        return rank, (float(score) if score is not None else None)
+
+
+class Leaderboard:
+    """Redis-backed when available, with the in-process board as fallback on Redis errors."""
+
+    def __init__(self, client=None):
+        self._memory = MemoryLeaderboard()
+        self._redis = RedisLeaderboard(client) if client is not None else None
+
+    async def record(self, member: str, amount: float) -> None:
+        self._memory.record(member, amount)
+        if self._redis is not None:
+            try:
+                await asyncio.to_thread(self._redis.record, member, amount)
+            except Exception as e:
+                logger.warning(f"Leaderboard Redis write failed: {e}")
+
+    async def top(self, k: int = 10, window: str = "all") -> list[dict]:
+        rows = None
+        if self._redis is not None:
+            try:
+                rows = await asyncio.to_thread(self._redis.top, k, window)
+            except Exception as e:
+                logger.warning(f"Leaderboard Redis read failed, using local board: {e}")
+        if rows is None:
+            rows = self._memory.top(k, window)
+        return [{"name": m, "saved_kg": round(s / 1000, 4)} for m, s in rows]
+
+    async def rank(self, member: str, window: str = "all") -> dict:
+        result = None
+        if self._redis is not None:
+            try:
+                result = await asyncio.to_thread(self._redis.rank, member, window)
+            except Exception as e:
+                logger.warning(f"Leaderboard Redis read failed, using local board: {e}")
+        if result is None:
+            result = self._memory.rank(member, window)
+        rank, score = result
+        return {
+            "name": member,
+            "window": _window_name(window),
+            "rank": rank + 1 if rank is not None else None,
+            "saved_kg": round(score / 1000, 4) if score is not None else 0.0,
+        }
+
+
+_redis = RedisCache(host=os.getenv("REDIS_HOST", "localhost"), port=int(os.getenv("REDIS_PORT", 6379)))
+leaderboard = Leaderboard(_redis.redis_client)
@@ -1,15 +1,51 @@
 import asyncio
 import json
 import os
+import random
 import subprocess
 from pathlib import Path
 
 import requests
 import vertexai
+from google.cloud import aiplatform_v1
 from vertexai.generative_models import GenerativeModel
 from anthropic import AnthropicVertex
 from loguru import logger
 
+from core.latency import LatencyHistogram
+from core.rate_limit import RATE_LIMIT_OUTPUT_TOKENS, rate_limiter
+from core.scheduler import slot_released
+from core.token_counter import count_tokens
+
+# Whole-call budget for generate(), retries and hedges included
+LLM_DEADLINE_SECONDS = float(os.getenv("LLM_DEADLINE_SECONDS", "90"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_RETRY_BASE_SECONDS = float(os.getenv("LLM_RETRY_BASE_SECONDS", "0.5"))
+# Hedging: a backup call starts once the primary outlives this latency quantile of its model
+LLM_HEDGE = os.getenv("LLM_HEDGE", "true").lower() in ("1", "true", "yes")
+LLM_HEDGE_QUANTILE = float(os.getenv("LLM_HEDGE_QUANTILE", "0.95"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_HEDGE_DEFAULT_SECONDS = float(os.getenv("LLM_HEDGE_DEFAULT_SECONDS", "10"))
+
+# Upstream errors worth another try: rate limits, overload, timeouts, dropped connections
+_RETRYABLE_STATUS = frozenset({408, 429, 500, 502, 503, 504})
+_RETRYABLE_ERRORS = frozenset({
+    "ResourceExhausted", "ServiceUnavailable", "DeadlineExceeded", "InternalServerError", "TooManyRequests",
+    "RateLimitError", "APIConnectionError", "APITimeoutError",
+    "ConnectionError", "Timeout", "TimeoutError",
+})
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """True for transient upstream failures (checks the provider error a RuntimeError wraps)."""
+    cause = exc.__cause__ or exc
+    status = getattr(cause, "status_code", None) or getattr(getattr(cause, "response", None), "status_code", None)
+    if status is None:
+        status = getattr(cause, "code", None)  # google.api_core errors carry the HTTP status as .code
+    if isinstance(status, int) and status in _RETRYABLE_STATUS:
+        return True
+    return any(cls.__name__ in _RETRYABLE_ERRORS for cls in type(cause).__mro__)
+
 # Load server model map once at module level
 _MAP_PATH = Path(__file__).resolve().parent.parent / "server_model_map.json"
 try:
@@ -24,7 +60,7 @@ class LLMClient:
     """Multi-provider, region-aware LLM client.
 
     Routes to the correct SDK based on model prefix:
-      gemini*  → Vertex AI GenerativeModel
+      gemini*  → Vertex AI GenerativeModel (other regions: a PredictionServiceClient per region)
       claude*  → AnthropicVertex
       meta/*   → Vertex AI OpenAPI (chat/completions)
     """
@@ -33,9 +69,15 @@ class LLMClient:
     DEFAULT_MODEL = "gemini-2.0-flash"
 
     def __init__(self):
+        # Successful call latencies per resolved model id; they set the hedge thresholds
+        self.latency: dict[str, LatencyHistogram] = {}
+        # RPM / TPM buckets per (model, region); calls queue in _call until admitted
+        self.limiter = rate_limiter
         self._project = os.getenv("GOOGLE_CLOUD_PROJECT", "sorcer-hackathon")
         self._default_location = os.getenv("VERTEX_LOCATION",
                                            os.getenv("DEFAULT_VERTEX_REGION", "us-central1"))
+        # Gemini clients bound to one regional endpoint each (hedges and region shifts outside the default)
+        self._gemini_clients: dict[str, aiplatform_v1.PredictionServiceClient] = {}
         try:
             vertexai.init(project=self._project, location=self._default_location)
             logger.info(f"✓ Vertex AI SDK initialized (project={self._project}, location={self._default_location})")
@@ -46,12 +88,105 @@ class LLMClient:
     # Provider dispatch
     # ------------------------------------------------------------------
 
-    async def generate(self, prompt: str, model_name: str, location: str | None = None) -> str:
-        """Generate a response, routing to the correct provider."""
+    async def generate(
+        self, prompt: str, model_name: str, location: str | None = None, deadline: float | None = None
+    ) -> str:
+        """
+        Generate a response, routing to the correct provider.
+
+        Retryable errors are retried with jittered exponential backoff and slow
+        calls are hedged (_hedged), all within deadline seconds
+        (LLM_DEADLINE_SECONDS). Raises RuntimeError once that is used up.
+        """
+        budget = deadline or LLM_DEADLINE_SECONDS
+        loop = asyncio.get_running_loop()
+        deadline_at = loop.time() + budget
+        attempt = 0
+        while True:
+            try:
+                return await asyncio.wait_for(
+                    self._hedged(prompt, model_name, location, deadline_at), deadline_at - loop.time()
+                )
+            except asyncio.TimeoutError as e:
+                raise RuntimeError(f"LLM generation failed: no answer within the {budget:g}s deadline") from e
+            except Exception as e:
+                if attempt >= LLM_MAX_RETRIES or not is_retryable(e):
+                    raise
+                # Full jitter: callers that failed together do not retry together
+                delay = random.uniform(0, LLM_RETRY_BASE_SECONDS * 2 ** attempt)
+                if loop.time() + delay >= deadline_at:
+                    raise
+                attempt += 1
+                logger.warning(f"LLM retry {attempt}/{LLM_MAX_RETRIES} for {model_name} in {delay:.2f}s: {e}")
+                await asyncio.sleep(delay)
+
+    async def _hedged(self, prompt: str, model_name: str, location: str | None, deadline_at: float) -> str:
+        """
+        One attempt. The rate limiter admits it first, so time spent queued for
+        a token never counts towards the hedge; the caller's scheduler slot is
+        given up while it queues. If the call has not answered
+        within its model's p95 latency (hedge_delay), the same prompt goes to
+        backup_target as well, but only if that target has rate-limit room now;
+        the first success wins and the other call is cancelled. A cancelled
+        provider call running in a worker thread finishes there, but its result
+        is dropped.
+        """
         resolved = self._resolve_model(model_name, location)
         loc = location or self._default_location
+        tokens = self._call_tokens(prompt, resolved)
+        if await self.limiter.try_acquire(resolved, loc, tokens) > 0.0:
+            # Queued for a token: the scheduler slot serves other calls meanwhile
+            async with slot_released():
+                waited = await self.limiter.acquire(resolved, loc, tokens)
+            logger.info(f"LLM rate limit | {resolved}@{loc} queued {waited:.2f}s")
+        primary = asyncio.ensure_future(self._call(prompt, resolved, loc))
+        backup_target = self.backup_target(resolved, loc) if LLM_HEDGE else None
+        if backup_target is None:
+            return await primary
+
+        tasks = [primary]
+        try:
+            loop = asyncio.get_running_loop()
+            delay = min(self.hedge_delay(resolved), max(deadline_at - loop.time(), 0.0))
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done:
+                return primary.result()
+            if await self.limiter.try_acquire(*backup_target, self._call_tokens(prompt, backup_target[0])) > 0.0:
+                # A hedge that would queue for a token arrives too late to help
+                logger.info(f"LLM hedge skipped | {backup_target[0]}@{backup_target[1]} rate limited")
+                return await primary
+            logger.info(f"LLM hedge | {resolved}@{loc} slower than {delay:.2f}s, backup → {backup_target[0]}@{backup_target[1]}")
+            tasks.append(asyncio.ensure_future(self._call(prompt, *backup_target)))
+            pending, error = set(tasks), None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    @staticmethod
+    def _call_tokens(prompt: str, resolved: str) -> int:
+        """Tokens one call is charged by the rate limiter: the prompt plus the expected output."""
+        return count_tokens(prompt, resolved) + RATE_LIMIT_OUTPUT_TOKENS
+
+    async def _call(self, prompt: str, resolved: str, loc: str) -> str:
+        """Single provider call, already admitted by the rate limiter; records its latency when it succeeds."""
         logger.info(f"LLM generate | model={resolved} | region={loc} | prompt_len={len(prompt)}")
+        start = asyncio.get_running_loop().time()
+        response = await self._dispatch(prompt, resolved, loc)
+        hist = self.latency.get(resolved)
+        if hist is None:
+            hist = self.latency[resolved] = LatencyHistogram()
+        hist.record(asyncio.get_running_loop().time() - start)
+        return response
 
+    async def _dispatch(self, prompt: str, resolved: str, loc: str) -> str:
         if resolved.startswith("claude"):
             return await self._call_claude(prompt, resolved, loc)
         elif resolved.startswith("meta/"):
@@ -69,20 +204,30 @@ class LLMClient:
 
     async def _call_gemini(self, prompt: str, model_id: str, location: str) -> str:
         try:
-            if location != self._default_location:
-                vertexai.init(project=self._project, location=location)
-
-            model = GenerativeModel(model_id)
-            response = await asyncio.to_thread(lambda: model.generate_content(prompt))
-
-            if location != self._default_location:
-                vertexai.init(project=self._project, location=self._default_location)
+            if location == self._default_location:
+                model = GenerativeModel(model_id)
+                response = await asyncio.to_thread(lambda: model.generate_content(prompt))
+                return response.text
 
-            return response.text
+            # Never re-point vertexai's process-wide location: concurrent and cancelled calls would leak it
+            request = aiplatform_v1.GenerateContentRequest(
+                model=f"projects/{self._project}/locations/{location}/publishers/google/models/{model_id}",
+                contents=[aiplatform_v1.Content(role="user", parts=[aiplatform_v1.Part(text=prompt)])],
+            )
+            response = await asyncio.to_thread(self._gemini_client(location).generate_content, request=request)
+            return "".join(part.text for part in response.candidates[0].content.parts)
         except Exception as e:
             logger.error(f"Gemini call failed ({model_id}@{location}): {e}")
             raise RuntimeError(f"LLM generation failed: {e}") from e
 
+    def _gemini_client(self, location: str) -> aiplatform_v1.PredictionServiceClient:
+        client = self._gemini_clients.get(location)
+        if client is None:
+            client = self._gemini_clients[location] = aiplatform_v1.PredictionServiceClient(
+                client_options={"api_endpoint": f"{location}-aiplatform.googleapis.com"}
+            )
+        return client
+
     # ------------------------------------------------------------------
     # Claude (Anthropic on Vertex AI)
     # ------------------------------------------------------------------
@@ -141,6 +286,11 @@ class LLMClient:
     # Region / model helpers
     # ------------------------------------------------------------------
 
+    @property
+    def default_location(self) -> str:
+        """Region calls go to when no location is given."""
+        return self._default_location
+
     def get_available_models(self, region: str | None = None) -> list[dict]:
         """Return models available in a region (or all regions if None)."""
         if not region:
@@ -155,6 +305,43 @@ class LLMClient:
         return [{"model_id": m["id"], "provider": m["provider"], "power_level": m["power_level"]}
                 for m in rdata.get("available_models", [])]
 
+    def expected_wait(self, prompt_tokens: int, model_name: str, location: str | None = None) -> float:
+        """Seconds a call would queue for the rate limiter right now (estimate from local state)."""
+        loc = location or self._default_location
+        return self.limiter.expected_wait(
+            self._resolve_model(model_name, location), loc, prompt_tokens + RATE_LIMIT_OUTPUT_TOKENS
+        )
+
+    def hedge_delay(self, model_id: str) -> float:
+        """Seconds to wait before hedging a call to model_id: its p95 latency once known."""
+        hist = self.latency.get(model_id)
+        if hist is None or hist.count < LLM_HEDGE_MIN_SAMPLES:
+            return LLM_HEDGE_DEFAULT_SECONDS
+        return hist.quantile(LLM_HEDGE_QUANTILE)
+
+    def backup_target(self, model_id: str, location: str) -> tuple[str, str] | None:
+        """
+        Where to send a hedge: the same model in another region (highest
+        cfe_percent first), else another model of the same power level in the
+        same region. None if neither exists.
+        """
+        others = sorted(
+            (r for r in SERVER_MODEL_MAP if r != location),
+            key=lambda r: SERVER_MODEL_MAP[r].get("cfe_percent", 0),
+            reverse=True,
+        )
+        for region in others:
+            if any(m["id"] == model_id for m in SERVER_MODEL_MAP[region].get("available_models", [])):
+                return model_id, region
+        power = next(
+            (m["power_level"] for rd in SERVER_MODEL_MAP.values() for m in rd.get("available_models", []) if m["id"] == model_id),
+            None,
+        )
+        for m in SERVER_MODEL_MAP.get(location, {}).get("available_models", []):
+            if m["id"] != model_id and m["power_level"] == power:
+                return m["id"], location
+        return None
+
     def _resolve_model(self, model_name: str, location: str | None = None) -> str:
         """Pick the best model for the given region, falling back gracefully."""
         if not location:
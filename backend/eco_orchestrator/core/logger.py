@@ -6,6 +6,9 @@ class GreenLogger:
         self.WH_PER_TOKEN_PRO = float(os.getenv("WH_PER_TOKEN_PRO", "0.01"))  # Energy cost for Gemini Pro
         self.WH_PER_TOKEN_FLASH = float(os.getenv("WH_PER_TOKEN_FLASH", "0.001"))  # Energy cost for Gemini Flash
 
+    def wh_per_token(self, model: str) -> float:
+        return self.WH_PER_TOKEN_FLASH if "flash" in model else self.WH_PER_TOKEN_PRO
+
     def calculate_savings(self, stats: dict, grid_intensity: float):
         """
         Input: stats from compression and triage
@@ -17,7 +20,7 @@ class GreenLogger:
         baseline_co2 = (baseline_wh / 1000) * 450  # 450 is standard 'Dirty' avg
         
         # 2. Calculate the 'Eco' actual spend
-        model_rate = self.WH_PER_TOKEN_FLASH if "flash" in stats['model'] else self.WH_PER_TOKEN_PRO
+        model_rate = self.wh_per_token(stats['model'])
         actual_wh = stats['final_tokens'] * model_rate
         actual_co2 = (actual_wh / 1000) * grid_intensity
         
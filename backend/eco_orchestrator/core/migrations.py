@@ -0,0 +1,69 @@
+"""
+Minimal SQL migration runner for the Postgres schema.
+
+Migrations are numbered ``migrations/NNNN_name.sql`` files applied in order and
+recorded in ``schema_migrations``. Each file runs in its own transaction unless
+its first line is ``-- migrate: no-transaction`` (needed for CREATE INDEX
+CONCURRENTLY); such files are split on ``;`` and run statement by statement.
+"""
+from pathlib import Path
+
+import asyncpg
+from loguru import logger
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "migrations"
+NO_TRANSACTION_MARKER = "-- migrate: no-transaction"
+# Serializes concurrent runners (e.g. several app instances starting at once)
+MIGRATION_LOCK_ID = 727_001
+
+SCHEMA_MIGRATIONS_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version TEXT PRIMARY KEY,
+    applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+"""
+
+
+def list_migrations(migrations_dir: Path = MIGRATIONS_DIR) -> list[tuple[str, Path]]:
+    """Return (version, path) for every migration file, sorted by version."""
+    return sorted((p.stem, p) for p in migrations_dir.glob("*.sql"))
+
+
+async def applied_versions(conn: asyncpg.Connection) -> set[str]:
+    await conn.execute(SCHEMA_MIGRATIONS_TABLE)
+    rows = await conn.fetch("SELECT version FROM schema_migrations")
+    return {r["version"] for r in rows}
+
+
+def _split_statements(sql: str) -> list[str]:
+    lines = [ln for ln in sql.splitlines() if not ln.strip().startswith("--")]
+    return [stmt.strip() for stmt in "\n".join(lines).split(";") if stmt.strip()]
+
+
+async def apply_migration(conn: asyncpg.Connection, version: str, sql: str) -> None:
+    if sql.lstrip().startswith(NO_TRANSACTION_MARKER):
+        # Statements must be idempotent (IF NOT EXISTS): a crash mid-file re-runs the whole file
+        for stmt in _split_statements(sql):
+            await conn.execute(stmt)
+        await conn.execute("INSERT INTO schema_migrations (version) VALUES ($1)", version)
+        return
+    async with conn.transaction():
+        await conn.execute(sql)
+        await conn.execute("INSERT INTO schema_migrations (version) VALUES ($1)", version)
+
+
+async def run_migrations(conn: asyncpg.Connection, migrations_dir: Path = MIGRATIONS_DIR) -> list[str]:
+    """Apply all pending migrations in order. Returns the versions applied."""
+    await conn.execute("SELECT pg_advisory_lock($1)", MIGRATION_LOCK_ID)
+    try:
+        done = await applied_versions(conn)
+        applied = []
+        for version, path in list_migrations(migrations_dir):
+            if version in done:
+                continue
+            logger.info(f"Applying migration {version}")
+            await apply_migration(conn, version, path.read_text(encoding="utf-8"))
+            applied.append(version)
+        return applied
+    finally:
+        await conn.execute("SELECT pg_advisory_unlock($1)", MIGRATION_LOCK_ID)
@@ -2,30 +2,45 @@ import os
 from datetime import datetime, timedelta, timezone
 
 from core.compression import EcoCompressor
-from core.classifier import ComplexityScorer
+from core.router import log_route, router
+from core.cascade import CASCADE_MODE, CASCADE_MODES, Cascade, check_answer
 from core.llm_client import LLMClient
+from core.rate_limit import RATE_LIMIT_QUEUE_SECONDS
+from core.scheduler import scheduler
 from core.logger import GreenLogger
 from core.cache import check_if_prompt_is_in_cache, add_prompt_to_cache
-from core.database import EcoDatabase
-from core.receipt_store import set_receipt as store_receipt
+from core.database import database
+from core.receipt_store import RECEIPT_ID_PREFIX, set_receipt as store_receipt
+from core.ids import new_id
+from core.budget import budget
+from core.chat_store import chat_store
+from core.conversation import ConversationContext
+from core.token_counter import count_tokens
 from loguru import logger
-from core.grid_engine import get_default_grid_data
+from core.grid_engine import get_default_grid_data, get_forecast_curve_async
+from core.deferral import plan_deferral
+from core.region_shift import REGION_SHIFT, RegionPlanner, live_region_intensities, region_receipt
 
 
 class EcoOrchestrator:
     def __init__(self):
         self.compressor = EcoCompressor()
-        self.scorer = ComplexityScorer()
+        self.router = router
+        self.scorer = router.scorer
         self.client = LLMClient()
         self.logger = GreenLogger()
         self.ledger = {}
-        self.db = EcoDatabase()
+        self.db = database
+        self.conversation = ConversationContext(chat_store, self.compressor)
+        self.cascade = Cascade(self.client)
+        self.scheduler = scheduler
 
     async def process(self, req):
         # Bypass: direct LLM, no eco logic
         if getattr(req, "bypass_eco", False):
-            original_tokens = len(req.prompt.split())
-            raw = await self.client.raw_llm_generate(req.prompt, "gemini-2.0-flash")
+            original_tokens = count_tokens(req.prompt, "gemini-2.0-flash")
+            async with self._slot(req, original_tokens):
+                raw = await self.client.raw_llm_generate(req.prompt, "gemini-2.0-flash")
             return {
                 "status": "complete",
                 "response": raw,
@@ -36,12 +51,20 @@ class EcoOrchestrator:
                 "compressed_prompt": req.prompt,
             }
 
-        # 0: Check cache (hash then semantic)
-        cached = check_if_prompt_is_in_cache(req.prompt)
+        # Multi-turn: earlier turns of this chat, compressed into a bounded window ("" for a new chat)
+        chat_id = getattr(req, "chat_id", None)
+        convo = await self.conversation.build(chat_id) if chat_id else None
+        has_history = bool(convo and convo["context"])
+
+        # 0: Check cache (hash then semantic); a follow-up's answer depends on the chat, so skip it then
+        cached = None if has_history else check_if_prompt_is_in_cache(req.prompt)
+        target = getattr(req, "compression_target", None)
         if cached is not None:
-            # Still run compression to report token stats even on cache hits
-            comp_cached = self.compressor.compress(req.prompt)
             cache_type = cached.pop("_cache_type", "hash")  # injected by cache layer
+            # Token stats for the response: stored with exact-match entries, so no compression on the hit path
+            comp_cached = cached.pop("compression", None)
+            if cache_type != "hash" or not comp_cached or comp_cached.get("target") != target:
+                comp_cached = self.compressor.compress(req.prompt, target=target)
             return {
                 "status": "complete",
                 "response": cached.get("response", ""),
@@ -54,12 +77,23 @@ class EcoOrchestrator:
                 "compressed_prompt": comp_cached["compressed_text"],
             }
 
-        # 1: Compress
-        comp = self.compressor.compress(req.prompt)
+        # 1: Compress (to the requested token budget when compression_target is set)
+        comp = self.compressor.compress(req.prompt, target=target)
+        llm_prompt = comp["compressed_text"]
+        original_tokens, final_tokens = comp["original_count"], comp["final_count"]
+        if has_history:
+            # Baseline is the client re-sending the whole chat verbatim
+            llm_prompt = f"{convo['context']}\nUser: {llm_prompt}"
+            original_tokens += convo["history_tokens"]
+            final_tokens += convo["context_tokens"]
 
-        # 2: Triage (temporary: force cheapest model for testing)
-        triage = self.scorer.score(comp["compressed_text"])
-        tier = "gemini-2.0-flash"  # cheapest (new API); revert to triage["tier"] for production
+        # 2: Triage: the learned router picks the cheapest power level expected to handle the prompt.
+        # Features come from the prompt as the user wrote it, the same text train_router.py scores.
+        route = self.router.route(req.prompt)
+        tier = route["model"]
+        # Cascade mode: prompts routed to the cheapest level are answered low-first and escalated only on a bad answer
+        cascade_mode = getattr(req, "cascade", None) or CASCADE_MODE
+        use_cascade = cascade_mode in CASCADE_MODES and route["power_level"] == "low"
 
         # 3: Grid + optional deferral (data-driven: cache + API, fallback when APIs fail)
         grid_data = get_default_grid_data()
@@ -70,39 +104,111 @@ class EcoOrchestrator:
         GRID_THRESHOLD = int(os.getenv("GRID_THRESHOLD", "200"))
         logger.info(f"Orchestrator grid | zone={grid_zone} | intensity={grid_intensity} g/kWh | source={grid_source_label} | defer_threshold={GRID_THRESHOLD}")
         deadline = getattr(req, "deadline", None) or (datetime.now(timezone.utc) + timedelta(hours=24))
-        if not getattr(req, "is_urgent", False) and grid_intensity > GRID_THRESHOLD:
+        # Over-budget projects only get green-window (deferred) execution unless urgent; local counter, re-synced off the loop
+        over_budget = await budget.is_over_budget(getattr(req, "project_id", None))
+        if over_budget:
+            logger.info(f"Project {req.project_id} over carbon budget | deferring non-urgent work")
+        # Admission control: if the model's RPM/TPM buckets would keep this call waiting, non-urgent work
+        # spills into the deferred queue; urgent work queues in LLMClient until admitted
+        rate_wait = self.client.expected_wait(final_tokens, tier)
+        rate_limited = rate_wait > RATE_LIMIT_QUEUE_SECONDS
+        if rate_limited:
+            logger.info(f"Rate limit on {tier} | ~{rate_wait:.1f}s wait")
+        urgent = getattr(req, "is_urgent", False)
+        # Carbon: defer to the forecast trough before the deadline when it saves enough (threshold rule without a forecast)
+        plan = None if urgent else plan_deferral(
+            grid_intensity,
+            await get_forecast_curve_async(grid_zone),
+            deadline,
+            self.logger.wh_per_token(tier) * final_tokens / 1000,
+            GRID_THRESHOLD,
+        )
+        # Spatial before temporal: run the same model now in another region whose live intensity beats the
+        # forecast trough here (the threshold without a forecast), if that region has rate-limit room
+        placement = None
+        if not urgent and not use_cascade and REGION_SHIFT and (plan["defer"] or over_budget or rate_limited):
+            intensities = await live_region_intensities()
+            best = RegionPlanner(self.client.default_location, grid_intensity, intensities).place(tier)
+            trough = plan["expected_intensity"] if plan["expected_intensity"] is not None else plan["target_intensity"]
+            if (
+                best["shifted"]
+                and best["intensity"] < trough
+                and self.client.expected_wait(final_tokens, tier, best["region"]) <= RATE_LIMIT_QUEUE_SECONDS
+            ):
+                placement = best
+                logger.info(f"Shifting {tier} to {best['region']} | {best['intensity']} g/kWh now vs {trough} g/kWh forecast trough")
+        if not urgent and placement is None and (plan["defer"] or over_budget or rate_limited):
+            # Over budget: also wait for the trough; rate limited only: run once the limiter has room
+            # (or at the trough, if sooner), since plan_deferral found running now best
+            scheduled_at = plan["scheduled_at"] or (plan["best_at"] if over_budget else None)
+            if not plan["defer"] and not over_budget:
+                scheduled_at = datetime.now(timezone.utc) + timedelta(seconds=rate_wait)
+                if plan["best_at"] is not None:
+                    scheduled_at = min(scheduled_at, plan["best_at"])
             try:
                 task_id = await self.db.add_task_to_queue(
-                    comp["compressed_text"], tier, deadline, GRID_THRESHOLD
+                    llm_prompt, tier, deadline, plan["target_intensity"], scheduled_at,
+                    project_id=getattr(req, "project_id", None), user_id=getattr(req, "user_id", None),
+                    chat_id=getattr(req, "chat_id", None),
                 )
-                return {"status": "deferred", "task_id": str(task_id), "message": "Queued for green window."}
+                message = "Queued for green window." if plan["defer"] or over_budget else "Queued: model rate limit reached."
+                logger.info(f"Deferred task {task_id} | rule={plan['rule']} | scheduled_at={scheduled_at} | expected_saving_g={plan['expected_saving_g']}")
+                return {
+                    "status": "deferred",
+                    "task_id": str(task_id),
+                    "message": message,
+                    "scheduled_at": scheduled_at.isoformat() if scheduled_at else None,
+                }
             except Exception:
                 # DB down or tables missing: run immediately instead of failing
                 pass
 
-        # 4: Execute
-        raw_response = await self.client.generate(comp["compressed_text"], tier)
+        # 4: Execute (the scheduler orders calls by class, deadline and per-project fair share when saturated)
+        cascade = None
+        async with self._slot(req, final_tokens):
+            if use_cascade:
+                cascade = await self.cascade.run(llm_prompt, cascade_mode)
+                raw_response, tier = cascade["response"], cascade["model"]
+            elif placement:
+                raw_response = await self.client.generate(llm_prompt, tier, placement["region"])
+            else:
+                raw_response = await self.client.generate(llm_prompt, tier)
+        # Training rows: each answer the cascade checked, else this answer against the same cheap checks
+        if cascade:
+            for call in cascade["calls"]:
+                if call["role"] != "judge" and call["rejected"] not in ("error", "cancelled"):
+                    log_route(route["features"], call["model"], call["rejected"] is None)
+        else:
+            log_route(route["features"], tier, check_answer(llm_prompt, raw_response) is None)
+        region = region_receipt(placement["region"]) if placement and placement["region"] != self.client.default_location else {}
+        if region:
+            grid_intensity, grid_source, grid_zone = placement["intensity"], region["grid_source"], region["grid_zone"]
 
         # 5: Log & receipt (logger expects original_tokens / final_tokens)
         impact = self.logger.calculate_savings(
             {
-                "original_tokens": comp["original_count"],
-                "final_tokens": comp["final_count"],
+                "original_tokens": original_tokens,
+                "final_tokens": final_tokens,
                 "model": tier,
             },
             grid_intensity,
         )
 
-        receipt_id = f"rec_{id(raw_response)}"
+        cascade_stats = self._charge_cascade(impact, cascade, cascade_mode, final_tokens, grid_intensity) if cascade else None
+
+        receipt_id = new_id(RECEIPT_ID_PREFIX)
         self.ledger[receipt_id] = impact
 
         # Store for transparency layer (GET /receipt, GET /analytics/nutrition)
-        store_receipt(
+        await store_receipt(
             receipt_id,
             {
                 "timestamp": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
-                "server_location": "us-central1 (Iowa)",
+                "server_location": region.get("server_location", "us-central1 (Iowa)"),
                 "grid_zone": grid_zone,
+                "user_id": getattr(req, "user_id", None),
+                "project_id": getattr(req, "project_id", None),
+                "chat_id": getattr(req, "chat_id", None),
                 "model_used": tier,
                 "baseline_co2_est": impact.get("baseline_co2", 4.2),
                 "actual_co2": impact.get("actual_co2", 1.8),
@@ -112,42 +218,104 @@ class EcoOrchestrator:
                 "was_cached": False,
                 "energy_kwh": impact.get("energy_kwh", 0.004),
                 "grid_source": grid_source,
+                "tokens": final_tokens,
+                "cascade": cascade_stats,
+                "shifted_from": self.client.default_location if placement else None,
             },
         )
 
-        # Cache for future identical prompts
-        add_prompt_to_cache(
-            req.prompt,
-            {"response": raw_response, "receipt_id": receipt_id, "eco_stats": impact},
-        )
+        # Cache for future identical prompts (standalone prompts only)
+        if not has_history:
+            add_prompt_to_cache(
+                req.prompt,
+                {"response": raw_response, "receipt_id": receipt_id, "eco_stats": impact},
+                compression={
+                    "compressed_text": comp["compressed_text"],
+                    "original_count": comp["original_count"],
+                    "final_count": comp["final_count"],
+                    "target": target,
+                },
+            )
 
-        return {
+        result = {
             "response": raw_response,
             "receipt_id": receipt_id,
             "eco_stats": impact,
-            "input_tokens": comp["original_count"],
-            "compressed_text_tokens": comp["final_count"],
+            "input_tokens": original_tokens,
+            "compressed_text_tokens": final_tokens,
             "compressed_prompt": comp["compressed_text"],
         }
+        if cascade_stats:
+            result["cascade"] = cascade_stats
+        if placement:
+            result["region_shift"] = {**placement, "from_region": self.client.default_location}
+        if has_history:
+            result["context_stats"] = {
+                "turns": convo["turns"],
+                "history_tokens": convo["history_tokens"],
+                "context_tokens": convo["context_tokens"],
+                "input_token_reduction_pct": round(100 * (1 - final_tokens / original_tokens), 1) if original_tokens else 0.0,
+            }
+        return result
+
+    def _slot(self, req, tokens: int):
+        """Scheduler slot for a live request: urgent or interactive class, its project and deadline."""
+        priority = "urgent" if getattr(req, "is_urgent", False) else "interactive"
+        return self.scheduler.slot(priority, getattr(req, "project_id", None), getattr(req, "deadline", None), tokens)
+
+    def _charge_cascade(self, impact: dict, cascade: dict, mode: str, tokens: int, grid_intensity: float) -> dict:
+        """
+        Add the cascade's extra calls (rejected low answer, cancelled hedge, judge) to impact,
+        which calculate_savings priced as a single call to the answering model. Returns receipt stats.
+        """
+        extra_wh = sum(self.logger.wh_per_token(c["model"]) * tokens for c in cascade["calls"])
+        extra_wh -= self.logger.wh_per_token(cascade["model"]) * tokens
+        extra_co2 = (extra_wh / 1000) * grid_intensity
+        impact["wh_saved"] = round(impact["wh_saved"] - extra_wh, 6)
+        impact["co2_saved_grams"] = round(impact["co2_saved_grams"] - extra_co2, 6)
+        impact["actual_co2"] = round(impact["actual_co2"] + extra_co2, 4)
+        impact["energy_kwh"] = round(impact["energy_kwh"] + extra_wh / 1000, 6)
+        if impact["actual_co2"] > 0:
+            impact["efficiency_multiplier"] = round(impact["baseline_co2"] / impact["actual_co2"], 1)
+        return {
+            "mode": mode,
+            "escalated": cascade["escalated"],
+            "reason": cascade["reason"],
+            "hedged": cascade["hedged"],
+            "latency_ms": cascade["latency_ms"],
+            "calls": cascade["calls"],
+            "extra_co2_g": round(extra_co2, 6),
+            "escalation_rate": self.cascade.escalation_rate,
+        }
 
-    async def execute_deferred_task(self, task: dict) -> dict | None:
+    async def execute_deferred_task(
+        self, task: dict, owner: str | None = None, placement: dict | None = None
+    ) -> dict | None:
         """
-        Execute a deferred task: run LLM, complete_task, store_receipt.
+        Execute a deferred task: run LLM, complete_task, store_receipt, then append the answer to its chat.
         Used by worker and POST /deferred/execute. Returns receipt_id and impact, or None on failure.
+        owner: lease holder from claim_*; completion is skipped if the lease was lost.
+        placement: RegionPlanner.place() result when the worker shifted the task to another region.
         """
         task_id = task["id"]
         prompt_text = task["prompt"]
         model_tier = task["model_tier"]
+        location = placement["region"] if placement else None
         try:
-            raw_response = await self.client.generate(prompt_text, model_tier)
+            async with self.scheduler.slot("batch", deadline=task.get("deadline")):
+                raw_response = await self.client.generate(prompt_text, model_tier, location)
         except Exception as e:
             logger.error(f"Deferred task {task_id} LLM failed: {e}")
             return None
-        comp = self.compressor.compress(prompt_text)
+        comp = self.compressor.compress(prompt_text, model_tier)
         grid_data = get_default_grid_data()
         grid_intensity = grid_data["carbon_intensity_g_per_kwh"]
         grid_source = grid_data["grid_source"]
         grid_zone = grid_data.get("zone", "unknown")
+        # Shifted to another region: its estimated intensity and mix, not the default zone's
+        region = region_receipt(location) if location and location != self.client.default_location else {}
+        if region:
+            grid_intensity, grid_source, grid_zone = placement["intensity"], region["grid_source"], region["grid_zone"]
         impact = self.logger.calculate_savings(
             {
                 "original_tokens": comp["original_count"],
@@ -157,17 +325,23 @@ class EcoOrchestrator:
             grid_intensity,
         )
         try:
-            await self.db.complete_task(task_id, raw_response, impact)
+            completed = await self.db.complete_task(task_id, raw_response, impact, owner=owner)
         except Exception as e:
             logger.error(f"Deferred task {task_id} complete_task failed: {e}")
             return None
-        receipt_id = f"rec_deferred_{task_id}"
-        store_receipt(
+        if not completed:
+            logger.warning(f"Deferred task {task_id} lease lost or already completed; discarding result")
+            return None
+        receipt_id = new_id(RECEIPT_ID_PREFIX)
+        await store_receipt(
             receipt_id,
             {
                 "timestamp": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
-                "server_location": "us-central1 (Iowa)",
+                "server_location": region.get("server_location", "us-central1 (Iowa)"),
                 "grid_zone": grid_zone,
+                "user_id": task.get("user_id"),
+                "project_id": task.get("project_id"),
+                "chat_id": task.get("chat_id"),
                 "model_used": model_tier,
                 "baseline_co2_est": impact.get("baseline_co2", 4.2),
                 "actual_co2": impact.get("actual_co2", 1.8),
@@ -177,7 +351,13 @@ class EcoOrchestrator:
                 "was_cached": False,
                 "energy_kwh": impact.get("energy_kwh", 0.004),
                 "grid_source": grid_source,
+                "tokens": comp["final_count"],
+                "shifted_from": self.client.default_location if placement and placement["shifted"] else None,
             },
         )
+        if task.get("chat_id"):
+            chat_store.append(
+                task["chat_id"], "assistant", raw_response, receipt_id, task.get("user_id"), task.get("project_id")
+            )
         logger.info(f"Deferred task {task_id} completed | receipt_id={receipt_id}")
         return {"receipt_id": receipt_id, "response": raw_response, "eco_stats": impact}
\ No newline at end of file
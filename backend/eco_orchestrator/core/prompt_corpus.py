@@ -0,0 +1,98 @@
+"""
+Local corpus statistics for budget-targeted compression.
+
+Every prompt added to the response cache (core.cache.add_prompt_to_cache) is
+one document: its distinct terms bump a document-frequency table. Terms seen
+in many cached prompts carry little information (boilerplate like "explain",
+"write", "code"); rare ones carry a lot. The table lives in-process and, when
+Redis is up, in a Redis hash so all workers and restarts share it.
+"""
+import math
+import os
+import re
+
+from loguru import logger
+
+from core.redis import RedisCache
+
+CORPUS_MAX_TERMS = int(os.getenv("CORPUS_MAX_TERMS", "200000"))
+CORPUS_DF_KEY = "corpus:df"
+CORPUS_DOCS_KEY = "corpus:docs"
+
+_TERM = re.compile(r"\w+")
+
+# Everyday function and courtesy words: treated as occurring in every document,
+# so they score as uninformative even before the corpus has seen any prompts
+BACKGROUND_TERMS = frozenset("""
+a about above after again all also am an and any are as at be because been before being
+below between both but by can could did do does doing done down during each even few for
+from further get got had has have having he her here hers him his how i if in into is it
+its just let lot lots me more most much my no nor not now of off on once only or other our
+ours out over own please quite rather really same she should so some such than thank thanks
+that the their theirs them then there these they this those through to too under until up
+us very was we well were what when where which while who whom why will with would you your
+yours kind kindly appreciate appreciated help maybe perhaps basically actually simply just
+""".split())
+
+
+def terms(text: str) -> list[str]:
+    """Lowercased word terms of text (punctuation dropped)."""
+    return _TERM.findall(text.lower())
+
+
+class PromptCorpus:
+    """Document frequencies over cached prompts, with IDF lookups."""
+
+    def __init__(self, client=None, max_terms: int = CORPUS_MAX_TERMS):
+        self.client = client
+        self.max_terms = max_terms
+        self.docs = 0
+        self._df: dict[str, int] = {}
+        self._loaded = client is None
+
+    def _load(self) -> None:
+        """Pull the shared table from Redis once, on first use."""
+        self._loaded = True
+        try:
+            self.docs = int(self.client.get(CORPUS_DOCS_KEY) or 0)
+            for term, df in self.client.hscan_iter(CORPUS_DF_KEY, count=5000):
+                if len(self._df) >= self.max_terms:
+                    break
+                self._df[term] = int(df)
+        except Exception as e:
+            logger.warning(f"Prompt corpus Redis load failed, using local counts: {e}")
+
+    def add(self, text: str) -> None:
+        if not self._loaded:
+            self._load()
+        distinct = set(terms(text))
+        if not distinct:
+            return
+        self.docs += 1
+        df = self._df
+        for term in distinct:
+            if term in df:
+                df[term] += 1
+            elif len(df) < self.max_terms:
+                df[term] = 1
+        if self.client is not None:
+            try:
+                pipe = self.client.pipeline()
+                pipe.incr(CORPUS_DOCS_KEY)
+                for term in distinct:
+                    pipe.hincrby(CORPUS_DF_KEY, term, 1)
+                pipe.execute()
+            except Exception as e:
+                logger.warning(f"Prompt corpus Redis write failed: {e}")
+
+    def idf(self, term: str) -> float:
+        """Smoothed inverse document frequency (0 for background terms); unseen terms score highest."""
+        if term in BACKGROUND_TERMS:
+            return 0.0
+        if not self._loaded:
+            self._load()
+        return math.log((self.docs + 1) / (self._df.get(term, 0) + 1)) + 1.0
+
+
+_redis = RedisCache(host=os.getenv("REDIS_HOST", "localhost"), port=int(os.getenv("REDIS_PORT", 6379)))
+prompt_corpus = PromptCorpus(_redis.redis_client)
@@ -0,0 +1,202 @@
+"""
+Outbound LLM rate limiting: token buckets per (model, region).
+
+Each (model, region) has a requests-per-minute bucket (RATE_LIMIT_RPM) and a
+tokens-per-minute bucket (RATE_LIMIT_TPM). A model entry in
+server_model_map.json may set its own "rpm" / "tpm". A call needs one request
+and its prompt tokens plus RATE_LIMIT_OUTPUT_TOKENS.
+
+With Redis the buckets are shared by every worker: one Lua script refills and
+debits both atomically. To keep Redis off most calls, each debit also takes a
+small lease (RATE_LIMIT_LEASE_FRACTION of capacity) that the worker spends
+locally for up to RATE_LIMIT_LEASE_SECONDS; the Redis call on a lease miss
+runs in a worker thread, off the event loop. Without Redis, or when it errors,
+the buckets are per process.
+"""
+import asyncio
+import os
+import time
+
+from loguru import logger
+
+from core.redis import RedisCache
+
+RATE_LIMIT_RPM = float(os.getenv("RATE_LIMIT_RPM", "60"))
+RATE_LIMIT_TPM = float(os.getenv("RATE_LIMIT_TPM", "200000"))
+RATE_LIMIT_OUTPUT_TOKENS = int(os.getenv("RATE_LIMIT_OUTPUT_TOKENS", "512"))
+RATE_LIMIT_LEASE_FRACTION = float(os.getenv("RATE_LIMIT_LEASE_FRACTION", "0.05"))
+RATE_LIMIT_LEASE_SECONDS = float(os.getenv("RATE_LIMIT_LEASE_SECONDS", "2"))
+# Longest expected wait a non-urgent /orchestrate call queues for before it is deferred instead
+RATE_LIMIT_QUEUE_SECONDS = float(os.getenv("RATE_LIMIT_QUEUE_SECONDS", "2"))
+RATE_LIMIT_KEY_PREFIX = "ratelimit:"
+
+# KEYS: rpm bucket, tpm bucket. ARGV: capacity, refill/s, cost, lease for each bucket. Redis' clock, not the workers'.
+# Takes cost + lease (as much as is there) from both, or nothing. Returns wait seconds, grants and what is left.
+_TAKE_LUA = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local tokens, wait = {}, 0
+for i = 1, 2 do
+  local cap, rate, cost = tonumber(ARGV[i * 4 - 3]), tonumber(ARGV[i * 4 - 2]), tonumber(ARGV[i * 4 - 1])
+  local b = redis.call('HMGET', KEYS[i], 'tokens', 'ts')
+  local t = tonumber(b[1]) or cap
+  local ts = tonumber(b[2]) or now
+  t = math.min(cap, t + math.max(0, now - ts) * rate)
+  tokens[i] = t
+  if t < cost then wait = math.max(wait, (cost - t) / rate) end
+end
+local out = {tostring(wait)}
+for i = 1, 2 do
+  local take = 0
+  if wait == 0 then take = math.min(tokens[i], tonumber(ARGV[i * 4 - 1]) + tonumber(ARGV[i * 4])) end
+  redis.call('HSET', KEYS[i], 'tokens', tostring(tokens[i] - take), 'ts', tostring(now))
+  redis.call('EXPIRE', KEYS[i], 120)
+  out[i + 1] = tostring(take)
+  out[i + 3] = tostring(tokens[i] - take)
+end
+return out
+"""
+
+
+class TokenBucket:
+    """Classic token bucket; refills continuously up to capacity."""
+
+    __slots__ = ("capacity", "rate", "tokens", "updated")
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def wait_for(self, cost: float, now: float) -> float:
+        """Seconds until cost is available (0.0 if it is now)."""
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+        return 0.0 if self.tokens >= cost else (cost - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """RPM / TPM admission per (model, region), shared through Redis when available."""
+
+    def __init__(
+        self,
+        client=None,
+        lease_fraction: float = RATE_LIMIT_LEASE_FRACTION,
+        lease_seconds: float = RATE_LIMIT_LEASE_SECONDS,
+        model_limits: dict[str, tuple[float, float]] | None = None,
+    ):
+        self.client = client
+        self._script = None
+        if client is not None:
+            try:
+                self._script = client.register_script(_TAKE_LUA)
+            except Exception as e:
+                logger.warning(f"Rate limiter Redis script unavailable, limiting per process: {e}")
+        self.lease_fraction = lease_fraction
+        self.lease_seconds = lease_seconds
+        # model -> (rpm, tpm); read from server_model_map.json on first use
+        self.model_limits = model_limits
+        # Per process buckets without Redis; with it, the shared state as of this worker's last call
+        self._buckets: dict[tuple[str, str], tuple[TokenBucket, TokenBucket]] = {}
+        # key -> [requests, tokens, expires_at] taken from Redis and not yet spent
+        self._leases: dict[tuple[str, str], list[float]] = {}
+
+    def limits(self, model: str) -> tuple[float, float]:
+        if self.model_limits is None:
+            self.model_limits = _model_limits()
+        return self.model_limits.get(model, (RATE_LIMIT_RPM, RATE_LIMIT_TPM))
+
+    def _buckets_for(self, key: tuple[str, str]) -> tuple[TokenBucket, TokenBucket]:
+        buckets = self._buckets.get(key)
+        if buckets is None:
+            rpm, tpm = self.limits(key[0])
+            buckets = self._buckets[key] = (TokenBucket(rpm, rpm / 60), TokenBucket(tpm, tpm / 60))
+        return buckets
+
+    def _leased(self, key: tuple[str, str], tokens: float, now: float) -> list[float] | None:
+        lease = self._leases.get(key)
+        if lease is not None and lease[2] > now and lease[0] >= 1 and lease[1] >= tokens:
+            return lease
+        return None
+
+    def expected_wait(self, model: str, region: str, tokens: float) -> float:
+        """Seconds until a call of tokens could be admitted; takes nothing. Uses local state only."""
+        key = (model, region)
+        now = time.monotonic()
+        if self._leased(key, tokens, now) is not None:
+            return 0.0
+        requests, token_bucket = self._buckets_for(key)
+        return max(requests.wait_for(1, now), token_bucket.wait_for(min(tokens, token_bucket.capacity), now))
+
+    async def try_acquire(self, model: str, region: str, tokens: float) -> float:
+        """Take one request and tokens; 0.0 when admitted, else seconds to wait (nothing is taken)."""
+        key = (model, region)
+        lease = self._leased(key, tokens, time.monotonic())
+        if lease is not None:
+            lease[0] -= 1
+            lease[1] -= tokens
+            return 0.0
+        if self._script is not None:
+            try:
+                return await self._acquire_shared(key, tokens)
+            except Exception as e:
+                logger.warning(f"Rate limiter Redis call failed, limiting per process: {e}")
+        now = time.monotonic()
+        requests, token_bucket = self._buckets_for(key)
+        tokens = min(tokens, token_bucket.capacity)
+        wait = max(requests.wait_for(1, now), token_bucket.wait_for(tokens, now))
+        if wait == 0.0:
+            requests.tokens -= 1
+            token_bucket.tokens -= tokens
+        return wait
+
+    async def _acquire_shared(self, key: tuple[str, str], tokens: float) -> float:
+        model, region = key
+        rpm, tpm = self.limits(model)
+        tokens = min(tokens, tpm)
+        prefix = f"{RATE_LIMIT_KEY_PREFIX}{model}:{region}:"
+        reply = await asyncio.to_thread(
+            self._script,
+            keys=[prefix + "rpm", prefix + "tpm"],
+            args=[rpm, rpm / 60, 1, rpm * self.lease_fraction, tpm, tpm / 60, tokens, tpm * self.lease_fraction],
+        )
+        wait, got_requests, got_tokens, left_requests, left_tokens = (float(v) for v in reply)
+        # Local state is only touched back on the loop
+        now = time.monotonic()
+        requests, token_bucket = self._buckets_for(key)
+        requests.tokens, requests.updated = left_requests, now
+        token_bucket.tokens, token_bucket.updated = left_tokens, now
+        if wait == 0.0:
+            lease = self._leases.get(key)
+            if lease is not None and lease[2] > now:
+                # Another call's lease landed while this one was in flight: keep both
+                lease[0] += got_requests - 1
+                lease[1] += got_tokens - tokens
+            else:
+                self._leases[key] = [got_requests - 1, got_tokens - tokens, now + self.lease_seconds]
+        return wait
+
+    async def acquire(self, model: str, region: str, tokens: float) -> float:
+        """Wait (queue) until the call is admitted; returns seconds waited. Bound it with a timeout."""
+        start = time.monotonic()
+        while (wait := await self.try_acquire(model, region, tokens)) > 0.0:
+            await asyncio.sleep(wait)
+        return time.monotonic() - start
+
+
+def _model_limits() -> dict[str, tuple[float, float]]:
+    """Per-model rpm / tpm overrides from server_model_map.json entries that set them."""
+    from core.llm_client import SERVER_MODEL_MAP
+
+    limits = {}
+    for rdata in SERVER_MODEL_MAP.values():
+        for m in rdata.get("available_models", []):
+            if "rpm" in m or "tpm" in m:
+                limits[m["id"]] = (float(m.get("rpm", RATE_LIMIT_RPM)), float(m.get("tpm", RATE_LIMIT_TPM)))
+    return limits
+
+
+_redis = RedisCache(host=os.getenv("REDIS_HOST", "localhost"), port=int(os.getenv("REDIS_PORT", 6379)))
+rate_limiter = RateLimiter(_redis.redis_client)
@@ -1,23 +1,333 @@
 """
-Shared in-memory receipt store so orchestrator can write and transparency router can read.
+Shared receipt store so orchestrator can write and transparency router can read.
+
+Pluggable backends, chosen with RECEIPT_STORE_BACKEND:
+  memory   — per-process LRU capped at RECEIPT_STORE_MAX_SIZE (default)
+  redis    — hash + per-index sorted sets, shared across workers
+  postgres — receipt_store table (migrations/0005_receipt_store.sql), durable
+
+Every backend keeps secondary indexes on user_id, project_id, model, zone and
+hourly time bucket, so query_receipts() reads only matching receipts. Receipt
+IDs are time-ordered (core.ids), so every index is kept in ID order and time
+ranges are ID ranges; there is no separate timestamp index.
 """
-from datetime import datetime
+import asyncio
+import bisect
+import json
+import os
+from collections import OrderedDict
+from datetime import datetime, timezone
 from typing import Any
 
-_store: dict[str, dict[str, Any]] = {}
+from loguru import logger
+
+from core.aggregates import savings
+from core.budget import budget
+from core.ids import id_floor
+from core.leaderboard import leaderboard
+
+RECEIPT_STORE_BACKEND = os.getenv("RECEIPT_STORE_BACKEND", "memory").lower()
+RECEIPT_STORE_MAX_SIZE = int(os.getenv("RECEIPT_STORE_MAX_SIZE", "10000"))
+RECEIPT_ID_PREFIX = "rec"
+
+# Index name -> receipt field it is built from ("bucket" is derived from timestamp)
+INDEX_FIELDS = {
+    "user": "user_id",
+    "project": "project_id",
+    "model": "model_used",
+    "zone": "grid_zone",
+    "bucket": "timestamp",
+}
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def _parse_ts(ts: str | None) -> datetime:
+    try:
+        return datetime.fromisoformat(ts.replace("Z", "+00:00"))
+    except (AttributeError, ValueError):
+        return datetime.now(timezone.utc)
+
+
+def time_bucket(ts: str | None) -> str:
+    """Hourly bucket key for an ISO timestamp, e.g. '2026-10-19T13'."""
+    return _parse_ts(ts).astimezone(timezone.utc).strftime("%Y-%m-%dT%H")
+
+
+def _index_values(data: dict[str, Any]) -> dict[str, str]:
+    """Index name -> value for every index the receipt participates in."""
+    values = {}
+    for name, field in INDEX_FIELDS.items():
+        raw = data.get(field)
+        if name == "bucket":
+            values[name] = time_bucket(raw)
+        elif raw is not None:
+            values[name] = str(raw)
+    return values
+
+
+def _filters(user_id, project_id, model, zone, bucket) -> dict[str, str]:
+    given = {"user": user_id, "project": project_id, "model": model, "zone": zone, "bucket": bucket}
+    return {k: str(v) for k, v in given.items() if v is not None}
+
+
+def _sorted_add(ids: list[str], receipt_id: str) -> None:
+    # New IDs are almost always the largest: append without a bisect
+    if not ids or ids[-1] < receipt_id:
+        ids.append(receipt_id)
+    else:
+        bisect.insort(ids, receipt_id)
+
+
+def _sorted_remove(ids: list[str], receipt_id: str) -> None:
+    i = bisect.bisect_left(ids, receipt_id)
+    if i < len(ids) and ids[i] == receipt_id:
+        del ids[i]
+
+
+class MemoryReceiptStore:
+    """In-process LRU: least recently written/read receipts are evicted past max_size."""
+
+    def __init__(self, max_size: int = RECEIPT_STORE_MAX_SIZE):
+        self.max_size = max_size
+        self._data: OrderedDict[str, dict[str, Any]] = OrderedDict()  # LRU order
+        self._ordered: list[str] = []  # all ids in ID (= time) order
+        # index name -> value -> receipt ids in ID order
+        self._indexes: dict[str, dict[str, list[str]]] = {name: {} for name in INDEX_FIELDS}
+
+    def _unindex(self, receipt_id: str, data: dict[str, Any]) -> None:
+        _sorted_remove(self._ordered, receipt_id)
+        for name, value in _index_values(data).items():
+            ids = self._indexes[name].get(value)
+            if ids is not None:
+                _sorted_remove(ids, receipt_id)
+                if not ids:
+                    del self._indexes[name][value]
+
+    async def put(self, receipt_id: str, data: dict[str, Any]) -> None:
+        old = self._data.pop(receipt_id, None)
+        if old is not None:
+            self._unindex(receipt_id, old)
+        self._data[receipt_id] = data
+        _sorted_add(self._ordered, receipt_id)
+        for name, value in _index_values(data).items():
+            _sorted_add(self._indexes[name].setdefault(value, []), receipt_id)
+        while len(self._data) > self.max_size:
+            evicted_id, evicted = self._data.popitem(last=False)
+            self._unindex(evicted_id, evicted)
+
+    async def get(self, receipt_id: str) -> dict[str, Any] | None:
+        data = self._data.get(receipt_id)
+        if data is not None:
+            self._data.move_to_end(receipt_id)
+        return data
+
+    async def query(
+        self, filters: dict[str, str], limit: int | None, start_id: str | None = None, end_id: str | None = None
+    ) -> list[dict[str, Any]]:
+        if filters:
+            # Walk the smallest matching index, check the rest per receipt
+            candidates = [self._indexes[name].get(value, []) for name, value in filters.items()]
+            ordered = min(candidates, key=len)
+        else:
+            ordered = self._ordered
+        lo = bisect.bisect_left(ordered, start_id) if start_id is not None else 0
+        hi = bisect.bisect_left(ordered, end_id) if end_id is not None else len(ordered)
+        out = []
+        # Index walk, newest first, without copying the range
+        for i in range(hi - 1, lo - 1, -1):
+            data = self._data[ordered[i]]
+            if all(_index_values(data).get(name) == value for name, value in filters.items()):
+                out.append(data)
+                if limit is not None and len(out) >= limit:
+                    break
+        return out
+
+
+class RedisReceiptStore:
+    """Redis hash of receipt JSON plus one sorted set per index value.
+
+    Every member has score 0, so each set is ordered lexicographically by
+    receipt ID (= time): ZREVRANGEBYLEX gives newest-first ranges and ZPOPMIN
+    evicts the oldest receipts. The client is synchronous (shared with the rest
+    of core), so each operation runs in a worker thread, off the event loop.
+    """
+
+    DATA_KEY = "receipts:data"
+    ALL_KEY = "receipts:idx:all"
+
+    def __init__(self, client, max_size: int = RECEIPT_STORE_MAX_SIZE):
+        self.client = client
+        self.max_size = max_size
+
+    def _index_key(self, name: str, value: str) -> str:
+        return f"receipts:idx:{name}:{value}"
+
+    async def put(self, receipt_id: str, data: dict[str, Any]) -> None:
+        await asyncio.to_thread(self._put, receipt_id, data)
+
+    async def get(self, receipt_id: str) -> dict[str, Any] | None:
+        return await asyncio.to_thread(self._get, receipt_id)
+
+    async def query(
+        self, filters: dict[str, str], limit: int | None, start_id: str | None = None, end_id: str | None = None
+    ) -> list[dict[str, Any]]:
+        return await asyncio.to_thread(self._query, filters, limit, start_id, end_id)
+
+    def _put(self, receipt_id: str, data: dict[str, Any]) -> None:
+        pipe = self.client.pipeline()
+        pipe.hset(self.DATA_KEY, receipt_id, json.dumps(data))
+        pipe.zadd(self.ALL_KEY, {receipt_id: 0})
+        for name, value in _index_values(data).items():
+            pipe.zadd(self._index_key(name, value), {receipt_id: 0})
+        pipe.execute()
+        self._evict()
+
+    def _evict(self) -> None:
+        excess = self.client.zcard(self.ALL_KEY) - self.max_size
+        if excess <= 0:
+            return
+        oldest = [member for member, _ in self.client.zpopmin(self.ALL_KEY, excess)]
+        pipe = self.client.pipeline()
+        for receipt_id, raw in zip(oldest, self.client.hmget(self.DATA_KEY, oldest)):
+            if raw:
+                for name, value in _index_values(json.loads(raw)).items():
+                    pipe.zrem(self._index_key(name, value), receipt_id)
+        pipe.hdel(self.DATA_KEY, *oldest)
+        pipe.execute()
+
+    def _get(self, receipt_id: str) -> dict[str, Any] | None:
+        raw = self.client.hget(self.DATA_KEY, receipt_id)
+        return json.loads(raw) if raw else None
+
+    def _query(
+        self, filters: dict[str, str], limit: int | None, start_id: str | None, end_id: str | None
+    ) -> list[dict[str, Any]]:
+        if filters:
+            keys = [self._index_key(name, value) for name, value in filters.items()]
+            key = min(keys, key=self.client.zcard)
+        else:
+            key = self.ALL_KEY
+        out: list[dict[str, Any]] = []
+        page = max(limit or 0, 100)
+        upper = f"({end_id}" if end_id is not None else "+"
+        lower = f"[{start_id}" if start_id is not None else "-"
+        while True:
+            ids = self.client.zrevrangebylex(key, upper, lower, start=0, num=page)
+            if not ids:
+                return out
+            upper = f"({ids[-1]}"
+            for raw in self.client.hmget(self.DATA_KEY, ids):
+                if not raw:
+                    continue
+                data = json.loads(raw)
+                if all(_index_values(data).get(name) == value for name, value in filters.items()):
+                    out.append(data)
+                    if limit is not None and len(out) >= limit:
+                        return out
+
+
+class PostgresReceiptStore:
+    """Durable receipt_store table with one (column, receipt_id) b-tree index per filter column."""
+
+    COLUMNS = {"user": "user_id", "project": "project_id", "model": "model", "zone": "zone", "bucket": "time_bucket"}
+
+    UPSERT_SQL = '''
+        INSERT INTO receipt_store (receipt_id, user_id, project_id, model, zone, time_bucket, created_at, data)
+        VALUES ($1, $2, $3, $4, $5, $6, $7, $8::jsonb)
+        ON CONFLICT (receipt_id) DO UPDATE SET
+            user_id = EXCLUDED.user_id, project_id = EXCLUDED.project_id, model = EXCLUDED.model,
+            zone = EXCLUDED.zone, time_bucket = EXCLUDED.time_bucket,
+            created_at = EXCLUDED.created_at, data = EXCLUDED.data
+    '''
+    SELECT_SQL = "SELECT data FROM receipt_store WHERE receipt_id = $1"
+
+    def __init__(self, db=None):
+        if db is None:
+            from core.database import database as db
+        self.db = db
+
+    async def put(self, receipt_id: str, data: dict[str, Any]) -> None:
+        idx = _index_values(data)
+        pool = await self.db.connect()
+        await pool.execute(
+            self.UPSERT_SQL,
+            receipt_id,
+            idx.get("user"),
+            idx.get("project"),
+            idx.get("model"),
+            idx.get("zone"),
+            idx["bucket"],
+            _parse_ts(data.get("timestamp")),
+            json.dumps(data),
+        )
+
+    async def get(self, receipt_id: str) -> dict[str, Any] | None:
+        pool = await self.db.connect()
+        raw = await pool.fetchval(self.SELECT_SQL, receipt_id)
+        return json.loads(raw) if raw else None
+
+    async def query(
+        self, filters: dict[str, str], limit: int | None, start_id: str | None = None, end_id: str | None = None
+    ) -> list[dict[str, Any]]:
+        where = [f"{self.COLUMNS[name]} = ${i}" for i, name in enumerate(filters, start=1)]
+        args = list(filters.values())
+        if start_id is not None:
+            args.append(start_id)
+            where.append(f"receipt_id >= ${len(args)}")
+        if end_id is not None:
+            args.append(end_id)
+            where.append(f"receipt_id < ${len(args)}")
+        sql = "SELECT data FROM receipt_store"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY receipt_id DESC"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        pool = await self.db.connect()
+        rows = await pool.fetch(sql, *args)
+        return [json.loads(r["data"]) for r in rows]
+
+
+def _make_backend():
+    if RECEIPT_STORE_BACKEND == "redis":
+        from core.redis import RedisCache
+        cache = RedisCache(host=os.getenv("REDIS_HOST", "localhost"), port=int(os.getenv("REDIS_PORT", 6379)))
+        if cache.redis_client is not None:
+            return RedisReceiptStore(cache.redis_client)
+        logger.warning("RECEIPT_STORE_BACKEND=redis but Redis is unavailable; using in-memory receipt store")
+    elif RECEIPT_STORE_BACKEND == "postgres":
+        return PostgresReceiptStore()
+    return MemoryReceiptStore()
+
+
+_backend = _make_backend()
+
+
+def set_backend(backend) -> None:
+    """Swap the active backend (scripts / tests)."""
+    global _backend
+    _backend = backend
 
 
-def set_receipt(receipt_id: str, data: dict[str, Any]) -> None:
-    _store[receipt_id] = {**data, "timestamp": data.get("timestamp") or datetime.utcnow().isoformat() + "Z"}
+async def set_receipt(receipt_id: str, data: dict[str, Any]) -> None:
+    stored = {**data, "receipt_id": receipt_id, "timestamp": data.get("timestamp") or _now_iso()}
+    await _backend.put(receipt_id, stored)
+    await savings.record(stored, time_bucket(stored["timestamp"]))
+    await budget.record(stored)
+    if stored.get("project_id") is not None and stored.get("net_savings"):
+        await leaderboard.record(str(stored["project_id"]), float(stored["net_savings"]))
 
 
-def get_receipt(receipt_id: str) -> dict[str, Any] | None:
-    return _store.get(receipt_id)
+async def get_receipt(receipt_id: str) -> dict[str, Any] | None:
+    return await _backend.get(receipt_id)
 
 
-def get_nutrition(receipt_id: str) -> dict[str, Any] | None:
+async def get_nutrition(receipt_id: str) -> dict[str, Any] | None:
     """Return nutrition-label shape from stored receipt or None (hero metric: efficiency_multiplier)."""
-    r = _store.get(receipt_id)
+    r = await _backend.get(receipt_id)
     if not r:
         return None
     return {
@@ -31,6 +341,24 @@ def get_nutrition(receipt_id: str) -> dict[str, Any] | None:
     }
 
 
-def get_all_receipts() -> list[dict[str, Any]]:
-    """Return all stored receipts for aggregation (e.g. total_user_savings_g)."""
-    return list(_store.values())
+async def query_receipts(
+    user_id: str | None = None,
+    project_id: str | None = None,
+    model: str | None = None,
+    zone: str | None = None,
+    bucket: str | None = None,
+    limit: int | None = 100,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    before_id: str | None = None,
+) -> list[dict[str, Any]]:
+    """
+    Newest-first receipts matching every given filter, via the secondary indexes.
+    since / until bound creation time ([since, until)); before_id is a pagination
+    cursor (pass the last receipt_id of the previous page). Both are ID-range scans.
+    """
+    start_id = id_floor(since, RECEIPT_ID_PREFIX) if since is not None else None
+    end_id = id_floor(until, RECEIPT_ID_PREFIX) if until is not None else None
+    if before_id is not None and (end_id is None or before_id < end_id):
+        end_id = before_id
+    return await _backend.query(_filters(user_id, project_id, model, zone, bucket), limit, start_id, end_id)
@@ -0,0 +1,117 @@
+"""
+Geographic load shifting: which region should run a call right now?
+
+Each region in server_model_map.json names its grid zone (em_zone, wt_region).
+Its intensity is the live reading for that zone from grid_engine, cached per
+zone like the default zone's. The home region (the client's default location)
+uses the live reading for the default zone. A region without a reading is not
+a candidate. A call only moves to another region serving the same model; the
+model is never swapped.
+
+RegionPlanner snapshots those readings once and then places many tasks. The
+worker claims every deferred task whose cleanest placement beats its target
+(claim_thresholds) and places the whole batch in one pass (place_all). Tasks
+wait only when no region beats their target.
+"""
+import asyncio
+import os
+
+from loguru import logger
+
+from core.grid_engine import get_grid_carbon
+from core.llm_client import SERVER_MODEL_MAP
+
+REGION_SHIFT = os.getenv("REGION_SHIFT", "true").lower() in ("1", "true", "yes")
+# How long a placement waits for regional readings; slower zones are skipped this time (the fetch still fills the cache)
+REGION_SHIFT_LOOKUP_SECONDS = float(os.getenv("REGION_SHIFT_LOOKUP_SECONDS", "2"))
+
+
+def _zone_intensity(em_zone: str, wt_region: str) -> float | None:
+    try:
+        intensity = get_grid_carbon(em_zone, wt_region).get("carbon_intensity_g_per_kwh")
+    except Exception as e:
+        logger.warning(f"Region shift | no reading for {em_zone}: {e}")
+        return None
+    return float(intensity) if intensity is not None else None
+
+
+async def live_region_intensities(
+    model_map: dict | None = None, timeout: float = REGION_SHIFT_LOOKUP_SECONDS
+) -> dict[str, float]:
+    """
+    Live g/kWh per region of model_map that has an em_zone. Lookups run in worker
+    threads, all at once; regions without a reading within timeout are left out.
+    """
+    model_map = SERVER_MODEL_MAP if model_map is None else model_map
+    lookups = {
+        asyncio.ensure_future(
+            asyncio.to_thread(_zone_intensity, rdata["em_zone"], rdata.get("wt_region") or rdata["em_zone"])
+        ): region
+        for region, rdata in model_map.items()
+        if rdata.get("em_zone")
+    }
+    if not lookups:
+        return {}
+    done, _ = await asyncio.wait(lookups, timeout=timeout)
+    return {lookups[task]: task.result() for task in done if task.result() is not None}
+
+
+def region_receipt(region: str) -> dict:
+    """Receipt fields for a call run in region: server_location, grid_zone and a carbon-free / fossil mix."""
+    rdata = SERVER_MODEL_MAP.get(region, {})
+    cfe = rdata.get("cfe_percent", 0)
+    return {
+        "server_location": f"{region} ({rdata.get('location', 'unknown')})",
+        "grid_zone": rdata.get("em_zone", region),
+        "grid_source": {"carbon_free": cfe, "fossil": 100 - cfe},
+    }
+
+
+class RegionPlanner:
+    """Cleanest region per model for one snapshot of live regional intensities."""
+
+    __slots__ = ("home", "home_intensity", "_candidates", "_placed")
+
+    def __init__(
+        self, home: str, home_intensity: float, intensities: dict[str, float], model_map: dict | None = None
+    ):
+        model_map = SERVER_MODEL_MAP if model_map is None else model_map
+        self.home = home
+        self.home_intensity = home_intensity
+        # model id -> [(intensity, region)] over the regions serving it
+        self._candidates: dict[str, list[tuple[float, str]]] = {}
+        for region, rdata in model_map.items():
+            intensity = home_intensity if region == home else intensities.get(region)
+            if intensity is None:
+                continue
+            for m in rdata.get("available_models", []):
+                self._candidates.setdefault(m["id"], []).append((intensity, region))
+        self._placed: dict[str, dict] = {}
+
+    def place(self, model_id: str) -> dict:
+        """
+        Where to run model_id now: model (always model_id), region, intensity and
+        shifted (False when that is the home region). Ties keep home.
+        """
+        placed = self._placed.get(model_id)
+        if placed is not None:
+            return placed
+        best = (self.home_intensity, False, self.home)
+        for intensity, region in self._candidates.get(model_id, ()):
+            best = min(best, (intensity, region != self.home, region))
+        intensity, _, region = best
+        placed = self._placed[model_id] = {
+            "model": model_id,
+            "region": region,
+            "intensity": intensity,
+            "shifted": region != self.home,
+        }
+        return placed
+
+    def place_all(self, tasks: list[dict]) -> list[dict]:
+        """Placement for each task (by its model_tier); one lookup per distinct model."""
+        return [self.place(task["model_tier"]) for task in tasks]
+
+    def claim_thresholds(self) -> dict[str, float]:
+        """Model id -> cleanest intensity reachable now; a task is runnable when its target is at least this."""
+        return {model: self.place(model)["intensity"] for model in self._candidates}
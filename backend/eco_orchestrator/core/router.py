@@ -0,0 +1,141 @@
+"""
+Learned complexity -> model-tier router.
+
+An ordinal logistic model over ComplexityScorer.features: for each power level
+but the last ("low", "medium", ...) one logistic head gives P(prompt needs more
+than that level). A prompt goes to the lowest level whose head is below
+ROUTER_ESCALATE_PROBABILITY, then to that level's model in SERVER_MODEL_MAP.
+
+Heads are trained offline from logged (features, model, outcome) rows by
+scripts/train_router.py and saved as a small JSON artifact (ROUTER_MODEL_PATH).
+It is loaded once at startup. Feature scaling is folded into the weights at
+load time, so inference is a few pure-Python dot products (no NumPy at
+runtime, a few µs per prompt). Without an artifact every prompt routes to the
+lowest level, which is what the orchestrator did before.
+
+With ROUTER_LOG_PATH set, every answered call appends one training row
+(features of the raw prompt, model, outcome) to that JSONL file through a
+queued loguru sink, so the orchestrator never waits on the write.
+"""
+import json
+import math
+import os
+from pathlib import Path
+
+from loguru import logger
+
+from core.classifier import FEATURE_NAMES, ComplexityScorer
+from core.llm_client import LLMClient, SERVER_MODEL_MAP
+
+ROUTER_MODEL_PATH = os.getenv(
+    "ROUTER_MODEL_PATH", str(Path(__file__).resolve().parent.parent / "data" / "router_model.json")
+)
+ROUTER_ESCALATE_PROBABILITY = float(os.getenv("ROUTER_ESCALATE_PROBABILITY", "0.5"))
+ROUTER_ARTIFACT_VERSION = 1
+# JSONL of (features, model, outcome) rows for scripts/train_router.py; "" disables logging
+ROUTER_LOG_PATH = os.getenv("ROUTER_LOG_PATH", "")
+
+# Cheapest first
+POWER_LEVELS = ("low", "medium", "high")
+
+
+def power_level_models(region: str = LLMClient.DEFAULT_REGION) -> dict[str, str]:
+    """First model of each power level in region, else in any region (SERVER_MODEL_MAP order)."""
+    models: dict[str, str] = {}
+    regions = [SERVER_MODEL_MAP.get(region, {})] + list(SERVER_MODEL_MAP.values())
+    for rdata in regions:
+        for m in rdata.get("available_models", []):
+            models.setdefault(m["power_level"], m["id"])
+    return models
+
+
+def model_power_level(model_id: str) -> str | None:
+    for rdata in SERVER_MODEL_MAP.values():
+        for m in rdata.get("available_models", []):
+            if m["id"] == model_id:
+                return m["power_level"]
+    return None
+
+
+class TierRouter:
+    """Picks a power level (and model) per prompt from a trained artifact."""
+
+    def __init__(
+        self,
+        artifact: dict | None = None,
+        scorer: ComplexityScorer | None = None,
+        level_models: dict[str, str] | None = None,
+        escalate_probability: float = ROUTER_ESCALATE_PROBABILITY,
+    ):
+        self.scorer = scorer or ComplexityScorer()
+        self.level_models = level_models or power_level_models()
+        self.levels = tuple(lv for lv in POWER_LEVELS if lv in self.level_models) or (POWER_LEVELS[0],)
+        # Compare logits instead of calling exp() per head
+        p = min(max(escalate_probability, 1e-6), 1 - 1e-6)
+        self._logit_threshold = math.log(p / (1 - p))
+        self._heads: list[tuple[tuple[float, ...], float]] = []
+        if artifact is not None:
+            self._load(artifact)
+
+    def _load(self, artifact: dict) -> None:
+        if artifact.get("version") != ROUTER_ARTIFACT_VERSION or tuple(artifact["features"]) != FEATURE_NAMES:
+            logger.warning("Router artifact does not match this scorer's features; routing everything to the lowest level")
+            return
+        self.levels = tuple(artifact["levels"])
+        mean, scale = artifact["mean"], artifact["scale"]
+        for head in artifact["heads"]:
+            # w . ((x - mean) / scale) + b  ==  w' . x + b'
+            weights = tuple(w / s for w, s in zip(head["w"], scale))
+            bias = head["b"] - sum(w * m for w, m in zip(weights, mean))
+            self._heads.append((weights, bias))
+
+    @classmethod
+    def load(cls, path: str = ROUTER_MODEL_PATH, **kwargs) -> "TierRouter":
+        try:
+            with open(path) as f:
+                artifact = json.load(f)
+        except FileNotFoundError:
+            logger.info(f"No router artifact at {path}; routing every prompt to the cheapest tier")
+            artifact = None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Router artifact {path} unreadable ({e}); routing every prompt to the cheapest tier")
+            artifact = None
+        return cls(artifact, **kwargs)
+
+    def level_index(self, features: list[float]) -> int:
+        """Index into self.levels: the first level the model does not expect the prompt to outgrow."""
+        threshold = self._logit_threshold
+        for k, (weights, bias) in enumerate(self._heads):
+            z = bias
+            for w, x in zip(weights, features):
+                z += w * x
+            if z < threshold:
+                return k
+        return len(self._heads)
+
+    def route(self, text: str) -> dict:
+        """Power level and model for text."""
+        features = self.scorer.features(text)
+        k = min(self.level_index(features), len(self.levels) - 1)
+        # A level with no model anywhere in the map falls back to the next cheaper one
+        while k > 0 and self.levels[k] not in self.level_models:
+            k -= 1
+        level = self.levels[k]
+        model = self.level_models.get(level, LLMClient.DEFAULT_MODEL)
+        return {"power_level": level, "model": model, "features": features}
+
+
+def log_route(features: list[float], model: str, outcome: bool) -> None:
+    """Record one routed call as a training row (no-op unless ROUTER_LOG_PATH is set)."""
+    if ROUTER_LOG_PATH:
+        _route_log.debug(json.dumps({"features": features, "model": model, "outcome": outcome}))
+
+
+# Loaded once per process
+router = TierRouter.load()
+_route_log = logger.bind(router_row=True)
+if ROUTER_LOG_PATH:
+    logger.add(
+        ROUTER_LOG_PATH, format="{message}", level="DEBUG", enqueue=True,
+        filter=lambda record: record["extra"].get("router_row", False),
+    )
@@ -0,0 +1,246 @@
+"""
+Priority scheduler for outbound LLM calls.
+
+At most SCHEDULER_CONCURRENCY calls run at once per process. While every slot
+is busy, callers wait in one of three classes served in strict priority:
+urgent (is_urgent requests), interactive (/orchestrate, agent steps) and batch
+(deferred-queue work). Within a class:
+
+- a request whose deadline is under SCHEDULER_EDF_HORIZON_SECONDS away goes
+  first, earliest deadline first;
+- otherwise projects share the class by weighted fair queuing (start-time fair
+  queuing on estimated tokens), so one project's burst cannot starve the
+  others, and each project's own requests run in deadline order.
+
+Queue waits per class go into a LatencyHistogram; stats() reports them.
+
+A caller that has to wait on something other than the provider while holding a
+slot (the rate limiter) wraps that wait in slot_released(): the slot goes to
+the next waiter meanwhile and the caller queues for it again afterwards.
+"""
+import asyncio
+import contextvars
+import heapq
+import itertools
+import math
+import os
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+from core.latency import LATENCY_MIN_SECONDS, LatencyHistogram
+
+PRIORITY_CLASSES = ("urgent", "interactive", "batch")
+SCHEDULER_CONCURRENCY = int(os.getenv("SCHEDULER_CONCURRENCY", "16"))
+SCHEDULER_EDF_HORIZON_SECONDS = float(os.getenv("SCHEDULER_EDF_HORIZON_SECONDS", "30"))
+
+
+class _Held:
+    """The slot a task holds, with what it needs to queue for it again."""
+
+    __slots__ = ("scheduler", "priority", "project_id", "deadline", "cost", "holding", "waiters", "reacquiring")
+
+    def __init__(self, scheduler, priority, project_id, deadline, cost):
+        self.scheduler = scheduler
+        self.priority = priority
+        self.project_id = project_id
+        self.deadline = deadline
+        self.cost = cost
+        self.holding = True
+        # Tasks of this holder (hedges, cascade calls) currently inside slot_released()
+        self.waiters = 0
+        # The one queued re-acquire of the slot, shared by every task leaving slot_released()
+        self.reacquiring: asyncio.Task | None = None
+
+    async def _reacquire(self) -> None:
+        await self.scheduler._acquire(self.priority, self.project_id, self.deadline, self.cost)
+        self.holding = True
+        self.reacquiring = None
+
+
+# Slot held by the current task (inherited by the tasks it starts)
+_held: contextvars.ContextVar[_Held | None] = contextvars.ContextVar("scheduler_slot", default=None)
+
+
+class _ClassQueue:
+    """Waiters of one priority class: a deadline-ordered heap per project, plus WFQ tags."""
+
+    __slots__ = ("projects", "finish", "vtime", "size", "served", "waits", "wait_max")
+
+    def __init__(self):
+        # project -> heap of (deadline, seq, cost, future)
+        self.projects: dict[str, list] = {}
+        # project -> virtual finish tag of its last dispatched request
+        self.finish: dict[str, float] = {}
+        self.vtime = 0.0
+        self.size = 0
+        self.served = 0
+        self.waits = LatencyHistogram()
+        self.wait_max = 0.0
+
+    def push(self, project: str, deadline: float, seq: int, cost: float, fut: asyncio.Future) -> None:
+        heapq.heappush(self.projects.setdefault(project, []), (deadline, seq, cost, fut))
+        self.size += 1
+
+    def pop(self, now: float, horizon: float, weights: dict[str, float]) -> asyncio.Future:
+        edf = fair = None
+        for project, heap in self.projects.items():
+            deadline, seq = heap[0][0], heap[0][1]
+            if deadline - now <= horizon and (edf is None or (deadline, seq) < edf[0]):
+                edf = ((deadline, seq), project)
+            start = max(self.vtime, self.finish.get(project, 0.0))
+            if fair is None or (start, seq) < fair[0]:
+                fair = ((start, seq), project)
+        project = (edf or fair)[1]
+        heap = self.projects[project]
+        _, _, cost, fut = heapq.heappop(heap)
+        if not heap:
+            del self.projects[project]
+        start = max(self.vtime, self.finish.get(project, 0.0))
+        self.finish[project] = start + cost / weights.get(project, 1.0)
+        self.vtime = start
+        self.size -= 1
+        if len(self.finish) > 2 * len(self.projects) + 64:
+            # Tags at or behind virtual time no longer affect anyone's share
+            self.finish = {p: f for p, f in self.finish.items() if f > self.vtime}
+        return fut
+
+    def record(self, waited: float) -> None:
+        self.served += 1
+        self.waits.record(waited)
+        self.wait_max = max(self.wait_max, waited)
+
+    def wait_ms(self, q: float) -> float:
+        """Queue-wait quantile in ms; waits under the histogram's first bucket (10 ms) count as 0."""
+        seconds = self.waits.quantile(q)
+        return round(seconds * 1000, 1) if seconds > LATENCY_MIN_SECONDS else 0.0
+
+
+class Scheduler:
+    """Bounded LLM concurrency with priority classes, per-project fairness and deadlines."""
+
+    def __init__(self, concurrency: int = SCHEDULER_CONCURRENCY, edf_horizon: float = SCHEDULER_EDF_HORIZON_SECONDS):
+        self.concurrency = concurrency
+        self.edf_horizon = edf_horizon
+        self.in_flight = 0
+        self.queued = 0
+        self.queues = {c: _ClassQueue() for c in PRIORITY_CLASSES}
+        self.weights: dict[str, float] = {}
+        self._seq = itertools.count()
+
+    def set_weight(self, project_id: str, weight: float) -> None:
+        self.weights[str(project_id)] = weight
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        priority: str = "interactive",
+        project_id: str | None = None,
+        deadline: datetime | None = None,
+        cost: float = 1.0,
+    ):
+        """Hold one LLM slot for the block; yields seconds spent queued. cost is the call's estimated tokens."""
+        waited = await self._acquire(priority, project_id, deadline, cost)
+        held = _Held(self, priority, project_id, deadline, cost)
+        token = _held.set(held)
+        try:
+            yield waited
+        finally:
+            _held.reset(token)
+            if held.reacquiring is not None:
+                # Still queued to get the slot back: drop the request (a just-granted slot is handed on)
+                held.reacquiring.cancel()
+            elif held.holding:
+                self._release()
+
+    async def _acquire(self, priority: str, project_id, deadline: datetime | None, cost: float) -> float:
+        """Take a slot, queueing if none is free; returns seconds spent queued."""
+        queue = self.queues[priority]
+        start = time.monotonic()
+        if self.in_flight < self.concurrency and not self.queued:
+            self.in_flight += 1
+        else:
+            fut = asyncio.get_running_loop().create_future()
+            queue.push(
+                str(project_id or ""),
+                deadline.timestamp() if deadline is not None else math.inf,
+                next(self._seq),
+                max(cost, 1.0),
+                fut,
+            )
+            self.queued += 1
+            self._dispatch()
+            try:
+                await fut
+            except asyncio.CancelledError:
+                # Granted just as the caller went away: hand the slot on
+                if fut.done() and not fut.cancelled():
+                    self._release()
+                raise
+        waited = time.monotonic() - start
+        queue.record(waited)
+        return waited
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Hand free slots to waiters: highest class first, then EDF / fair share within it."""
+        now = time.time()
+        while self.in_flight < self.concurrency and self.queued:
+            queue = next(q for q in self.queues.values() if q.size)
+            fut = queue.pop(now, self.edf_horizon, self.weights)
+            self.queued -= 1
+            if fut.cancelled():
+                continue
+            self.in_flight += 1
+            fut.set_result(None)
+
+    def stats(self) -> dict:
+        """Slots in use and, per class, queue depth and queue-wait percentiles."""
+        return {
+            "concurrency": self.concurrency,
+            "in_flight": self.in_flight,
+            "classes": {
+                name: {
+                    "queued": q.size,
+                    "served": q.served,
+                    "wait_p50_ms": q.wait_ms(0.5),
+                    "wait_p95_ms": q.wait_ms(0.95),
+                    "wait_max_ms": round(q.wait_max * 1000, 1),
+                }
+                for name, q in self.queues.items()
+            },
+        }
+
+
+@asynccontextmanager
+async def slot_released():
+    """
+    Hand the current task's slot to the next waiter for the block, then queue for it
+    again (same class, project, deadline and cost). A no-op outside a slot. Tasks
+    sharing the slot queue for it once: a task leaving while the slot is already
+    being re-acquired waits for that.
+    """
+    held = _held.get()
+    if held is None:
+        yield
+        return
+    held.waiters += 1
+    if held.holding:
+        held.holding = False
+        held.scheduler._release()
+    try:
+        yield
+    finally:
+        held.waiters -= 1
+        # The last task out queues for the slot; one leaving while that is pending waits for it
+        if not held.holding and (held.waiters == 0 or held.reacquiring is not None):
+            if held.reacquiring is None:
+                held.reacquiring = asyncio.ensure_future(held._reacquire())
+            await asyncio.shield(held.reacquiring)
+
+
+# One per process: every LLM call made by this worker shares its slots
+scheduler = Scheduler()
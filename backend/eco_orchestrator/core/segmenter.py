@@ -0,0 +1,221 @@
+"""
+Prompt segmentation for EcoCompressor: splits a prompt into prose, fenced
+code, JSON and stack traces in one streaming pass over its lines, and minifies
+the non-prose segments.
+
+Prose gets the compressor's usual treatment (lowercase, fluff and stop words
+dropped). That treatment corrupts code, JSON keys and traces (`for x in y`
+becomes `x y`), so those are only minified: comments and redundant whitespace
+go, everything the code means stays.
+
+Lines are read once and never looked back at, except that the prose line
+right before a JVM / Node stack frame is taken as the trace's header (the
+exception message). Prose is yielded in batches of PROSE_BATCH_LINES, so a
+multi-megabyte pasted log never sits in memory twice.
+"""
+import json
+import re
+from typing import Iterable, Iterator
+
+PROSE, CODE, JSON, TRACE = "prose", "code", "json", "trace"
+
+PROSE_BATCH_LINES = 512
+# A JSON candidate still open after this many characters is handed back as prose
+JSON_MAX_CHARS = 1_000_000
+
+_FENCE = re.compile(r"[ \t]*(```|~~~)[ \t]*([\w+#.-]*)")
+_PY_TRACE_START = re.compile(
+    r"Traceback \(most recent call last\):"
+    r"|During handling of the above exception"
+    r"|The above exception was the direct cause"
+)
+# JVM "at com.x.Y.z(Y.java:42)" / "(Native Method)", Node "at fn (file.js:10:5)"
+_FRAME = re.compile(r"[ \t]+at \S.*(?::\d+\)?|\((?:Native Method|Unknown Source)\))[ \t]*")
+_FRAME_CONT = re.compile(r"Caused by: |[ \t]+\.\.\. \d+ more[ \t]*$")
+_JSON_STRING = re.compile(r'"(?:\\.|[^"\\])*"')
+# How a line inside pretty-printed JSON can start
+_JSON_LINE_STARTS = frozenset('"{}[]-0123456789tfn')
+_CARETS = re.compile(r"[ \t^~]+")
+
+# Comment syntax per fence language; strings are matched first so comment markers inside them survive
+_STRINGS = r'"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\''
+_HASH_COMMENTS = re.compile(
+    r'("""[\s\S]*?"""|\'\'\'[\s\S]*?\'\'\'|' + _STRINGS + r")|(?:^|(?<=[ \t]))#(?!!)[^\n]*", re.M
+)
+_SLASH_COMMENTS = re.compile(r"(" + _STRINGS + r"|`(?:\\.|[^`\\])*`)|//[^\n]*|/\*[\s\S]*?\*/")
+_BLOCK_COMMENTS = re.compile(r"(" + _STRINGS + r")|/\*[\s\S]*?\*/")
+_SQL_COMMENTS = re.compile(r"(\"[^\"]*\"|'(?:''|[^'])*')|--[^\n]*|/\*[\s\S]*?\*/")
+_MARKUP_COMMENTS = re.compile(r"()<!--[\s\S]*?-->")
+
+_LANG_COMMENTS = {}
+for _names, _pattern in (
+    ("python py python3 ruby rb sh bash shell zsh console yaml yml toml r perl pl make makefile "
+     "dockerfile powershell ps1 nim coffee elixir ex", _HASH_COMMENTS),
+    ("c h cpp c++ cc hpp cs csharp java js javascript jsx mjs ts typescript tsx go golang rust rs "
+     "kotlin kt swift scala php dart scss less jsonc json5 sol solidity groovy proto", _SLASH_COMMENTS),
+    ("css", _BLOCK_COMMENTS),
+    ("sql psql mysql postgres postgresql sqlite plsql", _SQL_COMMENTS),
+    ("html xml svg vue", _MARKUP_COMMENTS),
+):
+    for _name in _names.split():
+        _LANG_COMMENTS[_name] = _pattern
+
+# Indentation is syntax here, so only trailing whitespace is stripped
+INDENT_SENSITIVE = frozenset("python py python3 yaml yml make makefile nim coffee haskell hs fsharp f#".split())
+
+
+def _keep_strings(m: re.Match) -> str:
+    return m.group(1) or ""
+
+
+def minify_code(code: str, lang: str = "") -> str:
+    """Strip comments (for known languages), blank lines, trailing and (where safe) leading whitespace."""
+    lang = lang.lower()
+    comments = _LANG_COMMENTS.get(lang)
+    if comments is not None:
+        code = comments.sub(_keep_strings, code)
+    dedent = comments is not None and lang not in INDENT_SENSITIVE
+    lines = (line.strip() if dedent else line.rstrip() for line in code.split("\n"))
+    return "\n".join(line for line in lines if line)
+
+
+def minify_trace(trace: str) -> str:
+    """Drop indentation and caret markers; collapse runs of an identical frame line."""
+    out: list[str] = []
+    last, repeats = None, 0
+    for line in trace.split("\n"):
+        line = line.strip()
+        if not line or _CARETS.fullmatch(line):
+            continue
+        if line == last:
+            repeats += 1
+            continue
+        if repeats:
+            out.append(f"[Previous line repeated {repeats} more times]")
+        out.append(line)
+        last, repeats = line, 0
+    if repeats:
+        out.append(f"[Previous line repeated {repeats} more times]")
+    return "\n".join(out)
+
+
+def _json_depth(line: str) -> int:
+    stripped = _JSON_STRING.sub("", line)
+    return (
+        stripped.count("{") + stripped.count("[")
+        - stripped.count("}") - stripped.count("]")
+    )
+
+
+def segments(lines: Iterable[str]) -> Iterator[tuple[str, str, str]]:
+    """
+    (kind, lang, text) for each segment of lines, in order. kind is PROSE,
+    CODE (fence body, lang from the fence tag), TRACE or JSON (already
+    minified: detecting JSON means parsing it). Consecutive prose comes in
+    batches of raw lines joined by newlines.
+    """
+    prose: list[str] = []
+    it = iter(lines)
+    pending: str | None = None
+
+    def flush_prose(keep_last: bool = False):
+        nonlocal prose
+        held = prose[-1:] if keep_last else []
+        body = prose[:-1] if keep_last else prose
+        prose = held
+        return (PROSE, "", "\n".join(body)) if body else None
+
+    while True:
+        if pending is not None:
+            line, pending = pending, None
+        else:
+            line = next(it, None)
+            if line is None:
+                break
+            line = line.rstrip("\r\n")
+        first = line[:1]
+        if not first:
+            prose.append(line)
+            continue
+
+        fence = _FENCE.match(line) if first in "`~ \t" else None
+        if fence:
+            if (chunk := flush_prose()):
+                yield chunk
+            marker, lang = fence.group(1), fence.group(2)
+            body: list[str] = []
+            for line in it:
+                line = line.rstrip("\r\n")
+                if line.strip().startswith(marker):
+                    break
+                body.append(line)
+            yield CODE, lang, "\n".join(body)
+            continue
+
+        if first in "TD" and _PY_TRACE_START.match(line):
+            if (chunk := flush_prose()):
+                yield chunk
+            trace = [line]
+            for line in it:
+                line = line.rstrip("\r\n")
+                if line[:1] in (" ", "\t"):
+                    trace.append(line)
+                    continue
+                # First unindented line: the exception message ends the trace, anything else starts over
+                if line.strip() and not _PY_TRACE_START.match(line):
+                    trace.append(line)
+                else:
+                    pending = line
+                break
+            yield TRACE, "", "\n".join(trace)
+            continue
+
+        if first in " \t" and _FRAME.fullmatch(line):
+            header = prose.pop() if prose and prose[-1].strip() else None
+            if (chunk := flush_prose()):
+                yield chunk
+            trace = [header, line] if header is not None else [line]
+            for line in it:
+                line = line.rstrip("\r\n")
+                if _FRAME.fullmatch(line) or _FRAME_CONT.match(line):
+                    trace.append(line)
+                else:
+                    pending = line
+                    break
+            yield TRACE, "", "\n".join(trace)
+            continue
+
+        if first in "{[":
+            candidate = [line]
+            depth, size = _json_depth(line), len(line)
+            while depth > 0 and size <= JSON_MAX_CHARS:
+                line = next(it, None)
+                if line is None:
+                    break
+                line = line.rstrip("\r\n")
+                if line.lstrip()[:1] not in _JSON_LINE_STARTS:
+                    pending = line  # not JSON after all; this line is looked at afresh
+                    break
+                candidate.append(line)
+                depth += _json_depth(line)
+                size += len(line) + 1
+            text = "\n".join(candidate)
+            try:
+                value = json.loads(text) if depth == 0 else None
+            except ValueError:
+                value = None
+            if value is not None and isinstance(value, (dict, list)):
+                if (chunk := flush_prose()):
+                    yield chunk
+                yield JSON, "", json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+            else:
+                prose.extend(candidate)
+            continue
+
+        prose.append(line)
+        if len(prose) > PROSE_BATCH_LINES:
+            # Keep the last line back: it may turn out to be a stack trace's header
+            yield flush_prose(keep_last=True)
+
+    if (chunk := flush_prose()):
+        yield chunk
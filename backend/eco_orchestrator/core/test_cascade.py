@@ -0,0 +1,128 @@
+import asyncio
+import os
+import sys
+
+# Ensure the parent package (eco_orchestrator) is importable so we can import `core`.
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from core.cascade import Cascade, check_answer
+
+MODELS = {"low": "low-model", "medium": "medium-model"}
+
+
+class FakeClient:
+    """generate() answers from a per-model (delay seconds, response) table."""
+
+    def __init__(self, answers: dict):
+        self.answers = answers
+        self.calls = []
+
+    async def generate(self, prompt, model_name):
+        self.calls.append(model_name)
+        delay, response = self.answers[model_name]
+        await asyncio.sleep(delay)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def test_check_answer():
+    assert check_answer("hi", "") == "empty"
+    assert check_answer("hi", "I'm sorry, but I can't help with that.") == "refusal"
+    assert check_answer("write code", "```python\nprint(1)") == "truncated"
+    assert check_answer(" ".join(["word"] * 60), "Yes.") == "too_short"
+    assert check_answer("hi", "Hello! ```x``` works.") is None
+
+
+def test_good_low_answer_is_not_escalated():
+    client = FakeClient({"low-model": (0, "Paris is the capital of France."), "medium-model": (0, "Paris.")})
+    cascade = Cascade(client, MODELS)
+    out = asyncio.run(cascade.run("Capital of France?"))
+    assert out["model"] == "low-model" and not out["escalated"], out
+    assert client.calls == ["low-model"]
+    assert cascade.escalation_rate == 0.0
+
+
+def test_rejected_or_failed_low_answer_escalates():
+    for low in ("", RuntimeError("quota")):
+        client = FakeClient({"low-model": (0, low), "medium-model": (0, "A full answer.")})
+        cascade = Cascade(client, MODELS)
+        out = asyncio.run(cascade.run("Explain it."))
+        assert out["model"] == "medium-model" and out["escalated"], out
+        assert out["reason"] in ("empty", "error"), out
+        assert [c["role"] for c in out["calls"]] == ["low", "medium"]
+        assert cascade.escalation_rate == 1.0
+
+
+def test_hedged_mode_takes_the_first_acceptable_answer_and_cancels_the_other():
+    client = FakeClient({"low-model": (0.5, "Slow but fine."), "medium-model": (0.01, "Fast answer.")})
+    out = asyncio.run(Cascade(client, MODELS, hedge_after=0.01).run("Explain it.", "hedged"))
+    assert out["model"] == "medium-model" and out["hedged"], out
+    assert {"role": "low", "rejected": "cancelled"}.items() <= out["calls"][-1].items(), out["calls"]
+
+    client = FakeClient({"low-model": (0, "Quick and fine."), "medium-model": (0, "Unused.")})
+    out = asyncio.run(Cascade(client, MODELS, hedge_after=0.5).run("Explain it.", "hedged"))
+    assert out["model"] == "low-model" and not out["hedged"], out
+    assert client.calls == ["low-model"]
+
+
+def test_hedged_attempts_finishing_together_are_both_recorded():
+    class TogetherClient(FakeClient):
+        """Both models answer at the same moment, once the hedge has started."""
+
+        async def generate(self, prompt, model_name):
+            self.calls.append(model_name)
+            if len(self.calls) == 2:
+                self.go.set()
+            await self.go.wait()
+            return self.answers[model_name][1]
+
+    async def main():
+        client = TogetherClient({"low-model": (0, "Low answer."), "medium-model": (0, "Medium answer.")})
+        client.go = asyncio.Event()
+        return await Cascade(client, MODELS, hedge_after=0.01).run("Explain it.", "hedged")
+
+    out = asyncio.run(main())
+    # Whichever wins, the other finished call is charged, not dropped
+    assert sorted((c["role"], c["rejected"]) for c in out["calls"]) == [("low", None), ("medium", None)], out["calls"]
+
+
+def test_judge_rejection_escalates():
+    client = FakeClient({"low-model": (0, "Maybe 42."), "medium-model": (0, "It is 41."), "judge": (0, "NO")})
+    out = asyncio.run(Cascade(client, MODELS, judge_model="judge").run("What is 20 + 21?"))
+    assert out["model"] == "medium-model" and out["reason"] == "judge", out
+
+
+def test_judge_verdict_on_long_prompt():
+    # A one-word verdict on a long prompt is not a "too short" answer: NO still escalates, YES still passes
+    prompt = " ".join(["Explain the trade-offs in detail."] * 20)
+    answer = " ".join(["A thorough answer."] * 10)
+    for verdict, model in (("NO", "medium-model"), ("YES", "low-model"), (RuntimeError("judge down"), "medium-model")):
+        client = FakeClient({"low-model": (0, answer), "medium-model": (0, answer), "judge": (0, verdict)})
+        out = asyncio.run(Cascade(client, MODELS, judge_model="judge").run(prompt))
+        assert out["model"] == model, (verdict, out)
+
+
+def run() -> int:
+    tests = (
+        test_check_answer,
+        test_good_low_answer_is_not_escalated,
+        test_rejected_or_failed_low_answer_escalates,
+        test_hedged_mode_takes_the_first_acceptable_answer_and_cancels_the_other,
+        test_hedged_attempts_finishing_together_are_both_recorded,
+        test_judge_rejection_escalates,
+        test_judge_verdict_on_long_prompt,
+    )
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            print(f"FAIL: {test.__name__}: {e}")
+            return 1
+    print("PASS: cascade verifies, escalates and hedges as expected")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(run())
@@ -0,0 +1,62 @@
+import asyncio
+import os
+import sys
+
+# Ensure the parent package (eco_orchestrator) is importable so we can import `core`.
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+import core.chat_store as chat_store_module
+from core.chat_store import ChatStore, MemoryChatStore
+
+
+class SlowBackend(MemoryChatStore):
+    """Memory backend whose writes wait until released."""
+
+    def __init__(self):
+        super().__init__()
+        self.release = asyncio.Event()
+
+    async def write_batch(self, entries):
+        await self.release.wait()
+        await super().write_batch(entries)
+
+
+def test_backlog_cap_never_drops_the_batch_being_written():
+    async def main():
+        store = ChatStore(SlowBackend(), batch_size=2, flush_interval=60)
+        for i in range(2):
+            store.append("chat_a", "user", f"m{i}", user_id="u")
+        flushing = asyncio.create_task(store.flush())
+        await asyncio.sleep(0)  # m0, m1 are now being written
+        for i in range(2, 6):
+            store.append("chat_a", "user", f"m{i}", user_id="u")  # over the cap: drops the oldest unwritten
+        store.backend.release.set()
+        await flushing
+        await store.flush()
+        messages = (await store.history("chat_a"))["messages"]
+        return [m["content"] for m in messages]
+
+    saved = chat_store_module.CHAT_MAX_PENDING
+    chat_store_module.CHAT_MAX_PENDING = 2
+    try:
+        contents = asyncio.run(main())
+    finally:
+        chat_store_module.CHAT_MAX_PENDING = saved
+    assert contents == ["m0", "m1", "m4", "m5"], contents
+
+
+def run() -> int:
+    tests = (test_backlog_cap_never_drops_the_batch_being_written,)
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            print(f"FAIL: {test.__name__}: {e}")
+            return 1
+    print("PASS: chat store keeps in-flight batches under backlog pressure")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(run())
@@ -0,0 +1,101 @@
+import os
+import random
+import re
+import sys
+
+# Ensure the parent package (eco_orchestrator) is importable so we can import `core`.
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from core.classifier import ComplexityScorer, score_complexity
+
+
+def legacy_score(text: str) -> dict:
+    """The per-regex ComplexityScorer.score whose results must still match, frozen as the reference."""
+    code_patterns = [
+        r"def\s+\w+\(.*\):", r"class\s+\w+[:\(]", r"import\s+\w+",
+        r"[\{\}\[\]]{3,}", r"(\+\+|--|&&|\|\|)", r"(\w+\s*=\s*\w+;)",
+    ]
+    complex_keywords = {
+        "analyze": 1.5, "calculate": 2.0, "reason": 1.8,
+        "optimize": 2.0, "architect": 2.5, "debug": 2.0,
+        "theorem": 2.5, "derivative": 2.0, "gradient": 2.0,
+        "asymptotic": 3.0, "complexity": 1.5
+    }
+    if not text:
+        return {"total_score": 0.0, "tier": "gemini-2.0-flash"}
+    raw_score = 0.0
+    for pattern in code_patterns:
+        if re.search(pattern, text):
+            raw_score += 3.0
+            break
+    words = text.lower().split()
+    for word, weight in complex_keywords.items():
+        if word in words:
+            raw_score += weight
+    found = re.findall(r'\w+', text.lower())
+    density = len(set(found)) / len(found) if found else 0.0
+    sentences = [s for s in re.split(r'[.!?]+', text) if s.strip()]
+    avg_len = sum(len(s.split()) for s in sentences) / len(sentences) if sentences else 0.0
+    raw_score += (density * 5)
+    raw_score += (min(avg_len, 50) / 10)
+    return {
+        "total_score": min(10.0, round(raw_score, 2)),
+        "lexical_density": round(density, 2),
+        "avg_sentence_length": round(avg_len, 2),
+        "tier": "gemini-2.0-flash",
+    }
+
+
+# Fragments chosen to hit the edge cases: keywords next to punctuation and in other case,
+# each code pattern (and near misses), sentence punctuation runs, Unicode case folding and spaces.
+FRAGMENTS = [
+    "analyze", "Analyze", "ANALYZE.", "calculate", "reason", "optimize", "architect", "debug",
+    "theorem", "derivative", "gradient", "asymptotic", "complexity", "complexity?", "reasonable",
+    "def f(x):", "def  g():", "def h(", "class A:", "class B(", "import os", "import", "{[]",
+    "[]", "++", "--", "&&", "||", "x = y;", "x=y", "...", "!?", ".", "the", "a", "b", "café",
+    "İ", "ǅ", " ", " ", "a.b", "1.5", "e.g.", "Why", "how", "what",
+]
+SEPARATORS = [" ", "  ", "\t", "\n", "", ". ", "! ", "?", ",", "\x1c"]
+
+
+def _random_prompt(rng: random.Random) -> str:
+    return "".join(rng.choice(FRAGMENTS) + rng.choice(SEPARATORS) for _ in range(rng.randint(0, 60)))
+
+
+def test_matches_legacy_on_examples():
+    scorer = ComplexityScorer()
+    examples = [
+        "",
+        "   ",
+        "What is carbon offsetting?",
+        "Analyze the asymptotic complexity of this: def f(n): return f(n-1) + f(n-2)",
+        "Please debug my code. x = y; if (a && b) { return [[1]]; }",
+        "Derive the gradient... then optimize! Why? Because.",
+    ]
+    for text in examples:
+        assert scorer.score(text) == legacy_score(text), repr(text)
+        assert score_complexity(text) == legacy_score(text)["total_score"], repr(text)
+
+
+def test_score_many_matches_legacy_on_random_prompts():
+    rng = random.Random(0)
+    texts = [_random_prompt(rng) for _ in range(5000)]
+    got = ComplexityScorer().score_many(texts)
+    for text, result in zip(texts, got):
+        assert result == legacy_score(text), repr(text)
+
+
+def run() -> int:
+    for test in (test_matches_legacy_on_examples, test_score_many_matches_legacy_on_random_prompts):
+        try:
+            test()
+        except AssertionError as e:
+            print(f"FAIL: {test.__name__}: {e}")
+            return 1
+    print("PASS: ComplexityScorer scores match the legacy implementation")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(run())
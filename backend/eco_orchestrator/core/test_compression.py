@@ -0,0 +1,144 @@
+import os
+import random
+import re
+import sys
+
+# Ensure the parent package (eco_orchestrator) is importable so we can import `core`.
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from core.compression import EcoCompressor
+from core.prompt_corpus import PromptCorpus
+from core.token_counter import count_tokens
+
+
+def legacy_compress(text: str, aggressive: bool = True) -> dict:
+    """The multi-pass EcoCompressor.compress whose compressed_text must still match, frozen as the reference."""
+    fluff_patterns = [
+        r"\b(please|kindly|could you|would you mind|i was wondering if|thank you)\b",
+        r"\s+",
+    ]
+    stop_words = {"the", "a", "an", "is", "of", "to", "for", "in", "with", "on", "at", "by"}
+    original_tokens = len(text.split())
+    compressed = text.lower()
+    for pattern in fluff_patterns:
+        compressed = re.sub(pattern, " ", compressed).strip()
+    compressed = re.sub(r'\S+@\S+\.\S+', '[E]', compressed)
+    compressed = re.sub(r'http\S+', '[U]', compressed)
+    if aggressive:
+        compressed = " ".join([w for w in compressed.split() if w.lower() not in stop_words])
+    final_tokens = len(compressed.split())
+    return {
+        "compressed_text": compressed,
+        "original_count": original_tokens,
+        "final_count": final_tokens,
+        "saved_tokens": max(0, original_tokens - final_tokens)
+    }
+
+
+# Fragments chosen to hit the edge cases: fluff inside/next to words and punctuation,
+# multi-word fluff with odd spacing, emails / URLs in and around tokens, non-ASCII case folding.
+FRAGMENTS = [
+    "please", "Please", "PLEASE", "kindly", "could you", "could  you", "could\nyou", "would you mind",
+    "I was wondering if", "hi was wondering if", "thank you", "thank youx", "thank-you", "thanks",
+    "the", "The", "a", "an", "is", "of", "to", "for", "in", "with", "on", "at", "by",
+    "pleased", "x-please", "(please)", "please,", "please_x", "kindlyplease", "²please", "ｐｌｅａｓｅ",
+    "me@x.com", "a@b", "foo@bar.baz/please", "e@.com", "x@y.z.", "@", "http://x.io", "https", "http",
+    "xhttpy", "[e]", "café", "İstanbul", "ǅ", "K", "under_score", "wouldn't", "you", "mind", "if",
+]
+SEPARATORS = [" ", " ", "  ", "\t", "\n", " \n ", "", "-", ",", "_", "'", "\x1c"]
+
+
+def _random_prompt(rng: random.Random) -> str:
+    return "".join(rng.choice(FRAGMENTS) + rng.choice(SEPARATORS) for _ in range(rng.randint(0, 40)))
+
+
+def _check(text: str, aggressive: bool) -> None:
+    got = EcoCompressor(aggressive).compress(text)
+    assert got["compressed_text"] == legacy_compress(text, aggressive)["compressed_text"], repr(text)
+    # Counts are tokenizer counts now (legacy counted whitespace words)
+    assert got["original_count"] == count_tokens(text), repr(text)
+    assert got["final_count"] == count_tokens(got["compressed_text"]), repr(text)
+
+
+def test_matches_legacy_on_examples():
+    examples = [
+        "",
+        "   ",
+        "Could you please summarize the attached report? Thank you!",
+        "I was wondering if you could email jane.doe@example.com the link https://example.com/a?b=c",
+        "Kindly   explain\tthe difference between a list and a tuple in Python.",
+    ]
+    for text in examples:
+        for aggressive in (True, False):
+            _check(text, aggressive)
+
+
+def test_matches_legacy_on_random_prompts():
+    rng = random.Random(0)
+    for _ in range(5000):
+        text = _random_prompt(rng)
+        for aggressive in (True, False):
+            _check(text, aggressive)
+
+
+def test_target_keeps_protected_spans_within_budget():
+    code = "```python\nfor x in range(10):\n    print(x)\n```"
+    text = (
+        "Could you please explain in detail how the carbon intensity of the grid changes during the day? "
+        f"The 2023 numbers look off. Here is my code:\n{code}\nIt prints \"hello world\" and fails at `main.py`. "
+        "Thank you so much for your help, I really appreciate it a lot and it is very kind of you."
+    )
+    compressor = EcoCompressor()
+    corpus = PromptCorpus()
+    for target in (0.8, 0.5, 0.3):
+        result = compressor.compress_to_target(text, target, corpus=corpus)
+        out = result["compressed_text"]
+        for kept in (code, '"hello world"', "`main.py`", "2023"):
+            assert kept in out, f"target {target}: lost {kept!r}"
+        assert result["final_count"] <= result["target_tokens"] + 2, f"target {target}: {result}"
+    assert "appreciate" not in compressor.compress_to_target(text, 0.5, corpus=corpus)["compressed_text"]
+
+
+def test_code_json_and_traces_are_minified_not_compressed():
+    text = (
+        "Please explain why this is slow.\n"
+        "```python\n# helper\nfor x in items:   # loop\n\n    print(\"# kept\", x)\n```\n"
+        '{\n  "region": "us-west1",\n  "tags": ["a", "b"]\n}\n'
+        "Traceback (most recent call last):\n  File \"main.py\", line 3, in <module>\n    f(None)\n"
+        "TypeError: 'NoneType' object is not iterable\n"
+        "Error: boom\n    at run (/app/index.js:10:5)\n    at main (/app/index.js:20:3)\n"
+        "Then use `for x in y` with the fix."
+    )
+    expected = "\n".join([
+        "explain why this slow.",
+        "```python\nfor x in items:\n    print(\"# kept\", x)\n```",
+        '{"region":"us-west1","tags":["a","b"]}',
+        "Traceback (most recent call last):\nFile \"main.py\", line 3, in <module>\nf(None)\n"
+        "TypeError: 'NoneType' object is not iterable",
+        "Error: boom\nat run (/app/index.js:10:5)\nat main (/app/index.js:20:3)",
+        "then use `for x in y` fix.",
+    ])
+    got = EcoCompressor().compress_text(text)
+    assert got == expected, got
+    assert "".join(EcoCompressor().compress_stream(iter(text.split("\n")))) == expected
+
+
+def run() -> int:
+    for test in (
+        test_matches_legacy_on_examples,
+        test_matches_legacy_on_random_prompts,
+        test_target_keeps_protected_spans_within_budget,
+        test_code_json_and_traces_are_minified_not_compressed,
+    ):
+        try:
+            test()
+        except AssertionError as e:
+            print(f"FAIL: {test.__name__}: {e}")
+            return 1
+    print("PASS: EcoCompressor output matches the legacy implementation; code is minified; budget mode keeps protected spans")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(run())
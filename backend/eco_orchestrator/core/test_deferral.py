@@ -0,0 +1,65 @@
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+# Ensure the parent package (eco_orchestrator) is importable so we can import `core`.
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from core.deferral import plan_deferral
+
+NOW = datetime(2025, 6, 1, 12, tzinfo=timezone.utc)
+
+
+def _curve(values):
+    return [(NOW + timedelta(hours=h + 1), v) for h, v in enumerate(values)]
+
+
+def test_defers_to_deepest_trough_before_deadline():
+    curve = _curve([250, 180, 120, 90, 300])
+    plan = plan_deferral(260, curve, NOW + timedelta(hours=4), 0.001, 200, NOW)
+    assert plan["defer"] and plan["rule"] == "forecast", plan
+    assert plan["scheduled_at"] == NOW + timedelta(hours=4) and plan["target_intensity"] == 90, plan
+    assert abs(plan["expected_saving_g"] - 0.17) < 1e-9, plan
+
+    # The trough after the deadline does not count
+    plan = plan_deferral(260, curve, NOW + timedelta(hours=2), 0.001, 200, NOW)
+    assert plan["scheduled_at"] == NOW + timedelta(hours=2), plan
+
+
+def test_runs_now_when_the_saving_is_too_small():
+    # Above the threshold, but nothing cleaner is coming: the old rule would have deferred
+    plan = plan_deferral(260, _curve([265, 255, 270]), NOW + timedelta(hours=3), 0.001, 200, NOW)
+    assert not plan["defer"] and plan["scheduled_at"] is None, plan
+
+
+def test_defers_below_the_threshold_when_a_deep_trough_is_coming():
+    plan = plan_deferral(150, _curve([140, 60]), NOW + timedelta(hours=3), 0.001, 200, NOW)
+    assert plan["defer"] and plan["target_intensity"] == 60, plan
+
+
+def test_threshold_rule_without_a_forecast():
+    assert plan_deferral(260, [], NOW + timedelta(hours=3), 0.001, 200, NOW)["defer"]
+    plan = plan_deferral(150, [], NOW + timedelta(hours=3), 0.001, 200, NOW)
+    assert not plan["defer"] and plan["rule"] == "threshold", plan
+
+
+def run() -> int:
+    tests = (
+        test_defers_to_deepest_trough_before_deadline,
+        test_runs_now_when_the_saving_is_too_small,
+        test_defers_below_the_threshold_when_a_deep_trough_is_coming,
+        test_threshold_rule_without_a_forecast,
+    )
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            print(f"FAIL: {test.__name__}: {e}")
+            return 1
+    print("PASS: deferral plans follow the forecast, deadline and saving threshold")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(run())
@@ -0,0 +1,98 @@
+import asyncio
+import os
+import sys
+
+# Ensure the parent package (eco_orchestrator) is importable so we can import `core`.
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+import core.orchestrator as orchestrator_module
+from core import receipt_store
+from core.budget import budget
+from core.chat_store import chat_store
+from core.compression import EcoCompressor
+from core.leaderboard import leaderboard
+from core.logger import GreenLogger
+from core.orchestrator import EcoOrchestrator
+from core.scheduler import Scheduler
+
+PROMPT = (
+    "Could you please explain, in a few short paragraphs, how a carbon-aware scheduler decides "
+    "when to run deferrable batch jobs, and what data it basically needs to do that well?"
+)
+GRID = {"carbon_intensity_g_per_kwh": 400.0, "grid_source": {"gas": 100}, "zone": "TEST"}
+
+
+class FakeClient:
+    default_location = "us-central1"
+
+    async def generate(self, prompt, model_name, location=None):
+        return "Deferred answer."
+
+
+class FakeDatabase:
+    async def complete_task(self, task_id, response, impact, owner=None):
+        return True
+
+
+def _orchestrator() -> EcoOrchestrator:
+    """EcoOrchestrator with only what execute_deferred_task touches; no LLM or Postgres."""
+    orch = EcoOrchestrator.__new__(EcoOrchestrator)
+    orch.client = FakeClient()
+    orch.db = FakeDatabase()
+    orch.scheduler = Scheduler()
+    orch.compressor = EcoCompressor()
+    orch.logger = GreenLogger()
+    return orch
+
+
+def _run_deferred(task: dict) -> dict:
+    saved = orchestrator_module.get_default_grid_data
+    orchestrator_module.get_default_grid_data = lambda: dict(GRID)
+    try:
+        result = asyncio.run(_orchestrator().execute_deferred_task(task))
+    finally:
+        orchestrator_module.get_default_grid_data = saved
+    assert result is not None, "deferred task failed"
+    return asyncio.run(receipt_store.get_receipt(result["receipt_id"]))
+
+
+def test_deferred_receipt_updates_leaderboard_and_budget():
+    receipt_store.set_backend(receipt_store.MemoryReceiptStore())
+    project = "test-deferred-project"
+    saved_before = asyncio.run(leaderboard.rank(project))["saved_kg"]
+    used_before = asyncio.run(budget.used_g(project))
+    task = {"id": 1, "prompt": PROMPT, "model_tier": "gemini-2.0-flash", "deadline": None,
+            "project_id": project, "user_id": "test-user"}
+    receipt = _run_deferred(task)
+    assert receipt["project_id"] == project and receipt["user_id"] == "test-user", receipt
+    assert receipt["net_savings"] > 0, receipt
+    ranked = asyncio.run(leaderboard.rank(project))
+    assert ranked["rank"] is not None and ranked["saved_kg"] >= saved_before, ranked
+    assert asyncio.run(budget.used_g(project)) > used_before, "deferred spend not charged to the project budget"
+
+
+def test_deferred_answer_is_appended_to_its_chat():
+    receipt_store.set_backend(receipt_store.MemoryReceiptStore())
+    task = {"id": 2, "prompt": PROMPT, "model_tier": "gemini-2.0-flash", "deadline": None,
+            "project_id": "test-deferred-project", "user_id": "test-user", "chat_id": "chat_test_deferred"}
+    receipt = _run_deferred(task)
+    assert receipt["chat_id"] == "chat_test_deferred", receipt
+    messages = asyncio.run(chat_store.history("chat_test_deferred"))["messages"]
+    assert [(m["role"], m["content"]) for m in messages] == [("assistant", "Deferred answer.")], messages
+
+
+def run() -> int:
+    tests = (test_deferred_receipt_updates_leaderboard_and_budget, test_deferred_answer_is_appended_to_its_chat)
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            print(f"FAIL: {test.__name__}: {e}")
+            return 1
+    print("PASS: deferred receipts reach the leaderboard, project budget and chat")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(run())
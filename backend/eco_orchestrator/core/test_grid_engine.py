@@ -0,0 +1,54 @@
+import asyncio
+import os
+import sys
+import uuid
+
+# Ensure the parent package (eco_orchestrator) is importable so we can import `core`.
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+import core.grid_engine as grid_engine
+
+
+def _zone() -> str:
+    # Unique per run: the cache may be a shared Redis
+    return f"TEST-{uuid.uuid4().hex[:8]}"
+
+
+def test_missing_forecast_is_cached():
+    calls = []
+    saved = grid_engine.fetch_emaps_forecast
+    grid_engine.fetch_emaps_forecast = lambda zone: calls.append(zone)
+    try:
+        zone = _zone()
+        assert asyncio.run(grid_engine.get_forecast_curve_async(zone)) == []
+        assert grid_engine.get_forecast_curve(zone) == []
+    finally:
+        grid_engine.fetch_emaps_forecast = saved
+    assert calls == [zone], calls
+
+
+def test_profile_takes_each_reading_once():
+    zone = _zone()
+    grid_engine._observe_intensity(zone, 100.0, "2026-01-01T05:00:00Z")
+    # A cache hit reports the same reading again: no change
+    grid_engine._observe_intensity(zone, 100.0, "2026-01-01T05:00:00Z")
+    assert grid_engine._hourly_profile[zone] == {5: 100.0}, grid_engine._hourly_profile[zone]
+    grid_engine._observe_intensity(zone, 200.0, "2026-01-01T05:10:00Z")
+    assert grid_engine._hourly_profile[zone] == {5: 130.0}, grid_engine._hourly_profile[zone]
+
+
+def run() -> int:
+    tests = (test_missing_forecast_is_cached, test_profile_takes_each_reading_once)
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            print(f"FAIL: {test.__name__}: {e}")
+            return 1
+    print("PASS: grid engine caches forecast misses and profiles fresh readings only")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(run())
@@ -0,0 +1,178 @@
+import asyncio
+import os
+import sys
+import types
+
+# Ensure the parent package (eco_orchestrator) is importable so we can import `core`.
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+import core.llm_client as llm_client
+from core.latency import LatencyHistogram
+from core.llm_client import LLMClient, is_retryable
+from core.rate_limit import RateLimiter
+
+
+class UpstreamError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def _wrapped(status_code) -> RuntimeError:
+    """A provider error as _call_* raise it: RuntimeError from the SDK error."""
+    try:
+        raise RuntimeError("LLM generation failed") from UpstreamError(status_code)
+    except RuntimeError as e:
+        return e
+
+
+class FakeClient(LLMClient):
+    """LLMClient without Vertex: _dispatch answers from a script of (delay, result) per region."""
+
+    def __init__(self, script: dict):
+        self.latency = {}
+        self.limiter = RateLimiter(model_limits={})
+        self._default_location = "us-central1"
+        self.script = {region: list(steps) for region, steps in script.items()}
+        self.calls = []
+        self.cancelled = []
+
+    async def _dispatch(self, prompt, resolved, loc):
+        self.calls.append((resolved, loc))
+        delay, result = self.script[loc].pop(0)
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled.append((resolved, loc))
+            raise
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def test_histogram_quantile():
+    hist = LatencyHistogram()
+    for i in range(1, 101):
+        hist.record(i / 100)
+    assert 0.95 <= hist.quantile(0.95) <= 0.95 * 1.2, hist.quantile(0.95)
+    assert LatencyHistogram().quantile(0.95) == 0.0
+
+
+def test_backup_target_prefers_same_model_in_cleanest_other_region():
+    client = FakeClient({})
+    assert client.backup_target("gemini-2.0-flash", "us-central1") == ("gemini-2.0-flash", "europe-north1")
+    assert client.backup_target("claude-opus-4-6", "europe-west1") == ("claude-opus-4-6", "us-east5")
+    assert client.backup_target("no-such-model", "us-central1") is None
+
+
+def test_is_retryable():
+    assert is_retryable(_wrapped(429)) and is_retryable(_wrapped(503))
+    assert not is_retryable(_wrapped(400)) and not is_retryable(ValueError("bad prompt"))
+
+
+def test_slow_call_is_hedged_and_loser_cancelled():
+    llm_client.LLM_HEDGE_DEFAULT_SECONDS = 0.02
+    client = FakeClient({"us-central1": [(1.0, "slow")], "europe-north1": [(0.0, "fast")]})
+    out = asyncio.run(client.generate("hi", "gemini-2.0-flash"))
+    assert out == "fast", out
+    assert client.cancelled == [("gemini-2.0-flash", "us-central1")], client.cancelled
+    assert client.latency["gemini-2.0-flash"].count == 1
+
+
+async def _drain(limiter: RateLimiter, region: str) -> None:
+    """Take every request the region's bucket has left."""
+    while await limiter.try_acquire("gemini-2.0-flash", region, 1) == 0.0:
+        pass
+
+
+def test_rate_limit_wait_is_not_hedged():
+    llm_client.LLM_HEDGE_DEFAULT_SECONDS = 0.02
+    # Primary region out of requests (10 / s refill): the ~0.1s queue must not trigger the hedge
+    client = FakeClient({"us-central1": [(0.0, "primary")], "europe-north1": [(0.0, "backup")]})
+    client.limiter = RateLimiter(model_limits={"gemini-2.0-flash": (600, 10_000_000)})
+    asyncio.run(_drain(client.limiter, "us-central1"))
+    assert asyncio.run(client.generate("hi", "gemini-2.0-flash")) == "primary"
+    assert client.calls == [("gemini-2.0-flash", "us-central1")], client.calls
+
+    # Slow primary, but the backup region has no rate-limit room: no hedge, the primary answers
+    client = FakeClient({"us-central1": [(0.1, "primary")], "europe-north1": [(0.0, "backup")]})
+    client.limiter = RateLimiter(model_limits={"gemini-2.0-flash": (600, 10_000_000)})
+    asyncio.run(_drain(client.limiter, "europe-north1"))
+    assert asyncio.run(client.generate("hi", "gemini-2.0-flash")) == "primary"
+    assert client.calls == [("gemini-2.0-flash", "us-central1")], client.calls
+
+
+def test_retryable_errors_are_retried_within_the_deadline():
+    llm_client.LLM_RETRY_BASE_SECONDS = 0.01
+    client = FakeClient({"us-central1": [(0.0, _wrapped(503)), (0.0, _wrapped(429)), (0.0, "ok")]})
+    assert asyncio.run(client.generate("hi", "gemini-2.0-flash")) == "ok"
+    assert len(client.calls) == 3
+
+    client = FakeClient({"us-central1": [(0.0, _wrapped(400)), (0.0, "unused")]})
+    try:
+        asyncio.run(client.generate("hi", "gemini-2.0-flash"))
+        raise AssertionError("non-retryable error was retried")
+    except RuntimeError:
+        pass
+    assert len(client.calls) == 1
+
+    llm_client.LLM_HEDGE_DEFAULT_SECONDS = 10.0
+    client = FakeClient({"us-central1": [(1.0, "too late")]})
+    try:
+        asyncio.run(client.generate("hi", "gemini-2.0-flash", deadline=0.05))
+        raise AssertionError("deadline was not enforced")
+    except RuntimeError as e:
+        assert "deadline" in str(e), e
+
+
+def test_other_region_gemini_leaves_vertex_location_alone():
+    inits, requests_seen = [], []
+
+    class Regional:
+        def __init__(self, client_options):
+            self.endpoint = client_options["api_endpoint"]
+
+        def generate_content(self, request):
+            requests_seen.append((self.endpoint, request.model))
+            part = types.SimpleNamespace(text="hej")
+            return types.SimpleNamespace(candidates=[types.SimpleNamespace(content=types.SimpleNamespace(parts=[part]))])
+
+    saved = llm_client.vertexai.init, llm_client.aiplatform_v1.PredictionServiceClient
+    llm_client.vertexai.init = lambda **kw: inits.append(kw)
+    llm_client.aiplatform_v1.PredictionServiceClient = Regional
+    try:
+        client = FakeClient({})
+        client._project, client._gemini_clients = "p", {}
+        out = asyncio.run(LLMClient._call_gemini(client, "hi", "gemini-2.0-flash", "europe-north1"))
+    finally:
+        llm_client.vertexai.init, llm_client.aiplatform_v1.PredictionServiceClient = saved
+    assert out == "hej" and not inits, inits
+    assert requests_seen == [(
+        "europe-north1-aiplatform.googleapis.com",
+        "projects/p/locations/europe-north1/publishers/google/models/gemini-2.0-flash",
+    )], requests_seen
+
+
+def run() -> int:
+    tests = (
+        test_histogram_quantile,
+        test_backup_target_prefers_same_model_in_cleanest_other_region,
+        test_is_retryable,
+        test_slow_call_is_hedged_and_loser_cancelled,
+        test_rate_limit_wait_is_not_hedged,
+        test_retryable_errors_are_retried_within_the_deadline,
+        test_other_region_gemini_leaves_vertex_location_alone,
+    )
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            print(f"FAIL: {test.__name__}: {e}")
+            return 1
+    print("PASS: LLMClient retries, hedges and keeps its deadline")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(run())
@@ -0,0 +1,192 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+# Ensure the parent package (eco_orchestrator) is importable so we can import `core`.
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+import core.orchestrator as orchestrator_module
+from core.compression import EcoCompressor
+from core.logger import GreenLogger
+from core.orchestrator import EcoOrchestrator
+from core.rate_limit import RateLimiter
+
+PROMPT = "Summarise the attached meeting notes into three bullet points for the weekly status email."
+
+
+def _take(limiter: RateLimiter, model: str, region: str, tokens: float, n: int = 1) -> list[float]:
+    """n try_acquire calls in a row; their waits."""
+    async def take():
+        return [await limiter.try_acquire(model, region, tokens) for _ in range(n)]
+    return asyncio.run(take())
+
+
+class FakeRedis:
+    """register_script() for _TAKE_LUA: the same take-all-or-nothing buckets in Python, run from any thread."""
+
+    def __init__(self, fail: bool = False):
+        self.buckets: dict[str, list[float]] = {}
+        self.calls = 0
+        self.threads = set()
+        self.fail = fail
+
+    def register_script(self, lua):
+        return self.take
+
+    def take(self, keys, args):
+        self.calls += 1
+        self.threads.add(threading.get_ident())
+        if self.fail:
+            raise ConnectionError("redis down")
+        now = time.monotonic()
+        levels, wait = [], 0.0
+        for i, key in enumerate(keys):
+            cap, rate, cost = args[i * 4:i * 4 + 3]
+            level, ts = self.buckets.get(key, (cap, now))
+            level = min(cap, level + (now - ts) * rate)
+            levels.append(level)
+            if level < cost:
+                wait = max(wait, (cost - level) / rate)
+        out = [wait]
+        for i, key in enumerate(keys):
+            take = 0.0 if wait else min(levels[i], args[i * 4 + 2] + args[i * 4 + 3])
+            self.buckets[key] = (levels[i] - take, now)
+            out.append(take)
+        return out + [self.buckets[key][0] for key in keys]
+
+
+def test_requests_per_minute():
+    limiter = RateLimiter(model_limits={"m": (3, 1_000_000)})
+    assert _take(limiter, "m", "r1", 10, n=3) == [0.0, 0.0, 0.0]
+    wait = _take(limiter, "m", "r1", 10)[0]
+    assert 0 < wait <= 20.0, wait  # one request refills every 60 / 3 s
+    assert limiter.expected_wait("m", "r1", 10) > 0
+    # Buckets are per (model, region)
+    assert _take(limiter, "m", "r2", 10) == [0.0]
+
+
+def test_tokens_per_minute_and_nothing_taken_on_refusal():
+    limiter = RateLimiter(model_limits={"m": (1000, 600)})
+    assert _take(limiter, "m", "r", 500) == [0.0]
+    assert _take(limiter, "m", "r", 500)[0] > 0
+    # The refused call took nothing: a smaller one still fits
+    assert _take(limiter, "m", "r", 100) == [0.0]
+    # A call larger than the bucket is capped at its capacity instead of waiting forever
+    assert _take(RateLimiter(model_limits={"m": (1000, 600)}), "m", "r", 10_000) == [0.0]
+
+
+def test_acquire_queues_until_admitted():
+    limiter = RateLimiter(model_limits={"m": (600, 1_000_000)})  # 10 requests / s
+    _take(limiter, "m", "r", 1, n=600)
+    waited = asyncio.run(limiter.acquire("m", "r", 1))
+    assert 0.05 < waited < 0.5, waited
+
+
+def test_shared_buckets_lease_off_the_event_loop():
+    redis = FakeRedis()
+    # 100 requests / min; each Redis call also leases 10% (10 requests) for local use
+    worker_a = RateLimiter(redis, lease_fraction=0.1, model_limits={"m": (100, 1_000_000)})
+    worker_b = RateLimiter(redis, lease_fraction=0.1, model_limits={"m": (100, 1_000_000)})
+    assert _take(worker_a, "m", "r", 1, n=12) == [0.0] * 12
+    assert redis.calls == 2, "lease misses only should reach Redis"
+    assert threading.get_ident() not in redis.threads, "Redis call ran on the event loop thread"
+    # Worker B shares the bucket worker A drained
+    _take(worker_b, "m", "r", 1, n=70)
+    assert _take(worker_b, "m", "r", 1, n=20)[-1] > 0.0
+    assert worker_b.expected_wait("m", "r", 1) > 0.0
+
+
+def test_redis_errors_fall_back_to_per_process_buckets():
+    limiter = RateLimiter(FakeRedis(fail=True), model_limits={"m": (3, 1_000_000)})
+    assert _take(limiter, "m", "r", 10, n=4)[:3] == [0.0, 0.0, 0.0]
+    assert _take(limiter, "m", "r", 10)[0] > 0.0
+
+
+class SpillClient:
+    """LLM client whose model is rate limited for the next wait seconds."""
+
+    default_location = "us-central1"
+
+    def __init__(self, wait: float):
+        self.wait = wait
+
+    def expected_wait(self, tokens, model_name, location=None):
+        return self.wait
+
+    async def generate(self, prompt, model_name, location=None):
+        raise AssertionError("a spilled request must not call the model")
+
+
+class QueueDatabase:
+    def __init__(self):
+        self.queued = []
+
+    async def add_task_to_queue(self, prompt, model, deadline, target, scheduled_at=None, **kwargs):
+        self.queued.append({"model": model, "target": target, "scheduled_at": scheduled_at})
+        return len(self.queued)
+
+
+def _spill(grid_intensity: float, wait: float) -> tuple[dict, list[dict]]:
+    """process() for a non-urgent prompt against a stubbed grid, router and queue."""
+    orch = EcoOrchestrator.__new__(EcoOrchestrator)
+    orch.client = SpillClient(wait)
+    orch.db = QueueDatabase()
+    orch.compressor = EcoCompressor()
+    orch.logger = GreenLogger()
+    orch.router = SimpleNamespace(route=lambda prompt: {"model": "gemini-2.0-flash", "power_level": "low", "features": []})
+
+    async def no_forecast(zone):
+        return []
+
+    patches = {
+        "check_if_prompt_is_in_cache": lambda prompt: None,
+        "get_default_grid_data": lambda: {"carbon_intensity_g_per_kwh": grid_intensity, "grid_source": {}, "zone": "TEST"},
+        "get_forecast_curve_async": no_forecast,
+        "REGION_SHIFT": False,
+    }
+    saved = {name: getattr(orchestrator_module, name) for name in patches}
+    for name, value in patches.items():
+        setattr(orchestrator_module, name, value)
+    try:
+        req = SimpleNamespace(prompt=PROMPT, cascade="off", is_urgent=False, deadline=None, project_id=None)
+        return asyncio.run(orch.process(req)), orch.db.queued
+    finally:
+        for name, value in saved.items():
+            setattr(orchestrator_module, name, value)
+
+
+def test_rate_limited_request_spills_until_the_limiter_has_room():
+    before = datetime.now(timezone.utc)
+    result, queued = _spill(grid_intensity=100.0, wait=30.0)
+    assert result["status"] == "deferred" and len(queued) == 1, result
+    # Clean grid: it runs when the limiter has room, not when the deadline forces it
+    scheduled_at = queued[0]["scheduled_at"]
+    assert scheduled_at is not None and before + timedelta(seconds=29) <= scheduled_at <= before + timedelta(seconds=35), queued
+
+
+def run() -> int:
+    tests = (
+        test_requests_per_minute,
+        test_tokens_per_minute_and_nothing_taken_on_refusal,
+        test_acquire_queues_until_admitted,
+        test_shared_buckets_lease_off_the_event_loop,
+        test_redis_errors_fall_back_to_per_process_buckets,
+        test_rate_limited_request_spills_until_the_limiter_has_room,
+    )
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            print(f"FAIL: {test.__name__}: {e}")
+            return 1
+    print("PASS: rate limiter admits, refuses and queues per (model, region)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(run())
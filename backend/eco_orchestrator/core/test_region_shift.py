@@ -0,0 +1,102 @@
+import asyncio
+import os
+import sys
+import time
+
+# Ensure the parent package (eco_orchestrator) is importable so we can import `core`.
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+import core.region_shift as region_shift
+from core.region_shift import RegionPlanner, live_region_intensities
+
+MODEL_MAP = {
+    "us-central1": {
+        "em_zone": "US-MIDW-MISO",
+        "available_models": [
+            {"id": "flash", "power_level": "low"},
+            {"id": "pro", "power_level": "high"},
+        ],
+    },
+    "europe-north1": {
+        "em_zone": "FI",
+        "available_models": [{"id": "flash", "power_level": "low"}],
+    },
+    "northamerica-northeast1": {
+        "em_zone": "CA-QC",
+        "available_models": [{"id": "lite", "power_level": "low"}],
+    },
+    "us-east5": {
+        "em_zone": "US-MIDA-PJM",
+        "available_models": [{"id": "opus", "power_level": "high"}],
+    },
+}
+# Live readings; Montréal is cleanest, but only serves another model
+LIVE = {"europe-north1": 40.0, "northamerica-northeast1": 20.0, "us-east5": 450.0}
+
+
+def test_live_intensities_skip_missing_and_slow_zones():
+    readings = {"FI": 40.0, "CA-QC": None, "US-MIDA-PJM": 450.0}
+
+    def lookup(em_zone, wt_region):
+        if em_zone == "US-MIDA-PJM":
+            time.sleep(0.2)
+        return readings.get(em_zone)
+
+    saved = region_shift._zone_intensity
+    region_shift._zone_intensity = lookup
+    try:
+        got = asyncio.run(live_region_intensities(MODEL_MAP, timeout=0.1))
+    finally:
+        region_shift._zone_intensity = saved
+    assert got == {"europe-north1": 40.0}, got
+
+
+def test_dirty_home_shifts_same_model_to_cleanest_region():
+    planner = RegionPlanner("us-central1", 300.0, LIVE, MODEL_MAP)
+    placed = planner.place("flash")
+    # Montréal is cleaner but does not serve flash: the model is never swapped
+    assert (placed["model"], placed["region"], placed["shifted"]) == ("flash", "europe-north1", True), placed
+    # No other region serves pro: stays put
+    placed = planner.place("pro")
+    assert (placed["model"], placed["region"], placed["shifted"]) == ("pro", "us-central1", False), placed
+
+
+def test_clean_home_unknown_models_and_missing_readings_stay():
+    planner = RegionPlanner("us-central1", 5.0, LIVE, MODEL_MAP)
+    assert not planner.place("flash")["shifted"]
+    placed = RegionPlanner("us-central1", 300.0, LIVE, MODEL_MAP).place("no-such-model")
+    assert placed == {"model": "no-such-model", "region": "us-central1", "intensity": 300.0, "shifted": False}, placed
+    # No live reading for Finland: not a candidate
+    assert not RegionPlanner("us-central1", 300.0, {}, MODEL_MAP).place("flash")["shifted"]
+
+
+def test_bulk_placement_and_claim_thresholds():
+    planner = RegionPlanner("us-central1", 300.0, LIVE, MODEL_MAP)
+    tasks = [{"model_tier": "flash"}, {"model_tier": "opus"}, {"model_tier": "flash"}]
+    placed = planner.place_all(tasks)
+    assert placed[0] is placed[2], "one placement per distinct model"
+    assert (placed[1]["region"], placed[1]["shifted"]) == ("us-central1", False), placed[1]
+    thresholds = planner.claim_thresholds()
+    assert thresholds == {"flash": 40.0, "pro": 300.0, "lite": 20.0, "opus": 300.0}, thresholds
+
+
+def run() -> int:
+    tests = (
+        test_live_intensities_skip_missing_and_slow_zones,
+        test_dirty_home_shifts_same_model_to_cleanest_region,
+        test_clean_home_unknown_models_and_missing_readings_stay,
+        test_bulk_placement_and_claim_thresholds,
+    )
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            print(f"FAIL: {test.__name__}: {e}")
+            return 1
+    print("PASS: region planner places work in the cleanest region serving the same model")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(run())
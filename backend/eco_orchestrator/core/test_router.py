@@ -0,0 +1,89 @@
+import os
+import sys
+from types import SimpleNamespace
+
+# Ensure the parent package (eco_orchestrator) is importable so we can import `core`.
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from core.classifier import FEATURE_NAMES
+from core.router import ROUTER_ARTIFACT_VERSION, TierRouter
+
+N = len(FEATURE_NAMES)
+# Two heads over the second feature only, standardised with mean 5 and scale 2:
+# low head z = (x - 5) / 2, medium head z = (x - 5) / 2 - 2
+ARTIFACT = {
+    "version": ROUTER_ARTIFACT_VERSION,
+    "features": list(FEATURE_NAMES),
+    "levels": ["low", "medium", "high"],
+    "mean": [0.0, 5.0] + [0.0] * (N - 2),
+    "scale": [1.0, 2.0] + [1.0] * (N - 2),
+    "heads": [
+        {"level": "low", "w": [0.0, 1.0] + [0.0] * (N - 2), "b": 0.0},
+        {"level": "medium", "w": [0.0, 1.0] + [0.0] * (N - 2), "b": -2.0},
+    ],
+}
+MODELS = {"low": "flash", "medium": "flash-pro", "high": "pro"}
+
+
+def _features(x: float) -> list[float]:
+    return [0.0, x] + [0.0] * (N - 2)
+
+
+def _router(artifact=ARTIFACT, level_models=MODELS, **kwargs) -> TierRouter:
+    # Prompts are their own feature value, e.g. "6" -> second feature 6.0
+    scorer = SimpleNamespace(features=lambda text: _features(float(text)))
+    return TierRouter(artifact, scorer=scorer, level_models=level_models, **kwargs)
+
+
+def test_folded_scaling_matches_standardised_heads():
+    router = _router()
+    # z_low = -0.5 | 0.5, z_medium = -1.5 | 1.5 (threshold 0 at p = 0.5)
+    assert [router.level_index(_features(x)) for x in (4, 6, 12)] == [0, 1, 2]
+    # Boundaries sit where the standardised logits cross zero
+    assert router.level_index(_features(4.999)) == 0 and router.level_index(_features(5.001)) == 1
+    assert router.level_index(_features(8.999)) == 1 and router.level_index(_features(9.001)) == 2
+
+
+def test_escalate_probability_moves_the_threshold():
+    # p = 0.8: a head escalates only above logit ln 4 (about 1.39), i.e. x above about 7.8 for low
+    xs = (6, 8, 9.5)
+    assert [_router().level_index(_features(x)) for x in xs] == [1, 1, 2]
+    router = _router(escalate_probability=0.8)
+    assert [router.level_index(_features(x)) for x in xs] == [0, 1, 1]
+
+
+def test_route_falls_back_to_a_cheaper_level_without_a_model():
+    router = _router(level_models={"low": "flash", "high": "pro"})
+    assert router.route("6") == {"power_level": "low", "model": "flash", "features": _features(6)}
+    assert router.route("12")["model"] == "pro"
+
+
+def test_mismatched_artifact_routes_everything_low():
+    for artifact in ({**ARTIFACT, "version": ROUTER_ARTIFACT_VERSION + 1},
+                     {**ARTIFACT, "features": list(reversed(FEATURE_NAMES))},
+                     None):
+        router = _router(artifact)
+        assert router.route("12")["power_level"] == "low", artifact
+    assert TierRouter.load("/nonexistent/router_model.json", level_models=MODELS).level_index(_features(12)) == 0
+
+
+def run() -> int:
+    tests = (
+        test_folded_scaling_matches_standardised_heads,
+        test_escalate_probability_moves_the_threshold,
+        test_route_falls_back_to_a_cheaper_level_without_a_model,
+        test_mismatched_artifact_routes_everything_low,
+    )
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            print(f"FAIL: {test.__name__}: {e}")
+            return 1
+    print("PASS: router folds scaling, thresholds heads and falls back to cheaper levels")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(run())
@@ -0,0 +1,160 @@
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+# Ensure the parent package (eco_orchestrator) is importable so we can import `core`.
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from core.scheduler import Scheduler, slot_released
+
+
+async def _order(scheduler: Scheduler, requests: list[tuple[str, dict]]) -> list[str]:
+    """Names of requests in the order they get the single slot, all queued behind a held one."""
+    order = []
+    hold = asyncio.Event()
+
+    async def holder():
+        async with scheduler.slot():
+            await hold.wait()
+
+    async def request(name, kwargs):
+        async with scheduler.slot(**kwargs):
+            order.append(name)
+
+    first = asyncio.create_task(holder())
+    await asyncio.sleep(0)
+    tasks = []
+    for name, kwargs in requests:
+        tasks.append(asyncio.create_task(request(name, kwargs)))
+        await asyncio.sleep(0)
+    hold.set()
+    await asyncio.gather(first, *tasks)
+    return order
+
+
+def test_classes_are_served_in_priority_order():
+    order = asyncio.run(_order(Scheduler(concurrency=1), [
+        ("batch", {"priority": "batch"}),
+        ("interactive", {"priority": "interactive"}),
+        ("urgent", {"priority": "urgent"}),
+    ]))
+    assert order == ["urgent", "interactive", "batch"], order
+
+
+def test_projects_share_a_class_fairly():
+    burst = [(f"a{i}", {"project_id": "a", "cost": 100}) for i in range(4)]
+    order = asyncio.run(_order(Scheduler(concurrency=1), burst + [("b0", {"project_id": "b", "cost": 100})]))
+    assert order.index("b0") <= 1, order
+
+    # Twice the weight, twice the share
+    scheduler = Scheduler(concurrency=1)
+    scheduler.set_weight("a", 2.0)
+    mixed = [(f"{p}{i}", {"project_id": p, "cost": 100}) for i in range(4) for p in ("a", "b")]
+    order = asyncio.run(_order(scheduler, mixed))
+    assert [n[0] for n in order[:3]].count("a") == 2, order
+
+
+def test_near_deadlines_go_first_within_a_class():
+    now = datetime.now(timezone.utc)
+    order = asyncio.run(_order(Scheduler(concurrency=1, edf_horizon=30), [
+        ("later", {"project_id": "a"}),
+        ("soon", {"project_id": "b", "deadline": now + timedelta(seconds=5)}),
+        ("sooner", {"project_id": "c", "deadline": now + timedelta(seconds=1)}),
+    ]))
+    assert order[:2] == ["sooner", "soon"], order
+
+
+def test_stats_report_queue_waits():
+    scheduler = Scheduler(concurrency=1)
+
+    async def run():
+        async def call():
+            async with scheduler.slot("batch"):
+                await asyncio.sleep(0.05)
+        await asyncio.gather(call(), call())
+
+    asyncio.run(run())
+    batch = scheduler.stats()["classes"]["batch"]
+    assert batch["served"] == 2 and batch["queued"] == 0, batch
+    assert batch["wait_max_ms"] >= 40 and batch["wait_p95_ms"] >= 40, batch
+    assert scheduler.in_flight == 0
+
+
+def test_slot_is_handed_on_while_released():
+    scheduler = Scheduler(concurrency=1)
+    order = []
+
+    async def rate_limited():
+        async with scheduler.slot():
+            async with slot_released():
+                # e.g. queued for a rate-limit token: the other call runs meanwhile
+                assert scheduler.in_flight == 0
+                await asyncio.sleep(0.02)
+            assert scheduler.in_flight == 1
+            order.append("rate_limited")
+
+    async def other():
+        await asyncio.sleep(0)
+        async with scheduler.slot():
+            order.append("other")
+
+    async def main():
+        await asyncio.gather(rate_limited(), other())
+        async with slot_released():  # no slot held: nothing to hand on
+            pass
+
+    asyncio.run(main())
+    assert order == ["other", "rate_limited"], order
+    assert scheduler.in_flight == 0 and scheduler.queued == 0
+
+
+def test_sibling_tasks_reacquire_the_slot_once():
+    scheduler = Scheduler(concurrency=1)
+
+    async def released(start, delay):
+        await asyncio.sleep(start)
+        async with slot_released():
+            await asyncio.sleep(delay)
+
+    async def holder():
+        async with scheduler.slot():
+            # e.g. hedged cascade attempts, both rate-limited while the slot is taken: the
+            # second enters and leaves while the first is queued to re-acquire
+            await asyncio.gather(asyncio.create_task(released(0, 0.01)), asyncio.create_task(released(0.02, 0)))
+            assert scheduler.in_flight == 1
+
+    async def other():
+        await asyncio.sleep(0)
+        async with scheduler.slot():
+            await asyncio.sleep(0.05)
+
+    async def main():
+        await asyncio.wait_for(asyncio.gather(holder(), other()), timeout=1)
+
+    asyncio.run(main())
+    assert scheduler.in_flight == 0 and scheduler.queued == 0, scheduler.stats()
+
+
+def run() -> int:
+    tests = (
+        test_classes_are_served_in_priority_order,
+        test_projects_share_a_class_fairly,
+        test_near_deadlines_go_first_within_a_class,
+        test_stats_report_queue_waits,
+        test_slot_is_handed_on_while_released,
+        test_sibling_tasks_reacquire_the_slot_once,
+    )
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            print(f"FAIL: {test.__name__}: {e}")
+            return 1
+    print("PASS: scheduler orders by class, fair share and deadline")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(run())
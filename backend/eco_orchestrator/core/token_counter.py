@@ -0,0 +1,131 @@
+"""
+Shared token counting for carbon math (compressor, orchestrator, /bypass, agent planner).
+
+Counts come from tiktoken BPE encodings chosen per model: OpenAI models use
+their own encoding; Gemini, Claude and Llama have no offline tokenizer, so
+they are counted with cl100k_base, which is far closer to their real counts
+than whitespace words. Counts are memoized in an LRU keyed by
+(encoding, text hash, length), so re-counting the same prompt, history turn
+or cached response is a dict lookup.
+
+If tiktoken is not installed, or an encoding cannot be loaded (its BPE file is
+downloaded on first use), counts fall back to the ~4 characters per token rule.
+"""
+import os
+from collections import OrderedDict
+
+from loguru import logger
+
+try:
+    import tiktoken
+    _HAS_TIKTOKEN = True
+except ImportError:
+    _HAS_TIKTOKEN = False
+
+TOKEN_COUNT_CACHE_SIZE = int(os.getenv("TOKEN_COUNT_CACHE_SIZE", "20000"))
+DEFAULT_ENCODING = "cl100k_base"
+CHARS_PER_TOKEN = 4
+
+# Model name prefix -> tiktoken encoding (first match wins; anything else uses DEFAULT_ENCODING)
+MODEL_ENCODINGS = [
+    ("gpt-4o", "o200k_base"),
+    ("o1", "o200k_base"),
+    ("o3", "o200k_base"),
+    ("gpt-4", "cl100k_base"),
+    ("gpt-3.5", "cl100k_base"),
+]
+
+
+def estimate_tokens(text: str) -> int:
+    """Tokenizer-free estimate (~4 chars per token)."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+class TokenCounter:
+    """Per-model token counts with an LRU of recent results and a batch API."""
+
+    def __init__(self, cache_size: int = TOKEN_COUNT_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._cache: OrderedDict[tuple[str, int, int], int] = OrderedDict()
+        self._encoders: dict[str, object | None] = {}
+
+    @staticmethod
+    def encoding_for(model: str | None) -> str:
+        if model:
+            name = model.lower()
+            for prefix, encoding in MODEL_ENCODINGS:
+                if name.startswith(prefix):
+                    return encoding
+        return DEFAULT_ENCODING
+
+    def _encoder(self, encoding: str):
+        """Loaded tiktoken encoding, or None when unavailable (cached either way)."""
+        if encoding not in self._encoders:
+            enc = None
+            if _HAS_TIKTOKEN:
+                try:
+                    enc = tiktoken.get_encoding(encoding)
+                except Exception as e:
+                    logger.warning(f"tiktoken encoding {encoding} unavailable, estimating token counts: {e}")
+            self._encoders[encoding] = enc
+        return self._encoders[encoding]
+
+    def _remember(self, key: tuple[str, int, int], count: int) -> None:
+        self._cache[key] = count
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def count(self, text: str, model: str | None = None) -> int:
+        """Tokens in text for model's tokenizer."""
+        if not text:
+            return 0
+        encoding = self.encoding_for(model)
+        key = (encoding, hash(text), len(text))
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            return cached
+        enc = self._encoder(encoding)
+        count = len(enc.encode_ordinary(text)) if enc is not None else estimate_tokens(text)
+        self._remember(key, count)
+        return count
+
+    def count_many(self, texts: list[str], model: str | None = None) -> list[int]:
+        """Counts for many texts; cache misses are encoded in one batch call (tiktoken threads)."""
+        encoding = self.encoding_for(model)
+        counts: list[int | None] = [None] * len(texts)
+        misses: list[int] = []
+        for i, text in enumerate(texts):
+            if not text:
+                counts[i] = 0
+                continue
+            key = (encoding, hash(text), len(text))
+            cached = self._cache.get(key)
+            if cached is None:
+                misses.append(i)
+            else:
+                self._cache.move_to_end(key)
+                counts[i] = cached
+        if misses:
+            enc = self._encoder(encoding)
+            miss_texts = [texts[i] for i in misses]
+            if enc is not None:
+                miss_counts = [len(ids) for ids in enc.encode_ordinary_batch(miss_texts)]
+            else:
+                miss_counts = [estimate_tokens(t) for t in miss_texts]
+            for i, text, count in zip(misses, miss_texts, miss_counts):
+                counts[i] = count
+                self._remember((encoding, hash(text), len(text)), count)
+        return counts
+
+
+# Process-wide counter: one encoder load and one cache shared by every caller
+token_counter = TokenCounter()
+
+
+def count_tokens(text: str, model: str | None = None) -> int:
+    return token_counter.count(text, model)
+
+
+def count_tokens_many(texts: list[str], model: str | None = None) -> list[int]:
+    return token_counter.count_many(texts, model)
@@ -0,0 +1,18 @@
+-- Base schema for deferred tasks and their receipts.
+CREATE TABLE IF NOT EXISTS tasks (
+    id SERIAL PRIMARY KEY,
+    prompt TEXT NOT NULL,
+    model_tier TEXT NOT NULL,
+    deadline TIMESTAMPTZ NOT NULL,
+    target_intensity FLOAT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'deferred',
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS receipts (
+    id SERIAL PRIMARY KEY,
+    task_id INTEGER NOT NULL REFERENCES tasks(id),
+    response TEXT NOT NULL,
+    co2_saved_g FLOAT NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
@@ -0,0 +1,7 @@
+-- Worker claim/lease columns (see EcoDatabase.claim_runnable_tasks) and completion time.
+ALTER TABLE tasks ADD COLUMN IF NOT EXISTS lease_owner TEXT;
+ALTER TABLE tasks ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMPTZ;
+ALTER TABLE tasks ADD COLUMN IF NOT EXISTS completed_at TIMESTAMPTZ;
+
+UPDATE tasks SET completed_at = COALESCE(created_at, NOW())
+WHERE status = 'completed' AND completed_at IS NULL;
@@ -0,0 +1,15 @@
+-- migrate: no-transaction
+-- Partial indexes so the worker's claim query only touches the live queue,
+-- not the (much larger) history of completed tasks. CONCURRENTLY keeps the
+-- table writable while the indexes build on a large existing backlog.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS tasks_deferred_deadline_idx
+    ON tasks (deadline) WHERE status = 'deferred';
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS tasks_deferred_target_idx
+    ON tasks (target_intensity) WHERE status = 'deferred';
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS tasks_running_lease_idx
+    ON tasks (lease_expires_at) WHERE status = 'running';
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS receipts_task_id_idx
+    ON receipts (task_id);
@@ -0,0 +1,28 @@
+-- Time-partitioned archives for completed tasks and their receipts.
+-- EcoDatabase.archive_completed() moves old rows here and creates monthly
+-- partitions on demand; the default partitions only catch stragglers.
+CREATE TABLE IF NOT EXISTS tasks_archive (
+    id INTEGER NOT NULL,
+    prompt TEXT NOT NULL,
+    model_tier TEXT NOT NULL,
+    deadline TIMESTAMPTZ NOT NULL,
+    target_intensity FLOAT NOT NULL,
+    status TEXT NOT NULL,
+    created_at TIMESTAMPTZ,
+    completed_at TIMESTAMPTZ NOT NULL
+) PARTITION BY RANGE (completed_at);
+
+CREATE TABLE IF NOT EXISTS tasks_archive_default PARTITION OF tasks_archive DEFAULT;
+
+CREATE TABLE IF NOT EXISTS receipts_archive (
+    id INTEGER NOT NULL,
+    task_id INTEGER NOT NULL,
+    response TEXT NOT NULL,
+    co2_saved_g FLOAT NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL
+) PARTITION BY RANGE (created_at);
+
+CREATE TABLE IF NOT EXISTS receipts_archive_default PARTITION OF receipts_archive DEFAULT;
+
+CREATE INDEX IF NOT EXISTS tasks_archive_id_idx ON tasks_archive (id);
+CREATE INDEX IF NOT EXISTS receipts_archive_task_id_idx ON receipts_archive (task_id);
@@ -0,0 +1,20 @@
+-- Durable backend for core.receipt_store (RECEIPT_STORE_BACKEND=postgres).
+-- One row per orchestrator receipt; the full receipt lives in data, the
+-- filterable fields are denormalized into indexed columns.
+CREATE TABLE IF NOT EXISTS receipt_store (
+    receipt_id TEXT PRIMARY KEY,
+    user_id TEXT,
+    project_id TEXT,
+    model TEXT,
+    zone TEXT,
+    time_bucket TEXT NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL,
+    data JSONB NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS receipt_store_user_idx ON receipt_store (user_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS receipt_store_project_idx ON receipt_store (project_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS receipt_store_model_idx ON receipt_store (model, created_at DESC);
+CREATE INDEX IF NOT EXISTS receipt_store_zone_idx ON receipt_store (zone, created_at DESC);
+CREATE INDEX IF NOT EXISTS receipt_store_bucket_idx ON receipt_store (time_bucket, created_at DESC);
+CREATE INDEX IF NOT EXISTS receipt_store_created_idx ON receipt_store (created_at DESC);
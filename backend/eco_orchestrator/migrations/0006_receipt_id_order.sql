@@ -0,0 +1,17 @@
+-- Receipt IDs are time-ordered (core/ids.py): order and range-scan by receipt_id
+-- instead of created_at. "C" collation makes index order byte order, which
+-- matches the IDs' Crockford base32 encoding.
+ALTER TABLE receipt_store ALTER COLUMN receipt_id TYPE TEXT COLLATE "C";
+
+DROP INDEX IF EXISTS receipt_store_user_idx;
+DROP INDEX IF EXISTS receipt_store_project_idx;
+DROP INDEX IF EXISTS receipt_store_model_idx;
+DROP INDEX IF EXISTS receipt_store_zone_idx;
+DROP INDEX IF EXISTS receipt_store_bucket_idx;
+DROP INDEX IF EXISTS receipt_store_created_idx;
+
+CREATE INDEX IF NOT EXISTS receipt_store_user_idx ON receipt_store (user_id, receipt_id DESC);
+CREATE INDEX IF NOT EXISTS receipt_store_project_idx ON receipt_store (project_id, receipt_id DESC);
+CREATE INDEX IF NOT EXISTS receipt_store_model_idx ON receipt_store (model, receipt_id DESC);
+CREATE INDEX IF NOT EXISTS receipt_store_zone_idx ON receipt_store (zone, receipt_id DESC);
+CREATE INDEX IF NOT EXISTS receipt_store_bucket_idx ON receipt_store (time_bucket, receipt_id DESC);
@@ -0,0 +1,24 @@
+-- Durable backend for core.chat_store (CHAT_STORE_BACKEND=postgres).
+-- chats.message_count is bumped under the row lock on every batch, which
+-- hands out gap-free seq numbers even with several writer processes.
+CREATE TABLE IF NOT EXISTS chats (
+    chat_id TEXT COLLATE "C" PRIMARY KEY,
+    user_id TEXT,
+    project_id TEXT,
+    created_at TIMESTAMPTZ NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL,
+    message_count INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS chats_user_idx ON chats (user_id, updated_at DESC);
+
+-- The primary key is the (chat_id, seq) index that history pages range-scan
+CREATE TABLE IF NOT EXISTS chat_messages (
+    chat_id TEXT COLLATE "C" NOT NULL,
+    seq INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    receipt_id TEXT,
+    created_at TIMESTAMPTZ NOT NULL,
+    PRIMARY KEY (chat_id, seq)
+);
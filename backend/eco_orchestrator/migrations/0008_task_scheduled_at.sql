@@ -0,0 +1,6 @@
+-- When the deferral optimizer (core/deferral.py) expects the grid to be cleanest before the
+-- task's deadline. The worker runs a task once scheduled_at has passed, even if the grid never
+-- reaches target_intensity. NULL for tasks queued by the plain threshold rule or bulk upload.
+ALTER TABLE tasks ADD COLUMN IF NOT EXISTS scheduled_at TIMESTAMPTZ;
+-- Kept when archive_completed() moves the task (partitions inherit the column).
+ALTER TABLE tasks_archive ADD COLUMN IF NOT EXISTS scheduled_at TIMESTAMPTZ;
@@ -0,0 +1,4 @@
+-- migrate: no-transaction
+-- Claim query: deferred tasks whose scheduled time has come.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS tasks_deferred_scheduled_idx
+    ON tasks (scheduled_at) WHERE status = 'deferred' AND scheduled_at IS NOT NULL;
@@ -0,0 +1,7 @@
+-- Who a deferred task belongs to, so its receipt is charged to the project's carbon budget and
+-- counted on the leaderboard like an immediate request. NULL for tasks queued before this column.
+ALTER TABLE tasks ADD COLUMN IF NOT EXISTS project_id TEXT;
+ALTER TABLE tasks ADD COLUMN IF NOT EXISTS user_id TEXT;
+-- Kept when archive_completed() moves the task (partitions inherit the columns).
+ALTER TABLE tasks_archive ADD COLUMN IF NOT EXISTS project_id TEXT;
+ALTER TABLE tasks_archive ADD COLUMN IF NOT EXISTS user_id TEXT;
@@ -0,0 +1,5 @@
+-- Chat a deferred task was asked in, so the worker can append the answer to that chat's
+-- history when it runs. NULL for tasks queued outside a chat (bulk upload) or before this column.
+ALTER TABLE tasks ADD COLUMN IF NOT EXISTS chat_id TEXT;
+-- Kept when archive_completed() moves the task (partitions inherit the column).
+ALTER TABLE tasks_archive ADD COLUMN IF NOT EXISTS chat_id TEXT;
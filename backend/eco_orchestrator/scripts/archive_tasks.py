@@ -0,0 +1,36 @@
+"""
+Move completed tasks and their receipts into the time-partitioned archive tables.
+Run from cron (e.g. nightly) to keep the live tasks table small.
+
+  cd backend/eco_orchestrator
+  python scripts/archive_tasks.py          # archive tasks completed > 30 days ago
+  python scripts/archive_tasks.py 7        # ... > 7 days ago
+
+Requires the schema from python scripts/seed_db.py.
+"""
+import asyncio
+import sys
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+
+_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(_root))
+
+from dotenv import load_dotenv
+load_dotenv(_root / ".env")
+
+from core.database import EcoDatabase
+
+
+async def main(days: int) -> None:
+    db = EcoDatabase(min_size=1, max_size=1)
+    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+    try:
+        moved = await db.archive_completed(cutoff)
+    finally:
+        await db.close()
+    print(f"Archived {moved['tasks']} task(s) and {moved['receipts']} receipt(s) completed before {cutoff.isoformat()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 30))
@@ -0,0 +1,78 @@
+"""
+Tokens saved vs compression time for budget-targeted compression
+(EcoCompressor.compress(..., target=...)) on 1 KB – 50 KB prompts.
+
+  cd backend/eco_orchestrator
+  python scripts/bench_budget_compression.py
+
+"base" is the default compressor (no target). Targets below 1 keep that
+fraction of the original tokens. Times are per call with token counts already
+cached (scripts/bench_token_counter.py covers cold counting). Terms are scored
+against a local corpus built from the sample prompts below, standing in for
+the cached-prompt corpus.
+"""
+import sys
+import time
+from pathlib import Path
+
+_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(_root))
+
+from core.compression import EcoCompressor
+from core.prompt_corpus import PromptCorpus
+
+SIZES = [1_000, 10_000, 50_000]
+TARGETS = [None, 0.8, 0.5, 0.3]
+CORPUS_PROMPTS = [
+    "What is carbon offsetting?",
+    "Explain how solar panels convert sunlight into electricity.",
+    "Write a Python function that sorts a list of dictionaries by a key.",
+    "Summarize the main causes of climate change in three bullet points.",
+    "How much energy does training a large language model use?",
+    "Explain the difference between renewable and non-renewable energy.",
+    "Write a SQL query that returns the top 10 customers by revenue.",
+    "Can you explain what a carbon footprint is?",
+]
+PROSE = (
+    "Hello, could you please summarize the following report for the team? I was wondering if it is "
+    "possible to include the key numbers from the quarterly dashboard. Revenue grew 12% to $4.2M in Q3 "
+    "while grid emissions fell to 210 gCO2/kWh. Thank you so much, I really appreciate your help with this. "
+    "The job still fails with \"connection reset by peer\" when it calls `fetch_intensity()`:\n"
+    "```python\nfor region in regions:\n    data = fetch_intensity(region)\n    print(region, data)\n```\n"
+)
+
+
+def _prompt(size: int) -> str:
+    return (PROSE * (size // len(PROSE) + 1))[:size]
+
+
+def main() -> None:
+    corpus = PromptCorpus()
+    for prompt in CORPUS_PROMPTS:
+        corpus.add(prompt)
+    compressor = EcoCompressor()
+
+    print(f"{'size':>7} {'target':>7} {'tokens':>13} {'saved':>7} {'ms':>8}")
+    for size in SIZES:
+        text = _prompt(size)
+        for target in TARGETS:
+            if target is None:
+                run = lambda: compressor.compress(text)
+            else:
+                run = lambda: compressor.compress_to_target(text, target, corpus=corpus)
+            result = run()  # first call fills the token-count cache, so the timings below are warm
+            reps = max(3, 200_000 // size)
+            start = time.perf_counter()
+            for _ in range(reps):
+                result = run()
+            ms = (time.perf_counter() - start) / reps * 1e3
+            saved = result["saved_tokens"] / max(1, result["original_count"]) * 100
+            label = "base" if target is None else f"{target:.0%}"
+            print(
+                f"{size:>7,} {label:>7} {result['original_count']:>6}->{result['final_count']:<6}"
+                f" {saved:6.1f}% {ms:8.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
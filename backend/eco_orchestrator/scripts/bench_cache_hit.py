@@ -0,0 +1,90 @@
+"""
+Latency of the token-stats part of an exact cache hit in EcoOrchestrator.process,
+for 20 KB prompts, before and after compression output was cached.
+
+  cd backend/eco_orchestrator
+  python scripts/bench_cache_hit.py
+
+before: the hit decodes the cached response, then compresses the prompt again
+        (token counts cold, e.g. first hit on this worker, or warm)
+after:  the compression stored with the response is read back, no regex or
+        token-count work; repeats of the same prompt on one worker
+        (/bypass, deferred retries, semantic hits) hit the compressor's LRU
+
+Redis I/O is left out: it is the same in both cases, apart from the extra
+bytes of compressed text in the stored value.
+"""
+import json
+import sys
+import time
+from pathlib import Path
+
+_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(_root))
+
+from core.compression import EcoCompressor
+from core.token_counter import token_counter
+
+PROMPT_BYTES = 20_000
+REPS = 200
+BASE = (
+    "Could you please review the following deployment notes and tell me what to change? "
+    "The scheduler defers batch jobs to the cleanest region when the grid intensity is above 200 g/kWh. "
+    "```python\nfor job in queue:\n    if job.deadline < now:  # run late jobs first\n        run(job)\n```\n"
+)
+
+
+def _prompts() -> list[str]:
+    body = (BASE * (PROMPT_BYTES // len(BASE) + 1))[:PROMPT_BYTES]
+    return [f"{i} {body}" for i in range(REPS)]
+
+
+def _us(fn, prompts: list[str]) -> float:
+    start = time.perf_counter()
+    for prompt in prompts:
+        fn(prompt)
+    return (time.perf_counter() - start) / len(prompts) * 1e6
+
+
+def main() -> None:
+    prompts = _prompts()
+    compressor = EcoCompressor()
+    stored = {}
+    for prompt in prompts:
+        comp = compressor.compress(prompt)
+        entry = {"response": "cached answer", "receipt_id": "rec_x", "eco_stats": {}}
+        stored[prompt] = (
+            json.dumps(entry),
+            json.dumps({**entry, "compression": {**comp, "target": None}}),
+        )
+
+    uncached = EcoCompressor(cache_size=0)
+
+    def before_cold(prompt):
+        token_counter._cache.clear()
+        json.loads(stored[prompt][0])
+        uncached.compress(prompt)
+
+    def before_warm(prompt):
+        json.loads(stored[prompt][0])
+        uncached.compress(prompt)
+
+    def after_stored(prompt):
+        json.loads(stored[prompt][1]).pop("compression")
+
+    def after_memo(prompt):
+        json.loads(stored[prompt][0])
+        compressor.compress(prompt)
+
+    print(f"{PROMPT_BYTES:,} B prompts, µs per hit")
+    for label, fn in (
+        ("before (cold token counts)", before_cold),
+        ("before (warm token counts)", before_warm),
+        ("after (stored with response)", after_stored),
+        ("after (compressor LRU)", after_memo),
+    ):
+        print(f"  {label:<30} {_us(fn, prompts):10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Bulk triage throughput: ComplexityScorer.score_many on 10k prompts vs the old
+per-call scorer (kept as legacy_score in core/test_classifier.py).
+
+  cd backend/eco_orchestrator
+  python scripts/bench_classifier.py
+
+Scores are checked for equality before timing.
+"""
+import random
+import sys
+import time
+from pathlib import Path
+
+_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(_root))
+
+from core.classifier import ComplexityScorer
+from core.test_classifier import legacy_score
+
+N_PROMPTS = 10_000
+SAMPLES = {
+    "prose": "Explain how solar panels work and why the grid is cleaner at night in most regions. ",
+    "code": (
+        "Analyze the asymptotic complexity of this function and optimize it. "
+        "def fib(n): return fib(n - 1) + fib(n - 2) if n > 1 else n. Why is it slow? "
+    ),
+    "non-ascii": "Résumé: expliquez pourquoi le réseau est plus propre la nuit à Zürich. ",
+}
+
+
+def main() -> None:
+    rng = random.Random(0)
+    scorer = ComplexityScorer()
+    print(f"{'prompts':<10} {'legacy ms':>10} {'score_many ms':>14} {'speedup':>8}")
+    for label, sample in SAMPLES.items():
+        texts = [sample * rng.randint(1, 10) + str(i) for i in range(N_PROMPTS)]
+        start = time.perf_counter()
+        expected = [legacy_score(t) for t in texts]
+        old_ms = (time.perf_counter() - start) * 1e3
+        start = time.perf_counter()
+        got = scorer.score_many(texts)
+        new_ms = (time.perf_counter() - start) * 1e3
+        assert got == expected, f"score mismatch on {label} prompts"
+        print(f"{label:<10} {old_ms:10.0f} {new_ms:14.0f} {old_ms / new_ms:7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
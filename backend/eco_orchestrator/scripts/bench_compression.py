@@ -0,0 +1,57 @@
+"""
+Microbenchmark EcoCompressor's text pass against the old multi-pass implementation
+(kept as legacy_compress in core/test_compression.py) on 100 B – 100 KB prompts.
+
+  cd backend/eco_orchestrator
+  python scripts/bench_compression.py
+
+Compressed text is checked for equality on every size before timing. Token
+counting is timed separately (scripts/bench_token_counter.py).
+"""
+import sys
+import time
+from pathlib import Path
+
+_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(_root))
+
+from core.compression import EcoCompressor
+from core.test_compression import legacy_compress
+
+SIZES = [100, 1_000, 10_000, 100_000]
+PROSE = (
+    "Hello, could you please summarize the following report for the team? I was wondering if it is "
+    "possible to include the key numbers from the quarterly dashboard and send it to the office. "
+    "Thank you kindly! The grid in the southeast is cleaner at night when wind output is high. "
+)
+WITH_LINKS = PROSE + "Sources: https://example.com/q3/report and ops-team@example.com. "
+
+
+def _prompt(base: str, size: int) -> str:
+    return (base * (size // len(base) + 1))[:size]
+
+
+def _time(fn, text: str) -> float:
+    reps = max(5, 300_000 // len(text))
+    start = time.perf_counter()
+    for _ in range(reps):
+        fn(text)
+    return (time.perf_counter() - start) / reps * 1e6
+
+
+def main() -> None:
+    compressor = EcoCompressor()
+    for label, base in (("prose", PROSE), ("prose + links", WITH_LINKS)):
+        print(f"\n{label}")
+        print(f"{'size':>9} {'legacy µs':>11} {'single-pass µs':>15} {'speedup':>8} {'MB/s':>7}")
+        for size in SIZES:
+            text = _prompt(base, size)
+            single_pass = lambda t: " ".join(compressor.tokens(t))
+            assert single_pass(text) == legacy_compress(text)["compressed_text"], f"output mismatch at {size} B"
+            old_us = _time(legacy_compress, text)
+            new_us = _time(single_pass, text)
+            print(f"{size:>9,} {old_us:11.1f} {new_us:15.1f} {old_us / new_us:7.2f}x {size / new_us:7.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Input tokens per turn on a long chat: re-sending the full history verbatim
+(what chat clients did before) vs the compressed window from ConversationContext.
+
+  cd backend/eco_orchestrator
+  python scripts/bench_conversation_context.py          # 60 turns
+  python scripts/bench_conversation_context.py 200
+
+Uses the in-memory chat store and canned turns; no LLM, Redis or Postgres needed.
+"""
+import asyncio
+import random
+import sys
+import time
+from pathlib import Path
+
+_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(_root))
+
+from core.chat_store import ChatStore, MemoryChatStore
+from core.conversation import ConversationContext
+
+PROMPTS = [
+    "Could you please explain how the carbon intensity of the grid changes during the day in the southeast?",
+    "Thank you. Now I was wondering if you could compare that with a region that has a lot of hydro power.",
+    "Kindly write a short Python function that picks the greenest region from a list of intensity readings.",
+    "Would you mind adding type hints and a docstring to that function, and handling an empty list?",
+]
+REPLY = (
+    "The intensity of the grid depends on the generation mix at each hour. In the afternoon solar output "
+    "rises and gas peakers ramp down, so intensity falls; in the evening the opposite happens. "
+)
+
+
+async def main(turns: int) -> None:
+    store = ChatStore(MemoryChatStore())
+    convo = ConversationContext(store)
+    rng = random.Random(0)
+    chat_id = "chat_bench"
+    full_total = window_total = 0
+    build_s = 0.0
+    print(f"{'turn':>4} {'full re-send':>13} {'window':>8} {'reduction':>10}")
+    for turn in range(1, turns + 1):
+        prompt = rng.choice(PROMPTS)
+        start = time.perf_counter()
+        ctx = await convo.build(chat_id)
+        build_s += time.perf_counter() - start
+        prompt_tokens = len(prompt.split())
+        full = ctx["history_tokens"] + prompt_tokens
+        window = ctx["context_tokens"] + prompt_tokens
+        full_total += full
+        window_total += window
+        if turn == 1 or turn % 10 == 0:
+            print(f"{turn:4d} {full:13,d} {window:8,d} {100 * (1 - window / full):9.1f}%")
+        store.append(chat_id, "user", prompt)
+        store.append(chat_id, "assistant", REPLY * rng.randint(1, 4))
+    await store.close()
+    print(f"total input tokens: full {full_total:,} vs window {window_total:,} "
+          f"({100 * (1 - window_total / full_total):.1f}% fewer); "
+          f"context build {build_s / turns * 1000:.2f} ms/turn")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 60))
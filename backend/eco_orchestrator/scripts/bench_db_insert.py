@@ -0,0 +1,87 @@
+"""
+Benchmark deferral insert throughput: connect-per-call (old) vs pooled EcoDatabase,
+plus bulk COPY ingestion (EcoDatabase.add_tasks_bulk).
+
+  cd backend/eco_orchestrator
+  python scripts/bench_db_insert.py                 # 500 inserts, concurrency 20, 100k bulk
+  python scripts/bench_db_insert.py 2000 50 1000000
+
+Requires Postgres with the tasks table (python scripts/seed_db.py).
+Benchmark rows are deleted afterwards.
+"""
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+
+_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(_root))
+
+from dotenv import load_dotenv
+load_dotenv(_root / ".env")
+
+import asyncpg
+
+from core.database import EcoDatabase, INSERT_TASK_SQL
+
+BENCH_MODEL = "bench-model"
+
+
+async def _insert_connect_per_call(dsn: str, deadline: datetime) -> None:
+    """The pre-pool code path: full handshake for every insert."""
+    conn = await asyncpg.connect(dsn)
+    try:
+        await conn.fetchval(INSERT_TASK_SQL, "bench prompt", BENCH_MODEL, deadline, 200.0, None)
+    finally:
+        await conn.close()
+
+
+async def _run(label: str, make_call, n: int, concurrency: int) -> float:
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with sem:
+            await make_call()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(n)))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<22} {n} inserts in {elapsed:7.3f}s  ->  {n / elapsed:9.1f} inserts/s")
+    return elapsed
+
+
+async def main(n: int, concurrency: int, bulk_n: int) -> None:
+    deadline = datetime.now(timezone.utc) + timedelta(hours=24)
+    db = EcoDatabase(max_size=concurrency)
+    try:
+        before = await _run(
+            "connect-per-call", lambda: _insert_connect_per_call(db.dsn, deadline), n, concurrency
+        )
+        await db.connect()  # exclude pool warm-up from the timing
+        after = await _run(
+            "pooled EcoDatabase",
+            lambda: db.add_task_to_queue("bench prompt", BENCH_MODEL, deadline, 200.0),
+            n,
+            concurrency,
+        )
+        print(f"speedup: {before / after:.1f}x")
+
+        tasks = [("bench prompt", BENCH_MODEL, deadline, 200.0, None, None)] * bulk_n
+        start = time.perf_counter()
+        await db.add_tasks_bulk(tasks)
+        elapsed = time.perf_counter() - start
+        print(f"{'bulk COPY':<22} {bulk_n} inserts in {elapsed:7.3f}s  ->  {bulk_n / elapsed:9.1f} inserts/s")
+        print(f"{bulk_n} tasks one-by-one (pooled) would take ~{after / n * bulk_n:.1f}s")
+    finally:
+        pool = await db.connect()
+        await pool.execute("DELETE FROM tasks WHERE model_tier = $1", BENCH_MODEL)
+        await db.close()
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    bulk_n = int(sys.argv[3]) if len(sys.argv) > 3 else 100_000
+    asyncio.run(main(n, concurrency, bulk_n))
@@ -0,0 +1,60 @@
+"""
+Benchmark the in-process leaderboard at 100k projects: update cost, top-K and
+rank queries per window, against a full sort of the score table (what a naive
+/leaderboard would do per request).
+
+  cd backend/eco_orchestrator
+  python scripts/bench_leaderboard.py            # 100k projects, 1M updates
+  python scripts/bench_leaderboard.py 20000 200000
+
+Uses MemoryLeaderboard directly; no Redis needed.
+"""
+import heapq
+import random
+import sys
+import time
+from pathlib import Path
+
+_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(_root))
+
+from core.leaderboard import WINDOW_DAYS, MemoryLeaderboard
+
+READS = 2000
+K = 10
+
+
+def main(projects: int, updates: int) -> None:
+    board = MemoryLeaderboard()
+    rng = random.Random(0)
+    names = [f"proj_{i}" for i in range(projects)]
+    start = time.perf_counter()
+    for _ in range(updates):
+        board.record(rng.choice(names), rng.uniform(0, 5))
+    write_s = time.perf_counter() - start
+    print(f"{updates:,} updates over {projects:,} projects: {write_s / updates * 1e6:.1f} µs/update ({len(WINDOW_DAYS)} windows)")
+
+    scores = dict(board._windows["all"]._scores)
+    start = time.perf_counter()
+    for _ in range(20):
+        naive = heapq.nlargest(K, scores.items(), key=lambda item: item[1])
+    naive_ms = (time.perf_counter() - start) / 20 * 1000
+
+    for window in WINDOW_DAYS:
+        start = time.perf_counter()
+        for _ in range(READS):
+            top = board.top(K, window)
+        top_us = (time.perf_counter() - start) / READS * 1e6
+        start = time.perf_counter()
+        for _ in range(READS):
+            board.rank(rng.choice(names), window)
+        rank_us = (time.perf_counter() - start) / READS * 1e6
+        print(f"{window:6s} top-{K} {top_us:8.2f} µs   rank {rank_us:8.2f} µs")
+
+    assert [m for m, _ in naive] == [m for m, _ in board.top(K, "all")]
+    print(f"naive nlargest over the score table: {naive_ms:.2f} ms/read")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(args[0] if args else 100_000, args[1] if len(args) > 1 else 1_000_000)
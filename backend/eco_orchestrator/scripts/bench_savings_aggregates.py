@@ -0,0 +1,73 @@
+"""
+Benchmark dashboard savings reads: full scan over stored receipts (old
+_aggregate_savings) vs the running aggregates kept by set_receipt.
+
+  cd backend/eco_orchestrator
+  python scripts/bench_savings_aggregates.py            # 1M receipts
+  python scripts/bench_savings_aggregates.py 200000
+
+Uses an in-memory receipt store; no Redis or Postgres needed.
+"""
+import asyncio
+import random
+import sys
+import time
+from pathlib import Path
+
+_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(_root))
+
+from core import receipt_store
+from core.aggregates import savings
+from core.ids import new_id
+
+READS = 1000
+
+
+def _scan(receipts: list[dict]) -> tuple[float, float]:
+    """The pre-aggregate code path: re-sum every receipt on each request."""
+    total_g = sum(r.get("net_savings", 0) or 0 for r in receipts)
+    mults = [r.get("efficiency_multiplier") for r in receipts if r.get("efficiency_multiplier") is not None]
+    avg_eff = sum(mults) / len(mults) if mults else 0.94
+    return round(total_g, 1), round(avg_eff, 2)
+
+
+async def main(n: int) -> None:
+    receipt_store.set_backend(receipt_store.MemoryReceiptStore(max_size=n))
+    rng = random.Random(0)
+    start = time.perf_counter()
+    for i in range(n):
+        await receipt_store.set_receipt(
+            new_id("rec"),
+            {
+                "user_id": f"user_{rng.randrange(1000)}",
+                "project_id": f"proj_{rng.randrange(100)}",
+                "model_used": "gemini-2.0-flash",
+                "grid_zone": "US-SE-SOCO",
+                "net_savings": rng.uniform(0, 5),
+                "efficiency_multiplier": rng.uniform(1, 20),
+            },
+        )
+    write_s = time.perf_counter() - start
+    print(f"wrote {n:,} receipts in {write_s:.2f}s ({write_s / n * 1e6:.1f} µs/receipt incl. aggregates)")
+
+    receipts = await receipt_store.query_receipts(limit=None)
+    reads = max(1, READS // max(1, n // 10_000))
+    start = time.perf_counter()
+    for _ in range(reads):
+        scanned = _scan(receipts)
+    scan_ms = (time.perf_counter() - start) / reads * 1000
+
+    start = time.perf_counter()
+    for _ in range(READS):
+        stats = await savings.get("all", "", "net_savings")
+        eff = await savings.get("all", "", "efficiency")
+    agg_ms = (time.perf_counter() - start) / READS * 1000
+
+    print(f"full scan     {scan_ms:10.3f} ms/read  -> {scanned}")
+    print(f"aggregates    {agg_ms:10.5f} ms/read  -> ({round(stats.total, 1)}, {round(eff.mean, 2)})")
+    print(f"speedup: {scan_ms / agg_ms:,.0f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000))
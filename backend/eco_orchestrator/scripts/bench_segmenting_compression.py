@@ -0,0 +1,78 @@
+"""
+Throughput of the segmenting compressor (EcoCompressor.compress_text /
+compress_stream) on large pasted logs: timestamped log lines with Python and
+JVM stack traces, JSON payloads and a fenced snippet mixed in, 100 KB – 10 MB.
+
+  cd backend/eco_orchestrator
+  python scripts/bench_segmenting_compression.py
+
+"prose-only" is the plain prose pass (compressor.tokens) over the same text,
+i.e. what compression cost before code / JSON / traces were segmented out
+(and corrupted them). The stream column feeds the log line by line through
+compress_stream, as for a file too big to hold in memory.
+"""
+import sys
+import time
+from pathlib import Path
+
+_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(_root))
+
+from core.compression import EcoCompressor
+
+SIZES = [100_000, 1_000_000, 10_000_000]
+LOG_CHUNK = (
+    "2024-05-01 12:00:01 INFO worker-3 Processing batch 1842 for region us-west1 with 512 items\n"
+    "2024-05-01 12:00:02 WARN worker-3 Retrying request to the carbon intensity API in 2 s\n"
+    '{"event": "grid_update", "region": "us-west1", "intensity": 212.5, "source": "watttime"}\n'
+    "2024-05-01 12:00:03 ERROR worker-3 Task failed\n"
+    "Traceback (most recent call last):\n"
+    '  File "/app/worker.py", line 88, in run\n'
+    "    result = process(batch)\n"
+    '  File "/app/worker.py", line 41, in process\n'
+    "    return [score(item) for item in batch]\n"
+    "KeyError: 'intensity'\n"
+    "2024-05-01 12:00:04 ERROR scheduler java.lang.IllegalStateException: queue closed\n"
+    "\tat com.acme.sched.Queue.take(Queue.java:120)\n"
+    "\tat com.acme.sched.Worker.run(Worker.java:57)\n"
+    "\tat java.base/java.lang.Thread.run(Thread.java:833)\n"
+    "Could you please check why the worker keeps failing on this batch? The fix I tried:\n"
+    "```python\n"
+    "# guard against missing readings\n"
+    "for item in batch:\n"
+    "    if 'intensity' in item:  # skip partial rows\n"
+    "        yield score(item)\n"
+    "```\n"
+)
+
+
+def _log(size: int) -> str:
+    return (LOG_CHUNK * (size // len(LOG_CHUNK) + 1))[:size]
+
+
+def _time(fn) -> float:
+    reps = 3
+    start = time.perf_counter()
+    for _ in range(reps):
+        fn()
+    return (time.perf_counter() - start) / reps
+
+
+def main() -> None:
+    compressor = EcoCompressor()
+    print(f"{'size':>11} {'prose-only MB/s':>16} {'segmented MB/s':>15} {'stream MB/s':>12} {'out/in':>7}")
+    for size in SIZES:
+        text = _log(size)
+        lines = text.split("\n")
+        prose_only = _time(lambda: " ".join(compressor.tokens(text)))
+        segmented = _time(lambda: compressor.compress_text(text))
+        stream = _time(lambda: sum(len(chunk) for chunk in compressor.compress_stream(iter(lines))))
+        ratio = len(compressor.compress_text(text)) / size
+        mb = size / 1e6
+        print(
+            f"{size:>11,} {mb / prose_only:16.1f} {mb / segmented:15.1f} {mb / stream:12.1f} {ratio:7.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
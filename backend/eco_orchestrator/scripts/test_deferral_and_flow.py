@@ -84,30 +84,11 @@ async def test_postgres() -> bool:
             print("   Docker: docker run -d -e POSTGRES_PASSWORD=postgres -e POSTGRES_DB=eco_db -p 5432:5432 postgres:16")
             return False
 
-    _step(2, "Seeding tables (tasks, receipts)...")
+    _step(2, "Migrating tables (tasks, receipts)...")
     try:
-        await conn.execute("""
-            CREATE TABLE IF NOT EXISTS tasks (
-                id SERIAL PRIMARY KEY,
-                prompt TEXT NOT NULL,
-                model_tier TEXT NOT NULL,
-                deadline TIMESTAMPTZ NOT NULL,
-                target_intensity FLOAT NOT NULL,
-                status TEXT NOT NULL DEFAULT 'deferred',
-                created_at TIMESTAMPTZ DEFAULT NOW()
-            )
-        """)
-        _ok("Table tasks ready")
-        await conn.execute("""
-            CREATE TABLE IF NOT EXISTS receipts (
-                id SERIAL PRIMARY KEY,
-                task_id INTEGER NOT NULL REFERENCES tasks(id),
-                response TEXT NOT NULL,
-                co2_saved_g FLOAT NOT NULL,
-                created_at TIMESTAMPTZ DEFAULT NOW()
-            )
-        """)
-        _ok("Table receipts ready")
+        from core.migrations import run_migrations
+        applied = await run_migrations(conn)
+        _ok(f"Schema ready (applied: {', '.join(applied) or 'none'})")
     except Exception as e:
         _fail(str(e))
         await conn.close()
@@ -183,7 +164,7 @@ async def test_deferral() -> bool:
     print(f"   eco_stats: {result['eco_stats']}")
 
     _step(5, "Verifying receipt in store...")
-    receipt = get_receipt(result["receipt_id"])
+    receipt = await get_receipt(result["receipt_id"])
     if receipt is None:
         _fail("receipt not found in store")
         return False
@@ -0,0 +1,198 @@
+"""
+Train the learned model-tier router (core/router.py) from logged outcomes.
+
+  cd backend/eco_orchestrator
+  pip install numpy   # training only; the server does not need it
+  python scripts/train_router.py routing_log.jsonl [--out data/router_model.json]
+
+Each input line is one logged LLM call (the server writes them to ROUTER_LOG_PATH):
+
+  {"prompt": "...", "model": "gemini-2.0-flash", "outcome": true}
+  {"features": [0, 1.5, 0.82, 12.0, 3.4], "model": "gemini-2.5-pro", "outcome": 0.3}
+
+"features" (ComplexityScorer.features order) may replace "prompt". "model" is
+mapped to its power_level through server_model_map.json. "outcome" is true /
+false or a quality score in [0, 1] (>= --ok-score counts as good enough).
+
+Labels are ordinal. A good answer at level L means the prompt needs no more
+than L: it is a negative example for the heads of L and above. A bad answer
+means it needs more than L: a positive example for the heads up to L. Each
+head is an L2-regularized logistic regression fitted by Newton's method on
+standardized features. The artifact records the standardization, and 20% of
+rows are held out to report per-head accuracy. Inference time per prompt
+(features excluded) is checked against ROUTER_INFERENCE_BUDGET_US.
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(_root))
+
+from core.classifier import FEATURE_NAMES, ComplexityScorer
+
+POWER_LEVELS = ("low", "medium", "high")
+ROUTER_INFERENCE_BUDGET_US = 50.0
+ARTIFACT_VERSION = 1
+L2 = 1e-2
+NEWTON_STEPS = 25
+
+
+def _model_levels() -> dict[str, str]:
+    with open(_root / "server_model_map.json") as f:
+        server_map = json.load(f)
+    return {
+        m["id"]: m["power_level"]
+        for rdata in server_map.values()
+        for m in rdata.get("available_models", [])
+    }
+
+
+def _load_rows(path: str, ok_score: float) -> list[tuple[list[float], int, bool]]:
+    scorer = ComplexityScorer()
+    levels = _model_levels()
+    rows, skipped = [], 0
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            rec = json.loads(line)
+            level = levels.get(rec.get("model"))
+            if level not in POWER_LEVELS:
+                skipped += 1
+                continue
+            features = rec.get("features") or scorer.features(rec.get("prompt", ""))
+            outcome = rec.get("outcome")
+            ok = outcome >= ok_score if isinstance(outcome, (int, float)) and not isinstance(outcome, bool) else bool(outcome)
+            rows.append(([float(x) for x in features], POWER_LEVELS.index(level), ok))
+    if skipped:
+        print(f"skipped {skipped} rows with a model not in server_model_map.json")
+    return rows
+
+
+def _head_examples(rows, head: int):
+    """(X, y) for head k: P(prompt needs more than POWER_LEVELS[k])."""
+    X, y = [], []
+    for features, level, ok in rows:
+        if ok and level <= head:
+            X.append(features)
+            y.append(0.0)
+        elif not ok and level >= head:
+            X.append(features)
+            y.append(1.0)
+    return np.array(X, dtype=float).reshape(-1, len(FEATURE_NAMES)), np.array(y)
+
+
+def _fit_logistic(X: np.ndarray, y: np.ndarray) -> tuple[np.ndarray, float]:
+    """L2-regularized logistic regression (intercept unpenalized), Newton's method."""
+    n, d = X.shape
+    A = np.hstack([X, np.ones((n, 1))])
+    theta = np.zeros(d + 1)
+    penalty = np.full(d + 1, L2 * n)
+    penalty[-1] = 0.0
+    for _ in range(NEWTON_STEPS):
+        p = 1.0 / (1.0 + np.exp(-(A @ theta)))
+        grad = A.T @ (p - y) + penalty * theta
+        hess = (A * (p * (1 - p))[:, None]).T @ A + np.diag(penalty) + 1e-9 * np.eye(d + 1)
+        step = np.linalg.solve(hess, grad)
+        theta -= step
+        if np.max(np.abs(step)) < 1e-8:
+            break
+    return theta[:-1], float(theta[-1])
+
+
+def train(rows, holdout: float = 0.2, seed: int = 0) -> tuple[dict, list]:
+    rng = random.Random(seed)
+    rows = rows[:]
+    rng.shuffle(rows)
+    n_test = int(len(rows) * holdout)
+    test, train_rows = rows[:n_test], rows[n_test:]
+
+    X_all = np.array([r[0] for r in train_rows], dtype=float)
+    mean = X_all.mean(axis=0)
+    scale = X_all.std(axis=0)
+    scale[scale == 0] = 1.0
+
+    heads = []
+    for k in range(len(POWER_LEVELS) - 1):
+        X, y = _head_examples(train_rows, k)
+        if len(y) == 0 or y.min() == y.max():
+            # No contrast to learn from: a constant head at the (clipped) base rate
+            rate = min(max(y.mean() if len(y) else 0.0, 0.01), 0.99)
+            w, b = np.zeros(len(FEATURE_NAMES)), float(np.log(rate / (1 - rate)))
+        else:
+            w, b = _fit_logistic((X - mean) / scale, y)
+        X_test, y_test = _head_examples(test, k)
+        accuracy = None
+        if len(y_test):
+            pred = (((X_test - mean) / scale) @ w + b) >= 0
+            accuracy = round(float((pred == (y_test == 1)).mean()), 4)
+        heads.append({
+            "level": POWER_LEVELS[k],
+            "w": [round(float(v), 6) for v in w],
+            "b": round(b, 6),
+            "train_rows": int(len(y)),
+            "holdout_accuracy": accuracy,
+        })
+
+    artifact = {
+        "version": ARTIFACT_VERSION,
+        "features": list(FEATURE_NAMES),
+        "levels": list(POWER_LEVELS),
+        "mean": [round(float(v), 6) for v in mean],
+        "scale": [round(float(v), 6) for v in scale],
+        "heads": heads,
+        "trained_at": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+        "rows": len(train_rows),
+    }
+    return artifact, test
+
+
+def _inference_us(artifact: dict, rows) -> float:
+    from core.router import TierRouter
+
+    router = TierRouter(artifact, level_models={lv: lv for lv in POWER_LEVELS})
+    features = [r[0] for r in rows] or [[0.0] * len(FEATURE_NAMES)]
+    reps = max(1, 100_000 // len(features))
+    start = time.perf_counter()
+    for _ in range(reps):
+        for f in features:
+            router.level_index(f)
+    return (time.perf_counter() - start) / (reps * len(features)) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("log", help="JSONL of logged calls (prompt/features, model, outcome)")
+    parser.add_argument("--out", default=str(_root / "data" / "router_model.json"))
+    parser.add_argument("--ok-score", type=float, default=0.7, help="numeric outcomes at or above this are good")
+    parser.add_argument("--holdout", type=float, default=0.2)
+    args = parser.parse_args()
+
+    rows = _load_rows(args.log, args.ok_score)
+    if not rows:
+        raise SystemExit("no usable rows")
+    artifact, test = train(rows, args.holdout)
+    for head in artifact["heads"]:
+        print(
+            f"head needs>{head['level']:<7} train_rows={head['train_rows']:<7} "
+            f"holdout_accuracy={head['holdout_accuracy']}"
+        )
+    us = _inference_us(artifact, test)
+    print(f"inference: {us:.2f} µs/prompt (budget {ROUTER_INFERENCE_BUDGET_US:.0f} µs, features excluded)")
+
+    with open(args.out, "w") as f:
+        json.dump(artifact, f, separators=(",", ":"))
+    print(f"wrote {args.out} ({Path(args.out).stat().st_size} bytes, {artifact['rows']} training rows)")
+    if us > ROUTER_INFERENCE_BUDGET_US:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -113,12 +113,12 @@ export function getUserSummary(userId: string) {
   return apiFetch<UserSummary>(`/user/${userId}/summary`);
 }
 
-export function getChatHistory(chatId: string) {
+export function getChatHistory(chatId: string, userId: string) {
   return apiFetch<{
     messages: { role: string; content: string; receipt_id: string }[];
     total_chat_co2_saved_g: number;
     efficiency_score: number;
-  }>(`/chat/${chatId}/history`);
+  }>(`/chat/${chatId}/history?user_id=${encodeURIComponent(userId)}`);
 }
 
 // ─── Action ──────────────────────────────────────────────────────────────────